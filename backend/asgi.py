@@ -3,6 +3,19 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so the async views (creditunion/paystack_async_views.py)
+can wait on Paystack without holding a worker, e.g.
+
+    uvicorn backend.asgi:application --workers 4
+
+With more than one worker, set CACHE_URL to a shared cache such as Redis;
+on the default per-process cache the member and reference caches stay off
+(see SHARED_CACHE in settings.py).
+
+Streamed responses must use async iterators under ASGI, or Django reads
+them into memory first; see the statement export in
+creditunion/statement_view.py.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
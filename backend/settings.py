@@ -76,15 +76,20 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT whose claims stand in for the user row on read-only requests
+        'creditunion.authentication.ClaimsJWTAuthentication',
     )
 }
 
+# Full user rows kept per process for authenticated writes (creditunion/authentication.py)
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 1024))
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # MUST BE VERY FIRST
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'creditunion.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise, usable under ASGI too
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -122,6 +127,8 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_OBTAIN_SERIALIZER": "creditunion.authentication.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "creditunion.authentication.ClaimsTokenRefreshSerializer",
 }
 
 
@@ -157,6 +164,7 @@ default_headers = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 # Optional: Allow all methods and headers
 CORS_ALLOW_HEADERS = default_headers
@@ -189,6 +197,14 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 PAYSTACK_CALLBACK_URL = os.getenv("PAYSTACK_CALLBACK_URL", "http://localhost:4200/member-portal")
 PAYSTACK_KEY = os.getenv("PAYSTACK_KEY")
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+# Seconds to wait for a connection / for a response once connected
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", 3.05))
+PAYSTACK_READ_TIMEOUT = float(os.getenv("PAYSTACK_READ_TIMEOUT", 10))
+PAYSTACK_MAX_RETRIES = int(os.getenv("PAYSTACK_MAX_RETRIES", 2))
+# Consecutive failures before calls are refused, and seconds before one is let through again
+PAYSTACK_BREAKER_THRESHOLD = int(os.getenv("PAYSTACK_BREAKER_THRESHOLD", 5))
+PAYSTACK_BREAKER_RESET = float(os.getenv("PAYSTACK_BREAKER_RESET", 30))
 
 
 DATABASES = {}
@@ -211,8 +227,49 @@ else:
     DATABASES['default'] = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite ignores SELECT ... FOR UPDATE; starting every atomic block as a
+        # write transaction serializes the locked read-modify-write paths instead
+        # (e.g. creditunion/repayments.py), waiting up to `timeout` seconds.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than shared-cache memory, so concurrent tests wait on locks instead of failing
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Defaults to per-process memory; set CACHE_URL (e.g. redis://host:6379/1)
+# so every worker shares the member response cache and its counters.
+
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+}
+
+# Whether every worker sees the same cache. The member response cache and the
+# reference cache (creditunion/response_cache.py, reference_cache.py) rely on
+# version numbers bumped by whichever worker handled the write, so they are
+# off unless this is set; a per-process cache would keep serving stale payloads
+# from the other workers. Defaults to True for any backend but local memory.
+SHARED_CACHE = env.bool(
+    'SHARED_CACHE',
+    default=CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache',
+)
+
+# Seconds a cached member payload (dashboard, loan summary) may live
+MEMBER_CACHE_TTL = int(os.getenv("MEMBER_CACHE_TTL", 300))
+
+# Seconds a church / member-list payload is kept; writes invalidate it sooner (creditunion/reference_cache.py)
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", 3600))
+
+# Seconds a response stays replayable under its Idempotency-Key (creditunion/idempotency.py)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 600))
+
+# Seconds a "not blacklisted" refresh-token lookup is cached (creditunion/revocation.py)
+TOKEN_BLACKLIST_CACHE_TTL = int(os.getenv("TOKEN_BLACKLIST_CACHE_TTL", 30))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import CustomUser, Loan, LoanRepayment, Transaction
+
+from . import repayments
+from .models import CustomUser, Loan, LoanRepayment, MemberBalance, PaymentIntent, Transaction
 
 # Register your models here.
 @admin.register(CustomUser)
@@ -10,10 +12,28 @@ class CustomUserAdmin(admin.ModelAdmin):
 
 @admin.register(LoanRepayment)
 class LoanRepaymentAdmin(admin.ModelAdmin):
+    """
+    Repayments are posted through the API, which keeps the loan's totals and
+    schedule in step. Here they can be viewed and deleted; deleting goes
+    through repayments.delete_repayment so the loan is re-derived.
+    """
     list_display =(
         "loan", "member", "amount_paid", "payment_date"
     )
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        repayments.delete_repayment(obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        for repayment_id in queryset.values_list('pk', flat=True):
+            repayments.delete_repayment(repayment_id)
+
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
     """
@@ -28,6 +48,8 @@ class LoanAdmin(admin.ModelAdmin):
         "interest_rate",
         "term",
         "total_amount",
+        "total_repaid",
+        "balance",
         "status",
         "disbursed_date",
         "due_date",
@@ -87,6 +109,28 @@ class TransactionAdmin(admin.ModelAdmin):
 
     ordering = ("-date",)
     date_hierarchy = "date"
-    
-    
-    
\ No newline at end of file
+
+
+
+@admin.register(MemberBalance)
+class MemberBalanceAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the materialized balances.
+    Rebuild them with `python manage.py rebuild_ledger` instead of editing here.
+    """
+    list_display = ("member", "balance", "updated_at")
+    search_fields = ("member__username", "member__email")
+    readonly_fields = ("member", "balance", "updated_at")
+
+
+
+@admin.register(PaymentIntent)
+class PaymentIntentAdmin(admin.ModelAdmin):
+    """
+    Initiated Paystack payments and how they were settled.
+    """
+    list_display = ("reference", "member", "amount", "status", "attempts", "last_checked_at", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("reference", "member__username", "member__email")
+    readonly_fields = ("transaction", "attempts", "last_checked_at", "created_at", "updated_at")
+    ordering = ("-created_at",)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CreditunionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'creditunion'
+
+    def ready(self):
+        from . import signals  # noqa: F401
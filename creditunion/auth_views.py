@@ -12,6 +12,8 @@ from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 from django.contrib.auth import authenticate
 from . models import Member
+from .authentication import with_claims
+from .revocation import CachedRefreshToken
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
@@ -71,7 +73,7 @@ def signup(request):
         'status': True,
         'first_name': first_name,
         'refresh': str(refresh),
-        'access': str(refresh.access_token),
+        'access': str(with_claims(refresh.access_token, user)),
     }, status=status.HTTP_201_CREATED)
 
 
@@ -90,7 +92,7 @@ def signin(request):
     
     refresh = RefreshToken.for_user(user)
     return Response({
-        'access': str(refresh.access_token),
+        'access': str(with_claims(refresh.access_token, user)),
         'refresh': str(refresh),
         'username': user.username,
         'userId': user.id,
@@ -105,7 +107,7 @@ def signin(request):
 def signout(request):
     try:
         refresh_token = request.data["refresh"]
-        token = RefreshToken(refresh_token)
+        token = CachedRefreshToken(refresh_token)
         token.blacklist()
 
         return Response({"message": "logged out successfully", "status": True},
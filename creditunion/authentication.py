@@ -0,0 +1,222 @@
+"""
+Claims-based JWT authentication.
+
+simplejwt's JWTAuthentication loads the CustomUser row on every request.
+Access tokens issued here carry the claims the views need: username, email,
+role flags, church id and member id (see `with_claims`). With those,
+ClaimsJWTAuthentication handles each request as follows:
+
+- Read-only (safe-method) requests get a CustomUser instance built from the
+  claims, with no query. It can't be saved, and fields outside the claims
+  (phone, names, dates) are blank. `user.church` and `user.member` still
+  load lazily by id when a view needs them; the member id itself is
+  available as request.auth['member_id']. Views that read other user fields
+  set `full_user = True` and always get the full row.
+- Requests that change data get the full row, from a bounded in-process TTL
+  cache (`user_cache`). Saving or deleting a user evicts their entry (see
+  signals.py).
+- Tokens issued without the claims fall back to the full row as well.
+- So do tokens whose claims grant an officer or admin role. Those requests
+  reach officer-only data, so `is_active` and the role flags are re-checked
+  against the cached row: a deactivated or demoted officer is refused once
+  their cache entry is evicted (at once in the worker that saved the change,
+  within AUTH_USER_CACHE_TTL elsewhere), not when the token expires.
+
+Member claims can be up to ACCESS_TOKEN_LIFETIME old. Refreshing the token
+re-reads the user, so their changes take effect at the next refresh.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Member
+from .revocation import CachedRefreshToken
+
+User = get_user_model()
+
+# Bumped if the claim layout changes; tokens with another version use the full row
+CLAIMS_VERSION = 1
+VERSION_CLAIM = 'cu'
+ROLE_CLAIMS = ('is_member', 'is_officer', 'is_admin', 'is_staff', 'is_superuser')
+# Roles that open officer/admin views; tokens carrying one are checked against the user row
+PRIVILEGED_CLAIMS = ('is_officer', 'is_admin', 'is_staff', 'is_superuser')
+
+
+def with_claims(access, user):
+    """
+    Adds the user's claims to an access token and returns it.
+    """
+    access[VERSION_CLAIM] = CLAIMS_VERSION
+    access['username'] = user.username
+    access['email'] = user.email
+    for flag in ROLE_CLAIMS:
+        access[flag] = getattr(user, flag)
+    access['church_id'] = user.church_id
+    access['member_id'] = Member.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+    return access
+
+
+def token_user_id(token):
+    """
+    The token's user id as a primary key value (simplejwt stores it as a string).
+    """
+    return User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+
+
+def has_claims(token):
+    return token.get(VERSION_CLAIM) == CLAIMS_VERSION
+
+
+def serves_from_claims(token):
+    """
+    Whether a read-only request with this token can use the claims alone:
+    the claims must be present and grant no officer or admin role.
+    """
+    return has_claims(token) and not any(token.get(flag) for flag in PRIVILEGED_CLAIMS)
+
+
+def read_only(*args, **kwargs):
+    raise RuntimeError("This user was built from token claims and can't be saved; load it from the database.")
+
+
+def user_from_claims(token):
+    """
+    Builds a CustomUser from an access token's claims, without a query.
+    It behaves like a loaded row for reads but refuses save()/delete().
+    """
+    user = User(
+        id=token_user_id(token),
+        username=token['username'],
+        email=token['email'],
+        church_id=token['church_id'],
+        is_active=True,
+        **{flag: token[flag] for flag in ROLE_CLAIMS},
+    )
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    user.save = user.delete = read_only
+    return user
+
+
+class UserCache:
+    """
+    Thread-safe LRU of user rows, each kept for at most `ttl` seconds.
+    Callers get a copy, so a view changing its user can't affect others.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """
+        Returns the cached user, or calls load(user_id) and caches the
+        result. Returns None if load() finds nothing.
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > self.clock():
+                self.entries.move_to_end(user_id)
+                return copy.copy(entry[1])
+
+        user = load(user_id)
+        if user is None:
+            return None
+
+        with self.lock:
+            self.entries[user_id] = (self.clock() + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return copy.copy(user)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves safe requests from the token's claims
+    and everything else from the user cache.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        view = request.parser_context.get('view') if getattr(request, 'parser_context', None) else None
+        if (request.method in SAFE_METHODS and serves_from_claims(validated_token)
+                and not getattr(view, 'full_user', False)):
+            return user_from_claims(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = token_user_id(validated_token)  # matches the pk signals.py evicts by
+        except KeyError:
+            raise AuthenticationFailed(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id, lambda pk: User.objects.filter(**{api_settings.USER_ID_FIELD: pk}).first())
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    /api/token/ with the claims added to the access token.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data['access'] = str(with_claims(AccessToken(data['access']), self.user))
+        return data
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    /api/token/refresh/ re-reads the user, so refreshed access tokens
+    carry current role flags. The blacklist check is cached (revocation.py).
+    """
+
+    token_class = CachedRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: token_user_id(access)}).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        data['access'] = str(with_claims(access, user))
+        return data
@@ -0,0 +1,294 @@
+"""
+Endpoint benchmarks.
+
+Each scenario is sent through Django's test client, with the full middleware
+and authentication stack, against whatever database is configured (normally
+one filled by `generate_synthetic_data`). For each endpoint we record latency
+percentiles over the timed requests. One extra traced request records the SQL
+query count and the peak Python memory, so tracemalloc's overhead never shows
+up in the latency numbers.
+
+Results are plain dicts, so they can be written to JSON and compared with an
+earlier run by `compare()`.
+
+`run_paystack_comparison()` compares the sync and async Paystack initiate
+views against a local PaystackStub with a fixed latency.
+"""
+
+import asyncio
+import contextlib
+import io
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import paystack_client
+from .paystack_stub import PaystackStub
+
+
+HOST = 'localhost'
+
+# (name, method, url, who) where who is 'member', 'officer' or None for anonymous
+SCENARIOS = [
+    ('dashboard', 'get', '/api/member-dashboard/', 'member'),
+    ('loan_summary', 'get', '/api/loan-summary/', 'member'),
+    ('transactions', 'get', '/api/user-transactions/', 'member'),
+    ('loan_list', 'get', '/api/loan-list/', 'officer'),
+    ('loan_queue', 'get', '/api/loan-queue/?status=pending', 'officer'),
+    ('all_members', 'get', '/api/all-members/', 'officer'),
+    ('signin', 'post', '/api/auth-signin/', None),
+]
+
+# Metrics compare() checks; lower is better for all of them
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_memory_kb')
+
+
+def obtain_token(client, username, password):
+    response = client.post('/api/auth-signin/', {'username': username, 'password': password},
+                           content_type='application/json', HTTP_HOST=HOST)
+    if response.status_code != 200:
+        raise ValueError(f"Could not sign in as {username} (HTTP {response.status_code}).")
+    return response.json()['access']
+
+
+def send(client, method, url, headers, credentials):
+    """
+    Sends one request, draining streamed bodies, and returns the response.
+    """
+    if method == 'post':
+        response = client.post(url, credentials, content_type='application/json', HTTP_HOST=HOST)
+    else:
+        response = client.get(url, HTTP_HOST=HOST, **headers)
+    if getattr(response, 'streaming', False):
+        b''.join(response.streaming_content)
+    return response
+
+
+def percentiles(timings_ms):
+    p50, p95, p99 = np.percentile(np.asarray(timings_ms), [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(np.mean(timings_ms)), 3),
+        'max_ms': round(float(np.max(timings_ms)), 3),
+    }
+
+
+def run_scenario(method, url, headers, credentials, iterations, warmup=1, concurrency=1, cold=False):
+    """
+    Benchmarks one endpoint and returns its metrics.
+    With `cold`, the cache is cleared before every request.
+    """
+    client = Client()
+
+    def timed(client):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = send(client, method, url, headers, credentials)
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    def worker(count):
+        # Runs in its own thread, with its own client and database connection
+        try:
+            worker_client = Client()
+            return [timed(worker_client) for _ in range(count)]
+        finally:
+            connection.close()
+
+    for _ in range(warmup):
+        send(client, method, url, headers, credentials)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        shares = [iterations // concurrency + (i < iterations % concurrency) for i in range(concurrency)]
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = [result for batch in pool.map(worker, shares) for result in batch]
+    else:
+        results = [timed(client) for _ in range(iterations)]
+    wall = time.perf_counter() - started
+
+    timings = [elapsed for elapsed, _ in results]
+    statuses = sorted({status for _, status in results})
+
+    # One traced request for query count and peak memory
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            send(client, method, url, headers, credentials)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'method': method.upper(),
+        'status': statuses,
+        'requests': iterations,
+        'concurrency': concurrency,
+        **percentiles(timings),
+        'throughput_rps': round(iterations / wall, 2) if wall else None,
+        'queries': len(ctx),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(member, officer, password, iterations=50, warmup=1, concurrency=1, cold=False, only=None):
+    """
+    Runs every scenario (or those named in `only`) and returns
+    {"meta": {...}, "endpoints": {name: metrics}}.
+    `member` and `officer` are usernames that sign in with `password`.
+    """
+    endpoints = {}
+    # signin prints each request body; keep that out of the output
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = Client()
+        tokens = {
+            'member': obtain_token(client, member, password),
+            'officer': obtain_token(client, officer, password),
+        }
+
+        for name, method, url, who in SCENARIOS:
+            if only and name not in only:
+                continue
+            headers = {'HTTP_AUTHORIZATION': f"Bearer {tokens[who]}"} if who else {}
+            credentials = {'username': member, 'password': password}
+            endpoints[name] = run_scenario(
+                method, url, headers, credentials,
+                iterations=iterations, warmup=warmup, concurrency=concurrency, cold=cold,
+            )
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': connection.vendor,
+            'member': member,
+            'officer': officer,
+            'iterations': iterations,
+            'concurrency': concurrency,
+            'cold_cache': cold,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """
+    Compares two run_benchmarks() results.
+    Returns a list of (endpoint, metric, before, after, change) rows, where
+    change is the relative difference, and a list of the rows that got worse
+    by more than `tolerance` (0.2 = 20%). Any increase in the query count is
+    a regression.
+    """
+    rows, regressions = [], []
+    for name, after in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float('inf'))
+            row = (name, metric, old, new, change)
+            rows.append(row)
+            if (metric == 'queries' and new > old) or (metric != 'queries' and change > tolerance):
+                regressions.append(row)
+    return rows, regressions
+
+
+def _sync_initiations(headers, requests, workers):
+    """
+    Sends `requests` initiations to the sync view from `workers` threads,
+    like a pool of sync gunicorn workers.
+    """
+    def worker(count):
+        try:
+            client = Client()
+            results = []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.post('/api/connect-paystack/', {'amount': 100}, content_type='application/json',
+                                       HTTP_HOST=HOST, **headers)
+                results.append(((time.perf_counter() - started) * 1000, response.status_code))
+            return results
+        finally:
+            connection.close()
+
+    shares = [requests // workers + (i < requests % workers) for i in range(workers)]
+    with ThreadPoolExecutor(workers) as pool:
+        return [result for batch in pool.map(worker, shares) for result in batch]
+
+
+async def _async_initiations(token, requests):
+    """
+    Sends `requests` initiations to the async view, all in flight at once
+    on a single event loop.
+    """
+    client = AsyncClient()
+    headers = {'Authorization': f"Bearer {token}"}  # AsyncClient always sends Host: testserver
+
+    async def one():
+        started = time.perf_counter()
+        response = await client.post('/api/async/connect-paystack/', {'amount': 100},
+                                     content_type='application/json', headers=headers)
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    try:
+        return await asyncio.gather(*(one() for _ in range(requests)))
+    finally:
+        for client_for_loop in list(paystack_client._async_clients.values()):
+            await client_for_loop.aclose()
+
+
+def run_paystack_comparison(member, password, requests=100, workers=8, delay=0.1):
+    """
+    Runs the same number of payment initiations through the sync view
+    (`workers` threads) and the async view (one event loop) against a stub
+    Paystack that takes `delay` seconds per call. Returns wall time,
+    throughput and latency percentiles for both paths.
+    """
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()), PaystackStub(delay=delay) as stub, \
+            override_settings(PAYSTACK_KEY='sk_benchmark', PAYSTACK_BASE_URL=stub.url,
+                              ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        paystack_client.reset_clients()
+        try:
+            token = obtain_token(Client(), member, password)
+            paths = [
+                ('sync', lambda: _sync_initiations({'HTTP_AUTHORIZATION': f"Bearer {token}"}, requests, workers)),
+                ('async', lambda: asyncio.run(_async_initiations(token, requests))),
+            ]
+            for name, run in paths:
+                started = time.perf_counter()
+                timings = run()
+                wall = time.perf_counter() - started
+                results[name] = {
+                    'requests': requests,
+                    'status': sorted({status for _, status in timings}),
+                    'wall_s': round(wall, 3),
+                    'throughput_rps': round(requests / wall, 2),
+                    **percentiles([elapsed for elapsed, _ in timings]),
+                }
+        finally:
+            paystack_client.reset_clients()
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': connection.vendor,
+            'sync_workers': workers,
+            'paystack_delay_s': delay,
+        },
+        'paths': results,
+    }
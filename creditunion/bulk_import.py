@@ -0,0 +1,43 @@
+"""
+Shared input handling for the officer batch-entry endpoints.
+
+A batch is either a JSON array of row objects, or a CSV file uploaded
+as multipart field `file` whose header row names the same fields.
+"""
+
+import csv
+import io
+
+from rest_framework.exceptions import ValidationError
+
+
+MAX_BATCH_ROWS = 5000
+
+
+def read_rows(request):
+    """
+    Returns the batch as a list of dicts, or raises ValidationError
+    if the body is neither a JSON array nor a CSV upload.
+    """
+    upload = request.FILES.get('file') if hasattr(request, 'FILES') else None
+    if upload is not None:
+        try:
+            text = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+            rows = [
+                {key.strip(): (value or '').strip() for key, value in row.items() if key}
+                for row in csv.DictReader(text)
+            ]
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValidationError({"file": f"Could not read CSV: {e}"})
+    elif isinstance(request.data, list):
+        rows = request.data
+    else:
+        raise ValidationError({"detail": "Send a JSON array of rows or a CSV file in the 'file' field."})
+
+    if not rows:
+        raise ValidationError({"detail": "The batch is empty."})
+    if len(rows) > MAX_BATCH_ROWS:
+        raise ValidationError({"detail": f"A batch may contain at most {MAX_BATCH_ROWS} rows."})
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValidationError({"detail": "Every row must be an object."})
+    return rows
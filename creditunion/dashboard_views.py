@@ -1,9 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum
 from datetime import datetime
+import calendar
 from .models import Transaction  # adjust path if needed
+from . import ledger, response_cache
 
 
 
@@ -14,37 +15,25 @@ class MemberDashboardView(APIView):
 
     def get(self, request):
         user = request.user
-        current_year = datetime.now().year
-
-        # 1. Total savings (YTD)
-        total_savings = Transaction.objects.filter(
-            member=user,
-            transaction_type='deposit',
-            date__year=current_year
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        # 2. Total withdrawals (YTD)
-        total_withdrawals = Transaction.objects.filter(
-            member=user,
-            transaction_type='withdrawal',
-            date__year=current_year
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        payload, hit = response_cache.get_or_build('dashboard', user.id, lambda: self.build_payload(user))
+        return Response(payload, headers={'X-Cache': 'HIT' if hit else 'MISS'})
 
-        # 3. Current balance
-        credits = Transaction.objects.filter(
-            member=user,
-            transaction_type__in=['deposit', 'interest_earned']
-        ).aggregate(total=Sum('amount'))['total'] or 0
+    def build_payload(self, user):
+        """
+        Builds the dashboard payload for a member; cached per member by get().
+        """
+        current_year = datetime.now().year
 
-        debits = Transaction.objects.filter(
-            member=user,
-            transaction_type__in=['withdrawal', 'loan_repayment', 'charges']
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        # 1-2. Total savings and withdrawals (YTD), from the monthly rollups
+        monthly_totals = ledger.get_monthly_totals(user, current_year, ['deposit', 'withdrawal'])
+        total_savings = sum(monthly_totals['deposit'].values())
+        total_withdrawals = sum(monthly_totals['withdrawal'].values())
 
-        current_balance = credits - debits
+        # 3. Current balance (materialized, see ledger.py)
+        current_balance = ledger.get_balance(user)
 
         # 4. Recent 6 transactions
-        recent_transactions = Transaction.objects.filter(member=user).order_by('-date')[:6]
+        recent_transactions = Transaction.objects.filter(member=user).order_by('-date', '-id')[:6]
         recent_data = [
             {
                 "id": tx.id,
@@ -57,27 +46,15 @@ class MemberDashboardView(APIView):
         ]
 
         # 5. Monthly savings trend for current year
-        from django.db.models.functions import ExtractMonth
-        savings_by_month = Transaction.objects.filter(
-            member=user,
-            transaction_type='deposit',
-            date__year=current_year
-        ).annotate(month=ExtractMonth('date')).values('month').annotate(
-            total=Sum('amount')
-        ).order_by('month')
-
-        # Map month number to name
-        import calendar
         savings_trend = [
             {
-                "month": calendar.month_name[item["month"]],
-                "amount": float(item["total"])
+                "month": calendar.month_name[month],
+                "amount": float(total)
             }
-            for item in savings_by_month
+            for month, total in sorted(monthly_totals['deposit'].items())
         ]
 
-        # Final response
-        return Response({
+        return {
             "status": True,
             "data": {
                 "summary": {
@@ -88,4 +65,4 @@ class MemberDashboardView(APIView):
                 "recent_transactions": recent_data,
                 "savings_trend": savings_trend,
             }
-        })
+        }
@@ -0,0 +1,18 @@
+import django_filters
+
+from .models import Loan
+
+
+class LoanQueueFilter(django_filters.FilterSet):
+    """
+    Filters for the officer loan queue:
+    ?status=pending&status=active&church=<id>&created_from=YYYY-MM-DD&created_to=YYYY-MM-DD
+    """
+    status = django_filters.MultipleChoiceFilter(choices=Loan.STATUS_CHOICES)
+    church = django_filters.NumberFilter(field_name='member__church')
+    created_from = django_filters.DateFilter(field_name='created_at', lookup_expr='gte')
+    created_to = django_filters.DateFilter(field_name='created_at', lookup_expr='lte')
+
+    class Meta:
+        model = Loan
+        fields = ['status', 'church', 'created_from', 'created_to']
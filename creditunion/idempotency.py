@@ -0,0 +1,143 @@
+"""
+Idempotency-Key support for endpoints that move money.
+
+A client sends an `Idempotency-Key` header (any unique string, e.g. a UUID
+per payment attempt). The first response for a (user, endpoint, key) is kept
+in the cache for settings.IDEMPOTENCY_TTL seconds. Retries and double-clicks
+with the same key get that stored response back, marked with an
+`Idempotent-Replayed: true` header, and the view doesn't run again.
+
+- Reusing a key with a different request body gets a 422.
+- A retry that arrives while the first request is still running gets a 409.
+
+An endpoint can also derive a default key from the request (e.g. the payment
+reference), and it can choose which responses are final enough to store.
+"""
+
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.response import Response
+
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+MAX_KEY_LENGTH = 255
+
+# Seconds an in-flight marker lives, in case the worker dies mid-request
+LOCK_TIMEOUT = 60
+
+KEY_TOO_LONG = {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."}
+IN_PROGRESS = {"detail": "A request with this Idempotency-Key is still in progress."}
+KEY_REUSED = {"detail": f"{HEADER} was already used for a different request."}
+
+
+def successful(status, data):
+    return 200 <= status < 300
+
+
+def request_keys(scope, request, default_key):
+    """
+    Returns (key, cache key, request fingerprint), or None when the request
+    has no key or no authenticated user and so isn't deduplicated.
+    """
+    key = request.headers.get(HEADER) or (default_key(request) if default_key else None)
+    if not key or not request.user.is_authenticated:
+        return None
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    fingerprint = hashlib.sha256(
+        request.method.encode() + request.get_full_path().encode() + request.body
+    ).hexdigest()
+    return key, f"idempotency:{scope}:{request.user.pk}:{digest}", fingerprint
+
+
+def replay(stored, fingerprint, respond=Response):
+    if stored['fingerprint'] != fingerprint:
+        return respond(KEY_REUSED, status=422)
+    response = respond(stored['data'], status=stored['status'])
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def idempotent(scope, default_key=None, store_if=successful):
+    """
+    Decorates a DRF function view (below @api_view / @permission_classes).
+
+    `scope` namespaces the keys per endpoint, `default_key(request)` supplies
+    a key when the header is absent, and `store_if(status, data)` decides
+    whether a response is kept for replay (by default, any 2xx).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            keys = request_keys(scope, request, default_key)
+            if keys is None:
+                return view(request, *args, **kwargs)
+            key, cache_key, fingerprint = keys
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(KEY_TOO_LONG, status=400)
+
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return replay(stored, fingerprint)
+
+            lock_key = f"{cache_key}:lock"
+            if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+                return Response(IN_PROGRESS, status=409)
+            try:
+                response = view(request, *args, **kwargs)
+                if store_if(response.status_code, response.data):
+                    cache.set(cache_key, {
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'data': response.data,
+                    }, settings.IDEMPOTENCY_TTL)
+            finally:
+                cache.delete(lock_key)
+            return response
+        return wrapper
+    return decorator
+
+
+def aidempotent(scope, default_key=None, store_if=successful):
+    """
+    `idempotent` for the async JsonResponse views (paystack_async_views.py),
+    which must set request.user before it runs. Keys are shared with the
+    sync view of the same scope.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            keys = request_keys(scope, request, default_key)
+            if keys is None:
+                return await view(request, *args, **kwargs)
+            key, cache_key, fingerprint = keys
+            if len(key) > MAX_KEY_LENGTH:
+                return JsonResponse(KEY_TOO_LONG, status=400)
+
+            stored = await cache.aget(cache_key)
+            if stored is not None:
+                return replay(stored, fingerprint, respond=JsonResponse)
+
+            lock_key = f"{cache_key}:lock"
+            if not await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+                return JsonResponse(IN_PROGRESS, status=409)
+            try:
+                response = await view(request, *args, **kwargs)
+                data = json.loads(response.content)
+                if store_if(response.status_code, data):
+                    await cache.aset(cache_key, {
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'data': data,
+                    }, settings.IDEMPOTENCY_TTL)
+            finally:
+                await cache.adelete(lock_key)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,290 @@
+"""
+Materialized ledger tables derived from Transaction rows.
+
+MemberBalance holds each member's current balance and MonthlyRollup their
+per-month totals by transaction type, so read paths don't have to aggregate a
+member's whole transaction history on every request. Writes go
+through `apply_transactions`, which the Transaction signal handlers call for
+single rows and bulk paths can call once per batch.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import MemberBalance, MonthlyRollup, Transaction
+
+
+CREDIT_TYPES = ('deposit', 'interest_earned')
+DEBIT_TYPES = ('withdrawal', 'loan_repayment', 'charges')
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+def signed_amount(transaction_type, amount):
+    """
+    Returns the effect of a transaction on the member's balance:
+    credits are positive, debits negative.
+    """
+    amount = Decimal(str(amount))
+    if transaction_type in CREDIT_TYPES:
+        return amount
+    if transaction_type in DEBIT_TYPES:
+        return -amount
+    return ZERO
+
+
+def to_cents(value):
+    """
+    Normalizes an aggregated amount to 2 decimal places. SQLite sums
+    decimals as floats, so database totals can carry binary noise.
+    """
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def ledger_row(tx):
+    """
+    Returns the (member_id, transaction_type, amount, date) tuple
+    the ledger needs from a Transaction instance.
+    """
+    return (tx.member_id, tx.transaction_type, tx.amount, models.DateField().to_python(tx.date))
+
+
+def apply_transactions(added=(), removed=()):
+    """
+    Applies ledger rows to the materialized tables in one atomic step.
+
+    `added` and `removed` are iterables of (member_id, transaction_type, amount, date).
+    Deltas are folded per member and per rollup bucket first, so a batch of
+    any size costs one UPDATE per affected member and month.
+    """
+    balance_deltas = defaultdict(Decimal)
+    rollup_deltas = defaultdict(lambda: [Decimal('0'), 0])
+
+    for sign, rows in ((1, added), (-1, removed)):
+        for member_id, transaction_type, amount, tx_date in rows:
+            balance_deltas[member_id] += sign * signed_amount(transaction_type, amount)
+            bucket = rollup_deltas[(member_id, tx_date.year, tx_date.month, transaction_type)]
+            bucket[0] += sign * Decimal(str(amount))
+            bucket[1] += sign
+
+    with transaction.atomic():
+        # Sorted so concurrent writers always lock rows in the same order
+        for member_id in sorted(balance_deltas):
+            delta = balance_deltas[member_id]
+            if delta:
+                _apply_balance_delta(member_id, delta)
+
+        for key in sorted(rollup_deltas):
+            total, count = rollup_deltas[key]
+            if total or count:
+                _apply_rollup_delta(key, total, count)
+
+
+def _apply_balance_delta(member_id, delta):
+    updated = MemberBalance.objects.filter(member_id=member_id).update(
+        balance=F('balance') + delta,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # First transaction for this member; the unique member column makes this race-safe
+        MemberBalance.objects.get_or_create(member_id=member_id)
+        MemberBalance.objects.filter(member_id=member_id).update(
+            balance=F('balance') + delta,
+            updated_at=timezone.now(),
+        )
+
+
+def _apply_rollup_delta(key, total, count):
+    member_id, year, month, transaction_type = key
+    bucket = MonthlyRollup.objects.filter(
+        member_id=member_id, year=year, month=month, transaction_type=transaction_type,
+    )
+    updated = bucket.update(total=F('total') + total, count=F('count') + count)
+    if not updated:
+        MonthlyRollup.objects.get_or_create(
+            member_id=member_id, year=year, month=month, transaction_type=transaction_type,
+        )
+        bucket.update(total=F('total') + total, count=F('count') + count)
+
+
+def get_balance(member):
+    """
+    Returns the materialized balance for a member (0 if they have no transactions).
+    """
+    balance = MemberBalance.objects.filter(member=member).values_list('balance', flat=True).first()
+    return balance if balance is not None else ZERO
+
+
+def get_monthly_totals(member, year, transaction_types):
+    """
+    Returns {transaction_type: {month: total}} for one member and year,
+    read from the rollup table in a single query.
+    """
+    totals = {transaction_type: {} for transaction_type in transaction_types}
+    rows = MonthlyRollup.objects.filter(
+        member=member, year=year, transaction_type__in=transaction_types,
+    ).values_list('transaction_type', 'month', 'total')
+    for transaction_type, month, total in rows:
+        if total:
+            totals[transaction_type][month] = total
+    return totals
+
+
+def signed_amount_expression():
+    """
+    SQL counterpart of signed_amount(), for aggregating balances in the database.
+    """
+    return Case(
+        When(transaction_type__in=CREDIT_TYPES, then=F('amount')),
+        When(transaction_type__in=DEBIT_TYPES, then=-F('amount')),
+        default=Value(ZERO),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def balance_before(member_id, day):
+    """
+    Returns a member's balance from all transactions dated before `day`.
+    """
+    total = Transaction.objects.filter(member_id=member_id, date__lt=day).aggregate(
+        total=Sum(signed_amount_expression())
+    )['total']
+    return to_cents(total)
+
+
+def compute_balances():
+    """
+    Recomputes every member's balance from the raw Transaction ledger.
+    Returns a dict of member_id -> Decimal.
+    """
+    rows = (
+        Transaction.objects.order_by()
+        .values('member_id')
+        .annotate(balance=Sum(signed_amount_expression()))
+        .values_list('member_id', 'balance')
+    )
+    return {member_id: to_cents(balance) for member_id, balance in rows}
+
+
+def lock_ledger():
+    """
+    Holds off Transaction writes, and with them the signal handlers' ledger
+    deltas, until the current database transaction ends. A rebuild computed
+    and written under this lock can't lose a delta applied meanwhile.
+
+    Postgres: Transaction is locked in SHARE mode (reads still go through),
+    then the ledger tables EXCLUSIVE, in the same order writers touch them.
+    SQLite: nothing to do; atomic blocks start as write transactions
+    (transaction_mode IMMEDIATE in settings), which already locks out every
+    other writer.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{Transaction._meta.db_table}" IN SHARE MODE')
+        cursor.execute(
+            f'LOCK TABLE "{MemberBalance._meta.db_table}", "{MonthlyRollup._meta.db_table}" IN EXCLUSIVE MODE'
+        )
+
+
+def rebuild_balances(batch_size=1000):
+    """
+    Replaces the MemberBalance table with balances recomputed from Transaction.
+    Returns the number of rows written.
+    """
+    with transaction.atomic():
+        lock_ledger()
+        expected = compute_balances()
+        MemberBalance.objects.all().delete()
+        MemberBalance.objects.bulk_create(
+            [MemberBalance(member_id=member_id, balance=balance) for member_id, balance in expected.items()],
+            batch_size=batch_size,
+        )
+    return len(expected)
+
+
+def compute_rollups():
+    """
+    Recomputes every monthly bucket from the raw Transaction ledger.
+    Returns a dict of (member_id, year, month, transaction_type) -> (total, count).
+    """
+    rows = (
+        Transaction.objects.order_by()
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('member_id', 'year', 'month', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .values_list('member_id', 'year', 'month', 'transaction_type', 'total', 'count')
+    )
+    return {
+        (member_id, year, month, transaction_type): (to_cents(total), count)
+        for member_id, year, month, transaction_type, total, count in rows
+    }
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Replaces the MonthlyRollup table with buckets recomputed from Transaction.
+    Returns the number of rows written.
+    """
+    with transaction.atomic():
+        lock_ledger()
+        expected = compute_rollups()
+        MonthlyRollup.objects.all().delete()
+        MonthlyRollup.objects.bulk_create(
+            [
+                MonthlyRollup(
+                    member_id=member_id, year=year, month=month,
+                    transaction_type=transaction_type, total=total, count=count,
+                )
+                for (member_id, year, month, transaction_type), (total, count) in expected.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(expected)
+
+
+def verify_balances():
+    """
+    Compares stored balances against the raw ledger.
+    Returns a list of (member_id, stored, expected) for every mismatch.
+    """
+    expected = compute_balances()
+    stored = dict(MemberBalance.objects.values_list('member_id', 'balance'))
+
+    mismatches = []
+    for member_id in sorted(set(expected) | set(stored)):
+        want = expected.get(member_id, ZERO)
+        have = stored.get(member_id, ZERO)
+        if want != have:
+            mismatches.append((member_id, have, want))
+    return mismatches
+
+
+def verify_rollups():
+    """
+    Compares stored monthly buckets against the raw ledger.
+    Returns a list of (key, stored, expected) for every mismatch, where
+    stored/expected are (total, count) pairs.
+    """
+    expected = compute_rollups()
+    stored = {
+        (member_id, year, month, transaction_type): (total, count)
+        for member_id, year, month, transaction_type, total, count in MonthlyRollup.objects.values_list(
+            'member_id', 'year', 'month', 'transaction_type', 'total', 'count',
+        )
+    }
+
+    empty = (ZERO, 0)
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, empty)
+        have = stored.get(key, empty)
+        if want != have:
+            mismatches.append((key, have, want))
+    return mismatches
@@ -1,13 +1,20 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from decimal import ROUND_HALF_UP, Decimal, getcontext, InvalidOperation
+from decimal import Decimal
 
-from .models import Loan, LoanRepayment, Member
+from .models import Loan, Member
 from datetime import date
 from django.db import models
-from dateutil.relativedelta import relativedelta 
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from .filters import LoanQueueFilter
+from .pagination import LoanCursorPagination
+from .permissions import IsOfficer
 from .serializers import LoanListSerializer
+from . import response_cache, schedules
 
 
 
@@ -22,83 +29,59 @@ from .serializers import LoanListSerializer
 def loan_summary(request):
     user = request.user
     
-    print(user)
-    
-    
     member = getattr(user, 'member', None)  # adjust if you use a related profile
-    print(f"user: {request.user}, type: {type(request.user)}")  # Should be CustomUser
-    print(f"member: {member}, type: {type(member)}")  # Should be Member
-    print(f"member.user: {member.user}, type: {type(member.user)}")  # Should be CustomUser
 
     if not member:
         return Response({"detail": "Member profile not found."}, status=400)
     
-   
-    # Get active loan
+
     if not isinstance(member, Member):
         return Response({"detail": "Invalid member instance."}, status=400)
-    
-    active_loan = Loan.objects.filter(member=member.user, status='active').first()
+
+    payload, hit = response_cache.get_or_build('loan_summary', user.id, lambda: build_loan_summary(member))
+    return Response(payload, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+
+
+def build_loan_summary(member):
+    """
+    Builds the active loan and loan history payload for a member.
+    Cached per member by loan_summary().
+    """
+    # Active and completed loans with their repayment totals, in a single query
+    loans = list(
+        Loan.objects.filter(member=member.user, status__in=['active', 'completed'])
+        .annotate(paid_total=Coalesce(
+            models.Sum('repayments__amount_paid'),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ))
+        .order_by('-created_at')
+    )
+
+    # Get active loan
+    active_loan = next((loan for loan in loans if loan.status == 'active'), None)
     active_loan_data = None
 
     
     
     if active_loan:
-        total_repayment = active_loan.total_amount
-        paid_amount = LoanRepayment.objects.filter(loan=active_loan).aggregate(
-            total=models.Sum('amount_paid')
-        )['total'] or Decimal('0.00')
-        
-        
-        getcontext().prec = 2  # set precision if needed
-        
-        # term_years = Decimal(active_loan.term) / Decimal(12)
-        # total_amount = active_loan.amount * (Decimal(1) + active_loan.interest_rate) 
-        # total_amount = float(total_amount) 
+        paid_amount = active_loan.paid_total
         
         
         term_years = Decimal(active_loan.term) / Decimal(12)
         total_amount = active_loan.amount + (active_loan.amount * (active_loan.interest_rate/100) * term_years) 
         total_amount = float(total_amount)  
-        
-        print(active_loan.amount, active_loan.interest_rate, term_years, active_loan.term )
-        
 
-        try:
-            # Ensure numeric values are properly converted to Decimal
-            total_repayment = Decimal(str(total_repayment))
-            term = Decimal(active_loan.term)
-            
-            if term <= 0:
-                monthly_amount = Decimal('0')
-            else:
-                monthly_amount = total_repayment / term
-            
-            paid_installments = int(paid_amount / monthly_amount) if monthly_amount else 0
-            next_installment_number = paid_installments + 1
-
-            if next_installment_number <= active_loan.term:
-                next_payment_date = active_loan.created_at + relativedelta(months=+next_installment_number)
-                try:
-                    quantized_amount = float(monthly_amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
-                    next_payment = {
-                        "date": next_payment_date.strftime("%Y-%m-%d"),
-                        "amount": quantized_amount
-                    }
-                except InvalidOperation:
-                    next_payment = {
-                        "date": next_payment_date.strftime("%Y-%m-%d"),
-                        "amount": float(monthly_amount)
-                    }
-            else:
-                next_payment = None  # fully paid
-
-        except (InvalidOperation, TypeError, ValueError) as e:
-            # Log the error for debugging
-            print(f"Error calculating payment: {e}")
-            next_payment = None
-            
-    
+        # Next payment and arrears come from the installment schedule
+        next_installment, arrears = schedules.schedule_position(active_loan, date.today())
+        if next_installment:
+            next_payment = {
+                "date": next_installment.due_date.strftime("%Y-%m-%d"),
+                "amount": float(next_installment.amount_outstanding)
+            }
+        else:
+            next_payment = None  # fully paid
 
         active_loan_data = {
             "id": f"LN-{active_loan.created_at.year}-{active_loan.id:04}",
@@ -109,18 +92,16 @@ def loan_summary(request):
             'totalAmount' : float(total_amount), #compound
             "totalRepayments": float(paid_amount),
             "paidAmount": float(paid_amount),
-            "nextPayment": next_payment
+            "nextPayment": next_payment,
+            "arrears": float(arrears)
         }
 
 
-    # Get loan history (completed loans)
-    history_qs = Loan.objects.filter( member=member.user, status__in=['active', 'completed'] ).order_by('-created_at')
+    # Get loan history (active and completed loans)
     loan_history = []
 
-    for loan in history_qs:
-        total_paid = LoanRepayment.objects.filter(loan=loan).aggregate(
-            total=models.Sum('amount_paid')
-        )['total'] or Decimal('0.00')
+    for loan in loans:
+        total_paid = loan.paid_total
 
         interest_paid = total_paid - loan.amount
 
@@ -133,10 +114,10 @@ def loan_summary(request):
             "dateClosed": loan.due_date.strftime("%Y-%m-%d")
         })
 
-    return Response({
+    return {
         "activeLoan": active_loan_data,
         "loanHistory": loan_history
-    })
+    }
 
 
 
@@ -175,6 +156,21 @@ def loan_list(request):
     """
     Returns all loans with statuses active, pending, or rejected.
     """
-    loans = Loan.objects.filter(status__in=['active', 'pending', 'rejected']).select_related('member')
+    # member__member: the serializer reads the member profile of every loan
+    loans = Loan.objects.filter(status__in=['active', 'pending', 'rejected']).select_related('member__member')
     serializer = LoanListSerializer(loans, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response(serializer.data)
+
+
+
+class LoanQueueView(generics.ListAPIView):
+    """
+    Officer loan queue: /api/loan-queue/, filtered by status, church and
+    request date (see LoanQueueFilter), newest first, one cursor page at a time.
+    """
+    serializer_class = LoanListSerializer
+    permission_classes = [IsOfficer]
+    pagination_class = LoanCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = LoanQueueFilter
+    queryset = Loan.objects.select_related('member__member')
\ No newline at end of file
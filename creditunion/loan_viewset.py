@@ -5,12 +5,26 @@ from rest_framework.decorators import action
 from django.utils.timezone import now
 from dateutil.relativedelta import relativedelta
 
-from .models import Loan, CustomUser
-from .serializers import LoanSerializer,  LoanRepaymentSerializer, LoanRepayment
+from django.db import transaction
+
+from .models import Loan, CustomUser, LoanInstallment
+from . import bulk_import, repayments, response_cache, schedules
+from .permissions import IsOfficer
+from .serializers import (
+    LoanSerializer, LoanDecisionSerializer, LoanRepaymentSerializer, LoanRepaymentImportSerializer, LoanRepayment,
+)
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 
+# action -> (statuses it applies to, resulting status, error for other statuses)
+DECISIONS = {
+    'approve': (['pending'], 'active', 'Only pending loans can be approved.'),
+    'reject': (['pending'], 'rejected', 'Only pending loans can be rejected.'),
+    'cancel': (['pending', 'active'], 'cancelled', 'Only pending or active loans can be cancelled.'),
+}
+
+
 class LoanViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing loan operations:
@@ -60,27 +74,31 @@ class LoanViewSet(viewsets.ModelViewSet):
     def approve(self, request, pk=None):
         """
         Approve a pending loan.
-        Sets disbursed date and due date. Changes status to 'active'.
+        Sets disbursed date and due date, changes status to 'active'
+        and generates the installment schedule.
         """
-        loan = self.get_object()
+        with transaction.atomic():
+            loan = self.get_object()
+            loan = Loan.objects.select_for_update().get(pk=loan.pk)
 
-        # Ensure only pending loans can be approved
-        if loan.status != 'pending':
-            return Response(
-                {'detail': 'Only pending loans can be approved.'},
-                status=400
-            )
+            # Ensure only pending loans can be approved
+            if loan.status != 'pending':
+                return Response(
+                    {'detail': 'Only pending loans can be approved.'},
+                    status=400
+                )
 
-        # If created_at is missing for any reason, set it
-        if not loan.created_at:
-            loan.created_at = now()
+            # If created_at is missing for any reason, set it
+            if not loan.created_at:
+                loan.created_at = now()
 
-        # Set approval details
-        loan.status = 'active'
-        loan.disbursed_date = now().date()
-        loan.due_date = loan.disbursed_date + relativedelta(months=loan.term)
+            # Set approval details
+            loan.status = 'active'
+            loan.disbursed_date = now().date()
+            loan.due_date = loan.disbursed_date + relativedelta(months=loan.term)
 
-        loan.save()
+            loan.save()
+            schedules.create_schedule(loan)
 
         return Response(
             {'detail': 'Loan approved successfully.'},
@@ -116,6 +134,69 @@ class LoanViewSet(viewsets.ModelViewSet):
         loan.save()
         return Response({'detail': 'Loan cancelled.'}, status=200)
 
+
+
+    @action(detail=False, methods=['post'], permission_classes=[IsOfficer])
+    def decide(self, request):
+        """
+        Approve, reject or cancel many loans at once, e.g. after a credit
+        committee meeting: {"action": "approve", "loans": [12, 15, 19]}.
+        The loans are locked and checked together, then updated (and approved
+        loans given their schedules) with bulk writes in one transaction.
+        Loans that can't take the action are skipped and reported per loan.
+        """
+        serializer = LoanDecisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        decision = serializer.validated_data['action']
+        loan_ids = list(dict.fromkeys(serializer.validated_data['loans']))
+
+        # Like the single-loan reject/cancel actions, these need staff
+        if decision != 'approve' and not request.user.is_staff:
+            return Response({'detail': 'Only staff can reject or cancel loans.'}, status=403)
+
+        allowed, new_status, error = DECISIONS[decision]
+        today = now().date()
+
+        with transaction.atomic():
+            # Locked in id order so concurrent batches can't deadlock
+            loans = {
+                loan.pk: loan
+                for loan in Loan.objects.select_for_update().filter(pk__in=loan_ids).order_by('pk')
+            }
+
+            results, changed = [], []
+            for loan_id in loan_ids:
+                loan = loans.get(loan_id)
+                if loan is None:
+                    results.append({'id': loan_id, 'ok': False, 'detail': 'Loan not found.'})
+                    continue
+                if loan.status not in allowed:
+                    results.append({'id': loan_id, 'ok': False, 'detail': error})
+                    continue
+
+                loan.status = new_status
+                if decision == 'approve':
+                    loan.disbursed_date = today
+                    loan.due_date = today + relativedelta(months=loan.term)
+                changed.append(loan)
+                results.append({'id': loan_id, 'ok': True, 'status': new_status})
+
+            fields = ['status', 'disbursed_date', 'due_date'] if decision == 'approve' else ['status']
+            Loan.objects.bulk_update(changed, fields)
+            if decision == 'approve':
+                LoanInstallment.objects.bulk_create(
+                    [installment for loan in changed for installment in schedules.build_installments(loan)]
+                )
+            # bulk_update skips the signals that normally refresh member dashboards
+            response_cache.bump_versions(loan.member_id for loan in changed)
+
+        return Response({
+            'action': decision,
+            'updated': len(changed),
+            'failed': len(results) - len(changed),
+            'results': results,
+        }, status=200)
+
     
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
@@ -205,6 +286,43 @@ class LoanRepaymentViewSet(viewsets.ModelViewSet):
         # Save repayment with active loan
         serializer.save(loan=active_loan, member=member)
 
+    def perform_destroy(self, instance):
+        # Reverses the repayment's effect on the loan's totals and schedule
+        repayments.delete_repayment(instance.pk)
 
 
 
+    @action(detail=False, methods=['post'], permission_classes=[IsOfficer])
+    def bulk(self, request):
+        """
+        Batch posting for payroll deductions and group collections: accepts
+        a JSON array or CSV upload of {member, amount_paid, payment_date}
+        rows. Every member's active loan is resolved and locked in one query,
+        and the valid rows are written with bulk inserts and updates in one
+        transaction (see repayments.record_repayments).
+        Returns per-row errors for the rows that were skipped.
+        """
+        rows = bulk_import.read_rows(request)
+        raw_ids = {str(row.get('member', '')).strip() for row in rows}
+        candidate_ids = [int(value) for value in raw_ids if value.isdigit()]
+
+        with transaction.atomic():
+            loans = repayments.lock_active_loans(candidate_ids)
+
+            entries, errors = [], {}
+            for index, row in enumerate(rows):
+                serializer = LoanRepaymentImportSerializer(data=row, context={'loans': loans})
+                if not serializer.is_valid():
+                    errors[index] = serializer.errors
+                    continue
+                data = serializer.validated_data
+                entries.append((index, data['member'], data['amount_paid'], data.get('payment_date')))
+
+            created, rejected = repayments.record_repayments(loans, entries)
+            errors.update({index: {"loan": [error]} for index, error in rejected.items()})
+
+        return Response({
+            "created": len(created),
+            "failed": len(errors),
+            "errors": [{"row": index, "errors": errors[index]} for index in sorted(errors)],
+        }, status=201 if created else 400)
@@ -0,0 +1,80 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditunion import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot API endpoints (latency percentiles, query count, peak memory) "
+        "against the local database, e.g. one filled by generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--member', default='synth_member0', help="Username for member endpoints and signin.")
+        parser.add_argument('--officer', default='synth_officer0', help="Username for officer endpoints.")
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint first.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Threads sending requests at once.")
+        parser.add_argument('--cold', action='store_true', help="Clear the cache before every request.")
+        parser.add_argument(
+            '--only', nargs='+', choices=[name for name, *_ in benchmarks.SCENARIOS],
+            help="Benchmark only these endpoints.",
+        )
+        parser.add_argument('--output', default='benchmark-results.json', help="Where to write the JSON results.")
+        parser.add_argument('--baseline', help="Earlier results file to compare against.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Relative slowdown that counts as a regression (0.2 = 20%%).",
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        try:
+            results = benchmarks.run_benchmarks(
+                member=options['member'],
+                officer=options['officer'],
+                password=options['password'],
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                concurrency=options['concurrency'],
+                cold=options['cold'],
+                only=options['only'],
+            )
+        except ValueError as exc:
+            raise CommandError(f"{exc} Run generate_synthetic_data first or pass --member/--officer/--password.")
+
+        for name, metrics in results['endpoints'].items():
+            self.stdout.write(
+                f"{name}: p50 {metrics['p50_ms']:.1f}ms, p95 {metrics['p95_ms']:.1f}ms, "
+                f"p99 {metrics['p99_ms']:.1f}ms, {metrics['throughput_rps']} req/s, "
+                f"{metrics['queries']} queries, peak {metrics['peak_memory_kb']:.0f} KiB, "
+                f"HTTP {'/'.join(map(str, metrics['status']))}"
+            )
+
+        with open(options['output'], 'w') as fh:
+            json.dump(results, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
+
+        if not options['baseline']:
+            return
+
+        with open(options['baseline']) as fh:
+            baseline = json.load(fh)
+        for setting in ('database', 'concurrency', 'cold_cache'):
+            if baseline.get('meta', {}).get(setting) != results['meta'][setting]:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ Baseline was run with a different {setting}; the numbers may not be comparable."
+                ))
+        rows, regressions = benchmarks.compare(baseline, results, tolerance=options['tolerance'])
+        for name, metric, before, after, change in rows:
+            self.stdout.write(f"  {name}.{metric}: {before} -> {after} ({change:+.1%})")
+
+        if regressions:
+            names = ", ".join(f"{name}.{metric}" for name, metric, *_ in regressions)
+            raise CommandError(f"Regressed against {options['baseline']}: {names}")
+        self.stdout.write(self.style.SUCCESS("✅ No regressions against the baseline."))
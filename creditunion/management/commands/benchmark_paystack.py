@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditunion import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync and async Paystack initiate views against a local Paystack stub "
+        "with a fixed response delay."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--member', default='synth_member0', help="Username that initiates the payments.")
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--requests', type=int, default=100, help="Initiations per path.")
+        parser.add_argument('--workers', type=int, default=8, help="Threads serving the sync path (worker pool).")
+        parser.add_argument('--delay', type=float, default=0.1, help="Seconds the stub takes per Paystack call.")
+        parser.add_argument('--output', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['workers'] < 1:
+            raise CommandError("--requests and --workers must be at least 1.")
+
+        try:
+            results = benchmarks.run_paystack_comparison(
+                options['member'], options['password'],
+                requests=options['requests'], workers=options['workers'], delay=options['delay'],
+            )
+        except ValueError as exc:
+            raise CommandError(f"{exc} Run generate_synthetic_data first or pass --member/--password.")
+
+        for name, metrics in results['paths'].items():
+            self.stdout.write(
+                f"{name}: {metrics['requests']} initiations in {metrics['wall_s']:.2f}s "
+                f"({metrics['throughput_rps']} req/s), p50 {metrics['p50_ms']:.0f}ms, "
+                f"p95 {metrics['p95_ms']:.0f}ms, p99 {metrics['p99_ms']:.0f}ms, "
+                f"HTTP {'/'.join(map(str, metrics['status']))}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
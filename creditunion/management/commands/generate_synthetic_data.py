@@ -0,0 +1,322 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+import multiprocessing
+
+import django
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from creditunion import ledger, schedules
+from creditunion.models import Church, CustomUser, Loan, LoanInstallment, LoanRepayment, Member, Transaction
+
+
+TRANSACTION_TYPES = ['deposit', 'withdrawal', 'loan_repayment', 'charges', 'interest_earned']
+TRANSACTION_WEIGHTS = [0.55, 0.2, 0.1, 0.05, 0.1]
+
+# Lognormal (mean, sigma) of the amount for each type; deposits cluster around ~100
+AMOUNT_PARAMS = {
+    'deposit': (4.6, 0.8),
+    'withdrawal': (4.8, 0.9),
+    'loan_repayment': (4.9, 0.5),
+    'charges': (1.6, 0.4),
+    'interest_earned': (1.2, 0.7),
+}
+
+LOAN_TERMS = [3, 6, 6, 12, 12, 12, 18, 24]
+
+# Current loan per borrower, if any (None: no open loan)
+OPEN_LOAN_STATUSES = ['active', 'pending', 'rejected', None]
+OPEN_LOAN_WEIGHTS = [0.6, 0.15, 0.05, 0.2]
+
+
+def _init_worker():
+    """
+    Each worker process opens its own database connection.
+    """
+    django.setup()
+    connections.close_all()
+
+
+def _insert_transactions(task):
+    """
+    Generates and inserts one chunk of transactions.
+    Runs in a worker process (or inline when --workers is 1).
+    `task` is (chunk index, seed sequence, rows, member ids, member weights,
+    officer ids, start ordinal, days, chunk size, username prefix).
+    """
+    chunk, seed, rows, member_ids, member_weights, officer_ids, start_ordinal, days, chunk_size, prefix = task
+    rng = np.random.default_rng(seed)
+
+    members = rng.choice(member_ids, size=rows, p=member_weights)
+    officers = rng.choice(officer_ids, size=rows) if len(officer_ids) else np.zeros(rows, dtype=np.int64)
+    types = rng.choice(len(TRANSACTION_TYPES), size=rows, p=TRANSACTION_WEIGHTS)
+    day_offsets = rng.integers(0, days, size=rows)
+
+    amounts = np.empty(rows)
+    for index, tx_type in enumerate(TRANSACTION_TYPES):
+        mask = types == index
+        mean, sigma = AMOUNT_PARAMS[tx_type]
+        amounts[mask] = rng.lognormal(mean, sigma, size=int(mask.sum()))
+    amounts = np.clip(np.round(amounts, 2), 1, 99_999_999)
+
+    transactions = [
+        Transaction(
+            member_id=int(members[i]),
+            account_officer_id=int(officers[i]) or None,
+            transaction_type=TRANSACTION_TYPES[types[i]],
+            amount=Decimal(f"{amounts[i]:.2f}"),
+            date=date.fromordinal(start_ordinal + int(day_offsets[i])),
+            reference=f"SYN-{prefix}-{chunk}-{i}",  # distinct across runs
+            notes=f"Synthetic {TRANSACTION_TYPES[types[i]]}",
+        )
+        for i in range(rows)
+    ]
+    Transaction.objects.bulk_create(transactions, batch_size=chunk_size)
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, reproducible synthetic dataset (churches, members, loans with "
+        "repayment histories, transactions) for capacity planning and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--churches', type=int, default=10)
+        parser.add_argument('--members', type=int, default=1000)
+        parser.add_argument('--transactions', type=int, default=100_000)
+        parser.add_argument(
+            '--loan-ratio', type=float, default=0.4,
+            help="Share of members with a loan history.",
+        )
+        parser.add_argument('--years', type=int, default=3, help="How far back the history goes.")
+        parser.add_argument('--seed', type=int, default=42, help="Same seed, same dataset.")
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help="Processes inserting transactions in parallel (PostgreSQL; SQLite always uses 1).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk_create batch.")
+        parser.add_argument('--prefix', default='synth', help="Username prefix for generated users.")
+        parser.add_argument('--password', default='password123', help="Password for every generated user.")
+
+    def handle(self, *args, **options):
+        """
+        Writes everything with chunked bulk_create, then rebuilds the
+        materialized balances and monthly rollups once at the end.
+        Transactions are generated in independently seeded chunks, so the
+        data is the same for a given --seed whatever the --workers count.
+        """
+        prefix = options['prefix']
+        if CustomUser.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Users prefixed '{prefix}_' already exist; use another --prefix or a fresh database.")
+        if options['members'] < 1 or options['churches'] < 1:
+            raise CommandError("--members and --churches must be at least 1.")
+
+        started = time.monotonic()
+        rng = np.random.default_rng(options['seed'])
+        chunk_size = options['chunk_size']
+        today = date.today()
+        start = today - timedelta(days=365 * options['years'])
+
+        churches = self.create_churches(options['churches'], prefix, chunk_size)
+        officer_ids, member_ids = self.create_users(rng, options, churches, chunk_size)
+        self.stdout.write(f"👥 {len(member_ids)} members and {len(officer_ids)} officers in {len(churches)} churches")
+
+        loans = self.create_loans(rng, options, member_ids, officer_ids, start, today, chunk_size)
+        self.stdout.write(f"💳 {loans} loans with repayment histories")
+
+        count = self.create_transactions(options, member_ids, officer_ids, start, today, chunk_size)
+        self.stdout.write(f"🧾 {count} transactions")
+
+        ledger.rebuild_balances(batch_size=chunk_size)
+        ledger.rebuild_rollups(batch_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Synthetic dataset generated in {time.monotonic() - started:.1f}s (seed {options['seed']})."
+        ))
+
+    def create_churches(self, count, prefix, chunk_size):
+        return Church.objects.bulk_create(
+            [Church(name=f"{prefix.title()} Church {i + 1}", location=f"District {i % 7 + 1}") for i in range(count)],
+            batch_size=chunk_size,
+        )
+
+    def create_users(self, rng, options, churches, chunk_size):
+        """
+        Creates one officer per church and the members, spread unevenly
+        across churches. Returns (officer ids, member ids).
+        """
+        prefix = options['prefix']
+        password = make_password(options['password'])  # hashed once, shared by every user
+
+        church_weights = rng.dirichlet(np.ones(len(churches)) * 2)
+        member_churches = rng.choice(len(churches), size=options['members'], p=church_weights)
+
+        officers = [
+            CustomUser(
+                username=f"{prefix}_officer{i}", password=password, is_member=False,
+                is_officer=True, church=church, email=f"{prefix}_officer{i}@example.com",
+            )
+            for i, church in enumerate(churches)
+        ]
+        members = [
+            CustomUser(
+                username=f"{prefix}_member{i}", password=password, church=churches[member_churches[i]],
+                first_name=f"M{i}"[:10], last_name=f"Synthetic{i}", email=f"{prefix}_member{i}@example.com",
+                phone=f"05{i:08d}",
+            )
+            for i in range(options['members'])
+        ]
+
+        with transaction.atomic():
+            officers = CustomUser.objects.bulk_create(officers, batch_size=chunk_size)
+            members = CustomUser.objects.bulk_create(members, batch_size=chunk_size)
+            Member.objects.bulk_create(
+                [
+                    Member(
+                        user=user, full_name=f"Synthetic Member {i}",
+                        membership_number=f"SYN-{options['seed']}-{prefix}-{i:07d}",
+                        occupation="Trader",
+                    )
+                    for i, user in enumerate(members)
+                ],
+                batch_size=chunk_size,
+            )
+        return [officer.id for officer in officers], [member.id for member in members]
+
+    def create_loans(self, rng, options, member_ids, officer_ids, start, today, chunk_size):
+        """
+        Gives a share of members 0-3 completed loans and possibly one open loan
+        (active, pending or rejected). Active loans get a schedule and monthly
+        repayments, with about one in five falling behind.
+        Returns the number of loans created.
+        """
+        borrowers = [
+            member_id for member_id in member_ids
+            if rng.random() < options['loan_ratio']
+        ]
+
+        loans, repayment_plan = [], []
+        for member_id in borrowers:
+            cursor = start + timedelta(days=int(rng.integers(0, 120)))
+            for _ in range(int(rng.integers(0, 4))):
+                term = int(rng.choice(LOAN_TERMS))
+                if cursor + timedelta(days=31 * term) >= today:
+                    break
+                loans.append(self.build_loan(rng, member_id, officer_ids, term, cursor, 'completed'))
+                repayment_plan.append(term)
+                cursor += timedelta(days=31 * term + int(rng.integers(10, 90)))
+
+            status = OPEN_LOAN_STATUSES[rng.choice(len(OPEN_LOAN_STATUSES), p=OPEN_LOAN_WEIGHTS)]
+            if status is None:
+                continue
+            term = int(rng.choice(LOAN_TERMS))
+            disbursed = min(cursor, today - timedelta(days=int(rng.integers(0, 31 * term))))
+            loans.append(self.build_loan(rng, member_id, officer_ids, term, disbursed, status))
+            if status == 'active':
+                months_elapsed = min(term, max(0, (today - disbursed).days // 30))
+                behind = rng.random() < 0.2
+                repayment_plan.append(int(months_elapsed * rng.uniform(0.2, 0.7)) if behind else months_elapsed)
+            else:
+                repayment_plan.append(0)
+
+        with transaction.atomic():
+            created_on = [loan.created_at for loan in loans]
+            loans = Loan.objects.bulk_create(loans, batch_size=chunk_size)
+            # created_at is auto_now_add, so restore the historical dates afterwards
+            for loan, created in zip(loans, created_on):
+                loan.created_at = created
+            Loan.objects.bulk_update(loans, ['created_at'], batch_size=chunk_size)
+
+            # Repay the first `paid_months` installments of each disbursed loan in full
+            repayments, installments = [], []
+            for loan, paid_months in zip(loans, repayment_plan):
+                if loan.status not in ('active', 'completed'):
+                    continue
+                loan_installments = schedules.build_installments(loan)
+                for installment in loan_installments[:paid_months]:
+                    installment.amount_paid = installment.amount_due
+                    installment.status = 'paid'
+                    repayments.append(LoanRepayment(
+                        loan=loan, member_id=loan.member_id,
+                        amount_paid=installment.amount_due, payment_date=installment.due_date,
+                    ))
+                loan.total_repaid = sum((i.amount_paid for i in loan_installments), Decimal('0'))
+                loan.balance = loan.total_amount - loan.total_repaid
+                installments.extend(loan_installments)
+
+            LoanRepayment.objects.bulk_create(repayments, batch_size=chunk_size)
+            LoanInstallment.objects.bulk_create(installments, batch_size=chunk_size)
+            Loan.objects.bulk_update(loans, ['total_repaid', 'balance'], batch_size=chunk_size)
+
+        return len(loans)
+
+    def build_loan(self, rng, member_id, officer_ids, term, disbursed, status):
+        amount = Decimal(int(rng.choice([500, 1000, 1500, 2000, 3000, 5000, 10000])))
+        rate = Decimal(int(rng.choice([8, 10, 12, 15])))
+        total = (amount + amount * rate / 100 * Decimal(term) / 12).quantize(schedules.CENT)
+        opened = status in ('active', 'completed')
+        return Loan(
+            member_id=member_id,
+            account_officer_id=int(rng.choice(officer_ids)) if officer_ids else None,
+            amount=amount, interest_rate=rate, term=term, total_amount=total, balance=total,
+            status=status,
+            created_at=disbursed - timedelta(days=int(rng.integers(1, 14))),
+            disbursed_date=disbursed if opened else None,
+            due_date=disbursed + timedelta(days=30 * term) if opened else None,
+            purpose="Synthetic working capital",
+        )
+
+    def create_transactions(self, options, member_ids, officer_ids, start, today, chunk_size):
+        """
+        Splits the transactions into independently seeded chunks and inserts
+        them inline or across --workers processes.
+        Member activity follows a heavy-tailed distribution, so a few members
+        have very long histories like the real long-standing ones.
+        """
+        total = options['transactions']
+        if total <= 0:
+            return 0
+
+        weights_rng = np.random.default_rng(options['seed'])
+        weights = weights_rng.pareto(1.5, size=len(member_ids)) + 1
+        weights /= weights.sum()
+
+        member_array = np.array(member_ids, dtype=np.int64)
+        officer_array = np.array(officer_ids, dtype=np.int64)
+        days = max((today - start).days, 1)
+
+        n_chunks = -(-total // chunk_size)
+        seeds = np.random.SeedSequence(options['seed']).spawn(n_chunks)
+        tasks = [
+            (
+                i, seeds[i], min(chunk_size, total - i * chunk_size), member_array, weights,
+                officer_array, start.toordinal(), days, chunk_size, options['prefix'],
+            )
+            for i in range(n_chunks)
+        ]
+
+        workers = options['workers']
+        if workers > 1 and connections['default'].vendor == 'sqlite':
+            # SQLite allows a single writer; parallel inserts would only fight over the lock
+            self.stdout.write(self.style.WARNING("⚠️ SQLite can't take parallel writers; using 1 worker."))
+            workers = 1
+
+        inserted = 0
+        if workers <= 1:
+            for task in tasks:
+                inserted += _insert_transactions(task)
+                self.stdout.write(f"  … {inserted}/{total}", ending='\r')
+        else:
+            # Workers must not inherit this process's open connection
+            connections.close_all()
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+                for rows in pool.map(_insert_transactions, tasks):
+                    inserted += rows
+                    self.stdout.write(f"  … {inserted}/{total}", ending='\r')
+        self.stdout.write("")
+        return inserted
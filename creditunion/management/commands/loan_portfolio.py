@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from creditunion import portfolio
+
+
+class Command(BaseCommand):
+    help = "Report portfolio-at-risk, aging buckets and expected collections for active loans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', type=int, help="Restrict the report to one church id.")
+        parser.add_argument('--horizon', type=int, default=30, help="Days ahead for expected collections.")
+        parser.add_argument('--json', action='store_true', help="Print the full report as JSON.")
+
+    def handle(self, *args, **options):
+        report = portfolio.portfolio_report(church_id=options['church'], horizon_days=options['horizon'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        rows = [('All churches', report['totals'])] + [
+            (church['church_name'] or 'No church', church) for church in report['by_church']
+        ]
+        self.stdout.write(f"Portfolio as of {report['as_of']} (collections horizon {report['horizon_days']} days)")
+        for name, summary in rows:
+            self.stdout.write(
+                f"{name}: {summary['loan_count']} loans, "
+                f"outstanding principal {summary['outstanding_principal']:.2f}, "
+                f"PAR30 {summary['par30']:.2%}, PAR60 {summary['par60']:.2%}, PAR90 {summary['par90']:.2%}, "
+                f"arrears {summary['arrears']:.2f}, expected {summary['expected_collections']:.2f}"
+            )
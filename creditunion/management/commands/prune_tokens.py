@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditunion import revocation
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding refresh tokens and their blacklist entries, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Tokens deleted per statement.")
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to sleep between batches, to leave room for other writers.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['pause'] < 0:
+            raise CommandError("--batch-size must be at least 1 and --pause not negative.")
+
+        started = time.monotonic()
+        outstanding, blacklisted = revocation.prune_expired(
+            batch_size=options['batch_size'], pause=options['pause'],
+        )
+        self.stdout.write(
+            f"Deleted {outstanding} expired tokens and {blacklisted} blacklist entries "
+            f"({time.monotonic() - started:.1f}s)"
+        )
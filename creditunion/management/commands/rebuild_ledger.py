@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from creditunion import ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the materialized member balances and monthly rollups from the raw Transaction ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare stored tables with the ledger; exit non-zero on any mismatch.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """
+        Without flags, recomputes every MemberBalance and MonthlyRollup row from Transaction.
+        With --verify, reports rows that have drifted from the ledger.
+        """
+        if options['verify']:
+            balance_mismatches = ledger.verify_balances()
+            for member_id, stored, expected in balance_mismatches:
+                self.stdout.write(f"member {member_id}: stored {stored}, ledger {expected}")
+
+            rollup_mismatches = ledger.verify_rollups()
+            for (member_id, year, month, tx_type), stored, expected in rollup_mismatches:
+                self.stdout.write(
+                    f"member {member_id} {year}-{month:02} {tx_type}: stored {stored}, ledger {expected}"
+                )
+
+            if balance_mismatches or rollup_mismatches:
+                raise CommandError(
+                    f"{len(balance_mismatches)} member balance(s) and "
+                    f"{len(rollup_mismatches)} monthly rollup(s) out of sync."
+                )
+            self.stdout.write(self.style.SUCCESS("✅ Member balances and monthly rollups match the ledger."))
+            return
+
+        balances = ledger.rebuild_balances(batch_size=options['batch_size'])
+        rollups = ledger.rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {balances} member balances and {rollups} monthly rollups."))
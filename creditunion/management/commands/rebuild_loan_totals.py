@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from creditunion import repayments
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify each loan's total_repaid, balance, status and installment schedule from its repayments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare stored loans with their repayments; exit non-zero on any mismatch.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Without flags, re-derives every loan that has drifted from its repayments.
+        With --verify, only reports them.
+        """
+        mismatches = repayments.verify_loans()
+        if options['verify']:
+            for loan_id, field, stored, expected in mismatches:
+                self.stdout.write(f"loan {loan_id} {field}: stored {stored}, repayments give {expected}")
+            if mismatches:
+                loan_count = len({loan_id for loan_id, *_ in mismatches})
+                raise CommandError(f"{loan_count} loan(s) out of sync with their repayments.")
+            self.stdout.write(self.style.SUCCESS("✅ Loan totals and schedules match the repayments."))
+            return
+
+        rebuilt = repayments.rebuild_loans(sorted({loan_id for loan_id, *_ in mismatches}))
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {rebuilt} loan(s) from their repayments."))
@@ -0,0 +1,61 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditunion import reconciliation
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify stale pending Paystack payment intents: record the ones that succeeded, "
+        "fail or expire the rest, and print counts for monitoring."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=15, help="Minutes an intent must be pending first.")
+        parser.add_argument('--expire-after', type=int, default=24, help="Hours after which unpaid intents expire.")
+        parser.add_argument(
+            '--recheck-after', type=int, default=15,
+            help="Minutes before an intent that is still pending is asked about again.",
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help="Intents checked per pass.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Paystack calls in flight at once.")
+        parser.add_argument('--rate', type=float, default=5.0, help="Max Paystack calls per second.")
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help="Keep running, sleeping this long between passes (worker mode); default is a single pass.",
+        )
+        parser.add_argument('--json', action='store_true', help="Print each pass's counts as one JSON line.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['concurrency'] < 1 or options['rate'] <= 0:
+            raise CommandError("--batch-size and --concurrency must be at least 1 and --rate positive.")
+
+        while True:
+            started = time.monotonic()
+            counts = reconciliation.reconcile(
+                older_than=timedelta(minutes=options['older_than']),
+                expire_after=timedelta(hours=options['expire_after']),
+                recheck_after=timedelta(minutes=options['recheck_after']),
+                batch_size=options['batch_size'],
+                concurrency=options['concurrency'],
+                rate=options['rate'],
+            )
+            self.report(counts, time.monotonic() - started, options['json'])
+
+            # A full batch means there may be more waiting; go again straight away
+            if options['loop'] is None:
+                break
+            if counts['checked'] < options['batch_size']:
+                time.sleep(options['loop'])
+
+    def report(self, counts, elapsed, as_json):
+        if as_json:
+            self.stdout.write(json.dumps({**counts, 'seconds': round(elapsed, 3)}))
+            return
+        self.stdout.write(
+            ", ".join(f"{outcome} {counts[outcome]}" for outcome in reconciliation.OUTCOMES)
+            + f" ({elapsed:.1f}s)"
+        )
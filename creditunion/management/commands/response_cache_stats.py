@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from creditunion import response_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the per-member response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        for name, counts in response_cache.cache_stats().items():
+            total = counts['hit'] + counts['miss']
+            ratio = counts['hit'] / total if total else 0
+            self.stdout.write(f"{name}: {counts['hit']} hits, {counts['miss']} misses ({ratio:.1%} hit rate)")
+
+        if options['reset']:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("✅ Counters reset."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+
+
+def backfill_balances(apps, schema_editor):
+    Transaction = apps.get_model('creditunion', 'Transaction')
+    MemberBalance = apps.get_model('creditunion', 'MemberBalance')
+
+    signed = Case(
+        When(transaction_type__in=['deposit', 'interest_earned'], then=F('amount')),
+        When(transaction_type__in=['withdrawal', 'loan_repayment', 'charges'], then=-F('amount')),
+        default=Value(0),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    rows = Transaction.objects.order_by().values('member_id').annotate(balance=Sum(signed))
+    MemberBalance.objects.bulk_create(
+        [MemberBalance(member_id=row['member_id'], balance=row['balance'] or 0) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
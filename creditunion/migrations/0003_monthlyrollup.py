@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('creditunion', 'Transaction')
+    MonthlyRollup = apps.get_model('creditunion', 'MonthlyRollup')
+
+    rows = (
+        Transaction.objects.order_by()
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('member_id', 'year', 'month', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    MonthlyRollup.objects.bulk_create(
+        [
+            MonthlyRollup(
+                member_id=row['member_id'], year=row['year'], month=row['month'],
+                transaction_type=row['transaction_type'], total=row['total'] or 0, count=row['count'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0002_memberbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('transaction_type', models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('loan_repayment', 'Loan Repayment'), ('charges', 'Charges'), ('interest_earned', 'Interest Earned')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('member', 'year', 'month', 'transaction_type'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:29
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_totals(apps, schema_editor):
+    Loan = apps.get_model('creditunion', 'Loan')
+    LoanRepayment = apps.get_model('creditunion', 'LoanRepayment')
+
+    repaid = dict(
+        LoanRepayment.objects.order_by().values('loan_id').annotate(total=Sum('amount_paid')).values_list('loan_id', 'total')
+    )
+    loans = list(Loan.objects.only('id', 'total_amount'))
+    for loan in loans:
+        loan.total_repaid = repaid.get(loan.id) or 0
+        loan.balance = loan.total_amount - loan.total_repaid
+    Loan.objects.bulk_update(loans, ['total_repaid', 'balance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0003_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Amount still owed (total_amount - total_repaid)', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='total_repaid',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of all repayments, updated with each repayment (see creditunion/repayments.py)', max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
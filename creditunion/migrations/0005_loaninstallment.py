@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:30
+
+import django.db.models.deletion
+from decimal import ROUND_HALF_UP, Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+
+
+def backfill_schedules(apps, schema_editor):
+    """
+    Generates schedules for loans that were already active, with their
+    repayments so far allocated oldest-first.
+    """
+    Loan = apps.get_model('creditunion', 'Loan')
+    LoanInstallment = apps.get_model('creditunion', 'LoanInstallment')
+
+    installments = []
+    for loan in Loan.objects.filter(status='active', term__gt=0).iterator():
+        start = loan.disbursed_date or loan.created_at
+        amount = (loan.total_amount / loan.term).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        remaining = loan.total_repaid
+
+        for number in range(1, loan.term + 1):
+            amount_due = loan.total_amount - amount * (loan.term - 1) if number == loan.term else amount
+            paid = max(min(remaining, amount_due), Decimal('0'))
+            remaining -= paid
+            installments.append(LoanInstallment(
+                loan_id=loan.id,
+                number=number,
+                due_date=start + relativedelta(months=number),
+                amount_due=amount_due,
+                amount_paid=paid,
+                status='paid' if paid >= amount_due else ('partial' if paid else 'pending'),
+            ))
+
+    LoanInstallment.objects.bulk_create(installments, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0004_loan_repayment_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(help_text='1-based position in the schedule')),
+                ('due_date', models.DateField()),
+                ('amount_due', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('partial', 'Partially Paid'), ('paid', 'Paid')], default='pending', max_length=10)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='creditunion.loan')),
+            ],
+            options={
+                'ordering': ['loan', 'number'],
+                'indexes': [models.Index(fields=['loan', 'status', 'due_date'], name='installment_loan_status_due')],
+                'constraints': [models.UniqueConstraint(fields=('loan', 'number'), name='unique_loan_installment')],
+            },
+        ),
+        migrations.RunPython(backfill_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0005_loaninstallment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['member', '-date', '-id'], name='txn_member_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-date', '-id'], name='txn_date_id'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0006_transaction_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['member', 'status'], name='loan_member_status'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status__in', ['active', 'pending'])), fields=['member', 'status'], name='loan_open_by_member'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrepayment',
+            index=models.Index(fields=['loan', 'amount_paid'], name='repayment_loan_amount'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['member', 'transaction_type', 'date'], name='txn_member_type_date'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['reference'], name='txn_reference'),
+        ),
+    ]
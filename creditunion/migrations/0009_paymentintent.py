@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0008_transaction_reference_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentIntent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=100, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('expired', 'Expired')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Reconciliation checks so far')),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_intents', to=settings.AUTH_USER_MODEL)),
+                ('transaction', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_intent', to='creditunion.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='intent_status_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:48
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def tag_paystack_deposits(apps, schema_editor):
+    """
+    Marks the existing Paystack deposits: the ones linked to a PaymentIntent,
+    and the rows record_deposit booked before intents existed ('momo deposit'
+    notes). Only the first row per reference is tagged, so the constraint can
+    be added without touching any reference; later copies stay 'manual' and
+    can be reviewed in the admin.
+    """
+    Transaction = apps.get_model('creditunion', 'Transaction')
+
+    candidates = Transaction.objects.filter(transaction_type='deposit').exclude(reference='').filter(
+        models.Q(payment_intent__isnull=False) | models.Q(notes='momo deposit')
+    )
+    first_ids = candidates.order_by().values('reference').annotate(first_id=Min('id')).values('first_id')
+    Transaction.objects.filter(id__in=first_ids).update(source='paystack')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0009_paymentintent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='source',
+            field=models.CharField(choices=[('manual', 'Manual'), ('paystack', 'Paystack')], default='manual', help_text='Where the row came from; Paystack rows carry the payment reference', max_length=20),
+        ),
+        migrations.RunPython(tag_paystack_deposits, migrations.RunPython.noop),
+        # The partial unique index below serves the Paystack reference lookups
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='txn_reference',
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('source', 'paystack'), models.Q(('reference', ''), _negated=True)), fields=('reference',), name='unique_paystack_reference'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:10
+
+from django.db import migrations
+
+
+INDEXES = {
+    'creditunion_customuser': ('username', 'first_name', 'last_name', 'email', 'phone'),
+    'creditunion_member': ('full_name', 'membership_number'),
+}
+
+
+def index_name(table, column):
+    return f"{table.split('_', 1)[1]}_{column}_trgm"
+
+
+def create_indexes(apps, schema_editor):
+    """
+    Trigram indexes for the member typeahead (MemberSearchView).
+    Django compiles icontains/istartswith on Postgres to
+    UPPER(column::text) LIKE UPPER(%s), so the GIN indexes are built on that
+    exact expression and serve both substring and prefix matches. pg_trgm is
+    Postgres-only; on other databases this does nothing.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in INDEXES.items():
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index_name(table, column)}" '
+                f'ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, columns in INDEXES.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{index_name(table, column)}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0010_unique_external_reference'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0011_member_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'created_at'], name='loan_status_created'),
+        ),
+    ]
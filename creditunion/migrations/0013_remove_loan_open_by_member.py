@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditunion', '0012_loan_status_created_index'),
+    ]
+
+    operations = [
+        # Same columns as loan_member_status, which already serves every open-loan lookup
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loan_open_by_member',
+        ),
+    ]
@@ -1,12 +1,28 @@
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.http import parse_etags
 from rest_framework import viewsets, permissions, generics
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from .models import Transaction
-from .serializers import TransactionSerializer
+from .serializers import TransactionSerializer, TransactionImportSerializer
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import CustomUser, Church
-from .serializers import MemberSerializer, MemberProfileSerializer, ChurchSerializer
+from .models import CustomUser, Member
+from .serializers import MemberSearchSerializer, MemberProfileSerializer
+from .pagination import TransactionCursorPagination, TypeaheadPagination
+from .permissions import IsOfficer
+from . import bulk_import, ledger, reference_cache, response_cache
+
+
+# Rows per INSERT statement for batch imports
+BULK_CREATE_BATCH_SIZE = 500
+
+# Shorter member searches return nothing; from TRIGRAM_QUERY_LENGTH on, names
+# are matched anywhere (served by the trigram indexes on Postgres), before that
+# only by prefix
+MIN_QUERY_LENGTH = 2
+TRIGRAM_QUERY_LENGTH = 3
 
 
 
@@ -18,6 +34,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionCursorPagination
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -28,6 +45,49 @@ class TransactionViewSet(viewsets.ModelViewSet):
         self.perform_create(serializer)
         return Response(serializer.data, status=201)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsOfficer])
+    def bulk(self, request):
+        """
+        Batch entry for officers: accepts a JSON array or CSV upload of
+        transactions, validates every row, and writes the valid ones with
+        chunked bulk_create in one transaction. Balances, rollups and
+        cached dashboards are updated once for the whole batch.
+        Returns per-row errors for the rows that were skipped.
+        """
+        rows = bulk_import.read_rows(request)
+
+        # Resolve every referenced member in one query
+        raw_ids = {str(row.get('member', '')).strip() for row in rows}
+        candidate_ids = [int(value) for value in raw_ids if value.isdigit()]
+        member_ids = set(CustomUser.objects.filter(id__in=candidate_ids).values_list('id', flat=True))
+
+
+        transactions, errors = [], []
+        for index, row in enumerate(rows):
+            serializer = TransactionImportSerializer(
+                data=row, context={'member_ids': member_ids},
+            )
+            if not serializer.is_valid():
+                errors.append({"row": index, "errors": serializer.errors})
+                continue
+            data = serializer.validated_data
+            transactions.append(Transaction(
+                member_id=data.pop('member'),
+                account_officer=request.user,
+                **data,
+            ))
+
+        with transaction.atomic():
+            created = Transaction.objects.bulk_create(transactions, batch_size=BULK_CREATE_BATCH_SIZE)
+            ledger.apply_transactions(added=[ledger.ledger_row(tx) for tx in created])
+            response_cache.bump_versions(tx.member_id for tx in created)
+
+        return Response({
+            "created": len(created),
+            "failed": len(errors),
+            "errors": errors,
+        }, status=201 if created else 400)
+
 
 
 
@@ -39,24 +99,69 @@ class AllMembersAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # Served from the reference cache; see reference_response()
+        return reference_response(request, 'members')
+
+
+
+class MemberSearchView(generics.ListAPIView):
+    """
+    Member typeahead for officers: /api/members/search/?q=<text>.
+    Matches username, names, email, phone, full name and membership number
+    within the officer's church, prefix matches first, a small page at a time
+    (see TypeaheadPagination). Staff without a church search every church.
+    """
+    serializer_class = MemberSearchSerializer
+    permission_classes = [IsOfficer]
+    pagination_class = TypeaheadPagination
+
+    user_fields = ('username', 'first_name', 'last_name', 'email', 'phone')
+    member_fields = ('full_name', 'membership_number')
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if len(query) < MIN_QUERY_LENGTH:
+            return CustomUser.objects.none()
+
+        lookup = 'icontains' if len(query) >= TRIGRAM_QUERY_LENGTH else 'istartswith'
         members = CustomUser.objects.filter(is_member=True, is_active=True)
-        serializer = MemberSerializer(members, many=True)
-        return Response(serializer.data)
+        user = self.request.user
+        if user.church_id:
+            members = members.filter(church_id=user.church_id)
+        elif not (user.is_admin or user.is_staff or user.is_superuser):
+            return CustomUser.objects.none()
+
+        # The member-table match is a semi-join, so each side can use its own indexes
+        matches = Q(pk__in=Member.objects.filter(self.any_field(self.member_fields, lookup, query)).values('user_id'))
+        prefix = self.any_field(('username', 'member__full_name', 'member__membership_number'), 'istartswith', query)
+        return (
+            members.filter(self.any_field(self.user_fields, lookup, query) | matches)
+            .select_related('member')
+            .annotate(rank=Case(When(prefix, then=Value(0)), default=Value(1), output_field=IntegerField()))
+            .order_by('rank', 'username', 'id')
+        )
+
+    @staticmethod
+    def any_field(fields, lookup, query):
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__{lookup}": query})
+        return condition
 
 
 
 
-class UserTransactionListView(APIView):
+class UserTransactionListView(generics.ListAPIView):
     """
-    Returns all transactions created by the currently logged-in user.
+    Returns the transactions of the currently logged-in user, newest first,
+    one cursor page at a time (follow `next` for older ones).
     """
+    serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionCursorPagination
 
-    def get(self, request):
-        user = request.user
-        transactions = Transaction.objects.filter(member=user).order_by('-date')
-        data = TransactionSerializer(transactions, many=True).data
-        return Response(data)
+    def get_queryset(self):
+        return Transaction.objects.filter(member=self.request.user)
 
 
 
@@ -67,6 +172,8 @@ class MemberProfileView(generics.RetrieveUpdateAPIView):
     """
     serializer_class = MemberProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # The profile shows user fields (phone, email) that the token claims don't carry
+    full_user = True
 
     def get_object(self):
         # Ensure we fetch the logged-in user's Member instance
@@ -79,6 +186,19 @@ def church_list(request):
     """
     Returns list of all churches in the system.
     """
-    churches = Church.objects.all()
-    serializer = ChurchSerializer(churches, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return reference_response(request, 'churches')
+
+
+
+def reference_response(request, name):
+    """
+    Returns a cached reference data set with its ETag, or an empty 304
+    when the client's If-None-Match already names it.
+    """
+    payload, etag = reference_cache.get(name)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = Response(status=304)
+    else:
+        response = Response(payload)
+    response['ETag'] = etag
+    return response
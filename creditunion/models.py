@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.db import models
@@ -133,6 +133,19 @@ class Loan(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
+    total_repaid = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of all repayments, updated with each repayment (see creditunion/repayments.py)"
+    )
+    balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Amount still owed (total_amount - total_repaid)"
+    )
+
     disbursed_date = models.DateField(null=True, blank=True)
     due_date = models.DateField(null=True, blank=True, help_text="Expected end date of repayment")
     
@@ -141,6 +154,12 @@ class Loan(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # loan_summary, perform_create, active/pending lookups
+            models.Index(fields=['member', 'status'], name='loan_member_status'),
+            # Officer loan queue: filtered by status, newest first
+            models.Index(fields=['status', 'created_at'], name='loan_status_created'),
+        ]
 
     def __str__(self):
         return f"Loan {self.id} - {self.member.username} - {self.status}"
@@ -152,23 +171,25 @@ class Loan(models.Model):
         if self.disbursed_date and self.term:
             self.due_date = self.disbursed_date + relativedelta(months=self.term)
 
-    def total_repaid(self):
+    def save(self, *args, **kwargs):
         """
-        Returns the total repaid amount for this loan.
+        New loans start with the full repayment amount outstanding.
         """
-        return sum(r.amount_paid for r in self.repayments.all())
+        if self._state.adding and not self.balance and self.total_amount is not None:
+            self.balance = self.total_amount - self.total_repaid
+        super().save(*args, **kwargs)
 
     def balance_remaining(self):
         """
         Returns the remaining balance on the loan.
         """
-        return max(self.total_amount - self.total_repaid(), 0)
+        return max(self.balance, 0)
 
     def is_fully_paid(self):
         """
         Returns True if loan is fully repaid.
         """
-        return self.total_repaid() >= self.total_amount
+        return self.total_repaid >= self.total_amount
 
     def __str__(self):
         return f"Loan {self.id} - {self.member.username}"
@@ -192,11 +213,54 @@ class LoanRepayment(models.Model):
 
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            # Covers per-loan Sum('amount_paid') aggregates without touching the table
+            models.Index(fields=['loan', 'amount_paid'], name='repayment_loan_amount'),
+        ]
+
     def __str__(self):
         return f"Repayment of {self.amount_paid} by {self.member.username} on {self.payment_date}"
 
 
 
+class LoanInstallment(models.Model):
+    """
+    One scheduled installment of an approved loan.
+    The schedule is generated at approval (see creditunion/schedules.py)
+    and repayments are allocated against it oldest-first.
+    """
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('partial', 'Partially Paid'),
+        ('paid', 'Paid'),
+    )
+
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='installments')
+    number = models.PositiveIntegerField(help_text="1-based position in the schedule")
+    due_date = models.DateField()
+    amount_due = models.DecimalField(max_digits=12, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+
+    class Meta:
+        ordering = ['loan', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['loan', 'number'], name='unique_loan_installment'),
+        ]
+        indexes = [
+            models.Index(fields=['loan', 'status', 'due_date'], name='installment_loan_status_due'),
+        ]
+
+    def __str__(self):
+        return f"Installment {self.number} of loan {self.loan_id} due {self.due_date}"
+
+    @property
+    def amount_outstanding(self):
+        return self.amount_due - self.amount_paid
+
+
+
 class Transaction(models.Model):
     """
     Logs all financial transactions: deposits, withdrawals, and loan repayments.
@@ -212,6 +276,11 @@ class Transaction(models.Model):
         ('interest_earned', 'Interest Earned')
     ]
 
+    SOURCES = [
+        ('manual', 'Manual'),
+        ('paystack', 'Paystack'),
+    ]
+
     member = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
@@ -232,10 +301,121 @@ class Transaction(models.Model):
     date = models.DateField()
     reference = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
+    source = models.CharField(
+        max_length=20,
+        choices=SOURCES,
+        default='manual',
+        help_text="Where the row came from; Paystack rows carry the payment reference"
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset pagination (see pagination.py): per member and table-wide
+            models.Index(fields=['member', '-date', '-id'], name='txn_member_date_id'),
+            models.Index(fields=['-date', '-id'], name='txn_date_id'),
+            # Per-member filters by type and date range (dashboard, statements, ledger rebuilds)
+            models.Index(fields=['member', 'transaction_type', 'date'], name='txn_member_type_date'),
+        ]
+        constraints = [
+            # A Paystack payment is booked once; also the index its webhook / verify lookups use.
+            # Manual rows may reuse references (receipt numbers, notes).
+            models.UniqueConstraint(
+                fields=['reference'],
+                condition=models.Q(source='paystack') & ~models.Q(reference=''),
+                name='unique_paystack_reference',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.member.username} - {self.amount}"
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the row inside a transaction so the ledger signal handlers
+        (see creditunion/signals.py) commit or roll back together with it.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+
+class MemberBalance(models.Model):
+    """
+    Materialized running balance for a member.
+    Maintained from Transaction writes by creditunion/ledger.py;
+    rebuild with `python manage.py rebuild_ledger`.
+    """
+    member = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='balance')
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Balance for {self.member.username}: {self.balance}"
+
+
+
+class MonthlyRollup(models.Model):
+    """
+    Per-member monthly totals for each transaction type.
+    Feeds the dashboard's YTD summary and savings trend; maintained
+    alongside MemberBalance by creditunion/ledger.py.
+    """
+    member = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='monthly_rollups')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['member', 'year', 'month', 'transaction_type'],
+                name='unique_monthly_rollup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.member.username} {self.year}-{self.month:02} {self.transaction_type}: {self.total}"
+
+
+
+class PaymentIntent(models.Model):
+    """
+    A Paystack payment we initiated and haven't seen the outcome of yet.
+    Settled by the webhook or verify (see creditunion/payments.py); those
+    that never report back are checked and expired by
+    `python manage.py reconcile_payments`.
+    """
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+    )
+
+    member = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='payment_intents')
+    reference = models.CharField(max_length=100, unique=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='payment_intent',
+    )
+    attempts = models.PositiveIntegerField(default=0, help_text="Reconciliation checks so far")
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Reconciliation picks the oldest pending intents first
+            models.Index(fields=['status', 'created_at'], name='intent_status_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference} ({self.status}) for {self.member.username}: {self.amount}"
+
 
 
 class Notification(models.Model):
@@ -0,0 +1,151 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over a (sort key, id) pair, newest first.
+
+    The cursor holds both values of the row a page ended on, and the next
+    page is `key < k OR (key = k AND id < i)`. Rows sharing one sort key
+    are therefore paged by id rather than by an offset, so a page costs
+    the same however deep it is and however many rows share a date.
+    `ordering` names the two descending fields, the second one unique.
+    """
+    ordering = None
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        key_field, id_field = (name.lstrip('-') for name in self.ordering)
+        try:
+            key, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            model = queryset.model
+            return (
+                model._meta.get_field(key_field).to_python(key),
+                model._meta.get_field(id_field).to_python(pk),
+                bool(reverse),
+            )
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        key_field, id_field = (name.lstrip('-') for name in self.ordering)
+        key = getattr(row, key_field)
+        payload = json.dumps([key.isoformat() if hasattr(key, 'isoformat') else key, getattr(row, id_field), reverse])
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size_value = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        key_field, id_field = (name.lstrip('-') for name in self.ordering)
+        cursor = self.decode_cursor(request, queryset)
+        reverse = bool(cursor and cursor[2])
+
+        if cursor is not None:
+            key, pk = cursor[0], cursor[1]
+            if reverse:
+                queryset = queryset.filter(Q(**{f'{key_field}__gt': key}) | Q(**{key_field: key, f'{id_field}__gt': pk}))
+            else:
+                queryset = queryset.filter(Q(**{f'{key_field}__lt': key}) | Q(**{key_field: key, f'{id_field}__lt': pk}))
+
+        ordering = [name.lstrip('-') for name in self.ordering] if reverse else list(self.ordering)
+        rows = list(queryset.order_by(*ordering)[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class TransactionCursorPagination(KeysetPagination):
+    """
+    Keyset pagination over (date, id), newest first; each page is a range
+    scan on the matching composite index.
+    """
+    ordering = ('-date', '-id')
+
+
+class LoanCursorPagination(KeysetPagination):
+    """
+    Keyset pagination over (created_at, id), newest first, for the officer
+    loan queue. With a status filter each page is a range scan on the
+    (status, created_at) index.
+    """
+    ordering = ('-created_at', '-id')
+
+
+class TypeaheadPagination(LimitOffsetPagination):
+    """
+    Small limit/offset pages without a COUNT(*): one extra row is fetched
+    to tell whether there is a next page, so the cost stays with the page
+    size rather than the number of matches.
+    """
+    default_limit = 20
+    max_limit = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
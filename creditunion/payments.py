@@ -0,0 +1,124 @@
+"""
+Recording Paystack payments.
+
+A deposit can be reported more than once: Paystack retries webhooks until it
+gets a 2xx, and the member's browser may also call verify. Every path goes
+through `record_deposit`, which keys the deposit on its Paystack reference
+so it is only ever booked once.
+
+Each initiated payment is also stored as a PaymentIntent. It is settled
+here once the deposit is recorded; intents that never report back are
+handled by reconciliation.py.
+"""
+
+import datetime
+import hashlib
+import hmac
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CustomUser, PaymentIntent, Transaction
+
+
+def valid_signature(body, signature):
+    """
+    Checks the X-Paystack-Signature header: the HMAC-SHA512 of the raw
+    request body, keyed with our secret key.
+    """
+    if not signature or not settings.PAYSTACK_KEY:
+        return False
+    expected = hmac.new(settings.PAYSTACK_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def find_deposit(reference):
+    return Transaction.objects.filter(reference=reference, source='paystack').first()
+
+
+async def afind_deposit(reference):
+    return await Transaction.objects.filter(reference=reference, source='paystack').afirst()
+
+
+def resolve_member(data):
+    """
+    Finds the member a Paystack charge belongs to: the member_id we put in the
+    metadata when initiating, else the customer's email. Returns None if unknown.
+    """
+    metadata = data.get('metadata') or {}
+    member_id = metadata.get('member_id') if isinstance(metadata, dict) else None
+    if member_id:
+        member = CustomUser.objects.filter(pk=member_id).first()
+        if member:
+            return member
+
+    email = (data.get('customer') or {}).get('email')
+    if email:
+        return CustomUser.objects.filter(email__iexact=email).order_by('id').first()
+    return None
+
+
+def payment_owner(reference, data):
+    """
+    The member a verified charge belongs to: whoever initiated its
+    PaymentIntent, else resolve_member(data). Verify views book the deposit
+    to this member, never to whoever happens to poll the reference.
+    """
+    intent = PaymentIntent.objects.filter(reference=reference).select_related('member').first()
+    if intent is not None:
+        return intent.member
+    return resolve_member(data)
+
+
+async def apayment_owner(reference, data):
+    return await sync_to_async(payment_owner)(reference, data)
+
+
+def record_deposit(member, reference, amount, paid_on=None):
+    """
+    Books a successful Paystack charge as a deposit, once per reference.
+    Returns (transaction, created).
+    """
+    with transaction.atomic():
+        deposit, created = Transaction.objects.get_or_create(
+            reference=reference,
+            source='paystack',
+            defaults={
+                'member': member,
+                'transaction_type': 'deposit',
+                'amount': Decimal(str(amount)),
+                'date': paid_on or datetime.date.today(),
+                'notes': 'momo deposit',
+            },
+        )
+        if created:
+            PaymentIntent.objects.filter(reference=reference).exclude(status='succeeded').update(
+                status='succeeded', transaction=deposit, updated_at=timezone.now(),
+            )
+        return deposit, created
+
+
+def create_intent(member, reference, amount):
+    """
+    Remembers an initiated payment so reconciliation can settle it
+    if neither the webhook nor verify ever report back.
+    """
+    return PaymentIntent.objects.get_or_create(
+        reference=reference, defaults={'member': member, 'amount': Decimal(str(amount))},
+    )[0]
+
+
+async def acreate_intent(member, reference, amount):
+    return (await PaymentIntent.objects.aget_or_create(
+        reference=reference, defaults={'member': member, 'amount': Decimal(str(amount))},
+    ))[0]
+
+
+async def arecord_deposit(member, reference, amount, paid_on=None):
+    """
+    Async record_deposit; atomic blocks still need a sync thread.
+    """
+    return await sync_to_async(record_deposit)(member, reference, amount, paid_on=paid_on)
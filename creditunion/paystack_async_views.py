@@ -0,0 +1,164 @@
+"""
+Async versions of the Paystack initiate/verify endpoints.
+
+Served through ASGI (see backend/asgi.py), a request waiting on Paystack is
+a suspended coroutine rather than a blocked worker, so many payments can be
+in flight on one process. They use the async Paystack client and the async
+ORM, and return the same payloads as the sync views in paystack_views.py.
+
+DRF views can't be async, so these are plain Django views that check the
+JWT themselves. Idempotency-Key handling matches the sync views, through
+idempotency.aidempotent with the same scopes.
+"""
+
+import functools
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import payments
+from .authentication import serves_from_claims, user_from_claims
+from .idempotency import aidempotent
+from .paystack_client import PaystackError, get_async_client
+from .paystack_views import reference_key, verified
+
+User = get_user_model()
+
+
+async def authenticate(request):
+    """
+    Returns the active user named by the request's Bearer token, or None.
+    Like ClaimsJWTAuthentication, read-only requests are served from the
+    token's claims without a query.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        token = auth.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+    if request.method == 'GET' and serves_from_claims(token):
+        return user_from_claims(token)
+    return await User.objects.filter(pk=token.get(api_settings.USER_ID_CLAIM), is_active=True).afirst()
+
+
+def unauthorized():
+    return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+
+def token_required(view):
+    """
+    Answers 401 unless the request carries a valid token for an active
+    user, and sets request.user for the view (and for aidempotent).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await authenticate(request)
+        if user is None:
+            return unauthorized()
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@csrf_exempt
+@require_POST
+@token_required
+@aidempotent('initiate-payment')
+async def initiate_momo_payment(request):
+    """ connect to paystack and initiate momo transaction (async) """
+    user = request.user
+
+    if not settings.PAYSTACK_KEY:
+        return JsonResponse({"error": "Invalid Paystack secret key"}, status=400)
+
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object.")
+        amount = round(float(data.get('amount')))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "A numeric amount is required."}, status=400)
+
+    try:
+        status_code, body = await get_async_client().initialize_transaction(
+            email=user.email, amount=amount, metadata={"member_id": user.id},
+        )
+    except PaystackError as e:
+        return JsonResponse({"error": "Payment provider unavailable, please try again.", "details": str(e)}, status=503)
+
+    if status_code == 200 and body.get("status"):
+        await payments.acreate_intent(user, body["data"]["reference"], data.get('amount'))
+        return JsonResponse({
+            "status": "success",
+            "authorization_url": body["data"]["authorization_url"],
+            "reference": body["data"]["reference"],
+            'payment_data': {
+                'transaction_type': 'deposit',
+                'email': user.email,
+                'amount': data.get('amount'),
+                'network': data.get('network'),
+                'phone_number': data.get('phone_number'),
+                'notes': 'momo deposit',
+                'member': user.id,
+            },
+        })
+
+    return JsonResponse({"error": "Failed to initiate payment", "details": body}, status=400)
+
+
+@require_GET
+@token_required
+@aidempotent('verify-payment', default_key=reference_key, store_if=verified)
+async def verify_transaction(request):
+    """
+    Async /api/async/verify-transaction/?reference=<ref>; answers from the
+    database first and only asks Paystack if the webhook hasn't arrived.
+    Idempotency keys are shared with the sync views.
+    """
+    user = request.user
+
+    reference = request.GET.get("reference")
+    if not reference:
+        return JsonResponse({"error": "Transaction reference is required."}, status=400)
+
+    deposit = await payments.afind_deposit(reference)
+    if deposit is None:
+        try:
+            status_code, body = await get_async_client().verify_transaction(reference)
+        except PaystackError as e:
+            return JsonResponse({"status": "failed", "message": str(e)}, status=503)
+
+        if status_code != 200 or not body.get("status"):
+            return JsonResponse({"status": "failed", "message": body.get("message", "Verification failed")}, status=400)
+
+        data = body["data"]
+        if data["status"] != "success":
+            return JsonResponse({"status": "pending", "message": f"Transaction is not completed: {data['status']}"})
+
+        # Only the member the payment belongs to may book it
+        owner = await payments.apayment_owner(reference, data)
+        if owner is None or owner.pk != user.id:
+            return JsonResponse({"status": "failed", "message": "Transaction not found."}, status=404)
+
+        deposit, _ = await payments.arecord_deposit(owner, reference, data["amount"])
+
+    if deposit.member_id != user.id:
+        return JsonResponse({"status": "failed", "message": "Transaction not found."}, status=404)
+
+    return JsonResponse({
+        "status": "success",
+        "message": "Transaction verified and recorded successfully.",
+        "amount": float(deposit.amount),
+        "reference": reference,
+    })
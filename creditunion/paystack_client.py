@@ -0,0 +1,288 @@
+"""
+HTTP client for the Paystack API.
+
+One `requests.Session` per process keeps connections to Paystack alive and
+pooled instead of paying a TCP + TLS handshake on every call. Every request
+has a connect and a read timeout, so a slow Paystack can't tie up a worker
+indefinitely.
+
+Retries (with exponential backoff) cover:
+- GET requests that fail at connect or read time, or that come back 429/5xx;
+  verifying a transaction is idempotent.
+- POST requests only when the connection itself failed. In that case the
+  request never reached Paystack, so it can't have been applied twice.
+
+A circuit breaker counts consecutive failures (transport errors and 5xx
+responses). Once it opens, calls fail straight away with
+`PaystackUnavailable` until `reset_timeout` has passed. Then a single trial
+call is let through.
+
+`AsyncPaystackClient` does the same on httpx for the async views
+(paystack_async_views.py). It follows the same retry rules and shares the
+circuit breaker with the sync client.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class PaystackError(Exception):
+    """
+    Paystack could not be reached or did not answer in time.
+    """
+
+
+class PaystackUnavailable(PaystackError):
+    """
+    The circuit breaker is open; the call was not attempted.
+    """
+
+
+class CircuitBreaker:
+    """
+    Thread-safe consecutive-failure circuit breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """
+        Returns True if a call may go ahead. While half-open only one
+        trial call is allowed at a time.
+        """
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class PaystackClient:
+    """
+    Thin wrapper over the Paystack REST API.
+    Methods return (HTTP status, parsed JSON body) and raise PaystackError
+    when no usable answer came back.
+    """
+
+    def __init__(self, secret_key, base_url='https://api.paystack.co', connect_timeout=3.05,
+                 read_timeout=10.0, max_retries=2, backoff_factor=0.5, pool_maxsize=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            allowed_methods=frozenset({'GET'}),  # read/status retries; connect errors retry for any method
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f"Bearer {secret_key}",
+            'Content-Type': 'application/json',
+        })
+
+    def request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise PaystackUnavailable("Paystack is temporarily unavailable; try again shortly.")
+
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            self.breaker.record_failure()
+            raise PaystackError(f"Paystack request failed: {exc}") from exc
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        try:
+            body = response.json()
+        except ValueError:
+            raise PaystackError(f"Paystack returned a non-JSON response (HTTP {response.status_code}).")
+        return response.status_code, body
+
+    def initialize_transaction(self, email, amount, **extra):
+        return self.request('POST', '/transaction/initialize', json={'email': email, 'amount': amount, **extra})
+
+    def verify_transaction(self, reference):
+        return self.request('GET', f"/transaction/verify/{requests.utils.quote(reference, safe='')}")
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncPaystackClient:
+    """
+    asyncio counterpart of PaystackClient on a pooled httpx.AsyncClient.
+    Connect failures are retried by the transport for any method; GET is
+    also retried on read errors and 429/5xx, with the same backoff.
+    """
+
+    def __init__(self, secret_key, base_url='https://api.paystack.co', connect_timeout=3.05,
+                 read_timeout=10.0, max_retries=2, backoff_factor=0.5, pool_maxsize=100, breaker=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.breaker = breaker or CircuitBreaker()
+
+        limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            headers={'Authorization': f"Bearer {secret_key}", 'Content-Type': 'application/json'},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=httpx.AsyncHTTPTransport(retries=max_retries, limits=limits),
+        )
+
+    async def request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise PaystackUnavailable("Paystack is temporarily unavailable; try again shortly.")
+
+        attempts = self.max_retries + 1 if method == 'GET' else 1
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+            last = attempt + 1 == attempts
+            try:
+                response = await self.http.request(method, path, **kwargs)
+            except httpx.HTTPError as exc:
+                if not last:
+                    continue
+                self.breaker.record_failure()
+                raise PaystackError(f"Paystack request failed: {exc}") from exc
+            if last or response.status_code not in RETRY_STATUSES:
+                break
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        try:
+            body = response.json()
+        except ValueError:
+            raise PaystackError(f"Paystack returned a non-JSON response (HTTP {response.status_code}).")
+        return response.status_code, body
+
+    async def initialize_transaction(self, email, amount, **extra):
+        return await self.request('POST', '/transaction/initialize', json={'email': email, 'amount': amount, **extra})
+
+    async def verify_transaction(self, reference):
+        return await self.request('GET', f"/transaction/verify/{requests.utils.quote(reference, safe='')}")
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_client = None
+_breaker = None
+# httpx clients are bound to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+
+
+def client_options():
+    return {
+        'base_url': settings.PAYSTACK_BASE_URL,
+        'connect_timeout': settings.PAYSTACK_CONNECT_TIMEOUT,
+        'read_timeout': settings.PAYSTACK_READ_TIMEOUT,
+        'max_retries': settings.PAYSTACK_MAX_RETRIES,
+    }
+
+
+def get_breaker():
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker(settings.PAYSTACK_BREAKER_THRESHOLD, settings.PAYSTACK_BREAKER_RESET)
+    return _breaker
+
+
+def get_client():
+    """
+    Returns the process-wide client, built from settings on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PaystackClient(settings.PAYSTACK_KEY, breaker=get_breaker(), **client_options())
+        return _client
+
+
+def get_async_client():
+    """
+    Returns the async client for the running event loop, built from
+    settings on first use.
+    """
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = AsyncPaystackClient(
+                settings.PAYSTACK_KEY, breaker=get_breaker(), **client_options(),
+            )
+        return client
+
+
+def reset_clients():
+    """
+    Drops the cached clients and breaker so the next call rebuilds them
+    from (possibly overridden) settings.
+    """
+    global _client, _breaker
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _breaker = None
+        _async_clients.clear()
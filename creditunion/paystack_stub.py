@@ -0,0 +1,134 @@
+"""
+A minimal local stand-in for the Paystack API, for tests and manual runs.
+
+    with PaystackStub() as stub:
+        client = PaystackClient('sk_test', base_url=stub.url)
+        ...
+
+It answers POST /transaction/initialize and GET /transaction/verify/<reference>.
+Transactions are kept in memory. Set `delay` to slow every answer down, or
+`fail_next` to answer the next N requests with `fail_status`.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def intercept(self):
+        """
+        Applies the configured delay/failure and records the request.
+        Returns True if the request was already answered.
+        """
+        stub = self.server.stub
+        with stub.lock:
+            stub.requests.append((self.command, self.path))
+            failing = stub.fail_next > 0
+            if failing:
+                stub.fail_next -= 1
+        if stub.delay:
+            time.sleep(stub.delay)
+        if failing:
+            self.reply(stub.fail_status, {'status': False, 'message': 'Stub failure'})
+        return failing
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.intercept():
+            return
+        if self.path != '/transaction/initialize':
+            return self.reply(404, {'status': False, 'message': 'Not found'})
+
+        reference = body.get('reference') or uuid.uuid4().hex[:12]
+        self.server.stub.transactions[reference] = {
+            'reference': reference,
+            'amount': body.get('amount'),
+            'status': self.server.stub.outcome,
+            'customer': {'email': body.get('email')},
+            'metadata': body.get('metadata'),
+        }
+        self.reply(200, {
+            'status': True,
+            'message': 'Authorization URL created',
+            'data': {
+                'authorization_url': f"https://checkout.paystack.test/{reference}",
+                'access_code': reference,
+                'reference': reference,
+            },
+        })
+
+    def do_GET(self):
+        if self.intercept():
+            return
+        prefix = '/transaction/verify/'
+        if not self.path.startswith(prefix):
+            return self.reply(404, {'status': False, 'message': 'Not found'})
+
+        transaction = self.server.stub.transactions.get(self.path[len(prefix):])
+        if transaction is None:
+            return self.reply(400, {'status': False, 'message': 'Transaction reference not found'})
+        self.reply(200, {'status': True, 'message': 'Verification successful', 'data': transaction})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # listen backlog; the default 5 drops bursts of connections
+
+    def handle_error(self, request, client_address):
+        pass  # clients that time out hang up mid-reply; that's expected here
+
+
+class PaystackStub:
+    """
+    Runs StubHandler on a free localhost port in a background thread.
+    """
+
+    def __init__(self, delay=0, outcome='success'):
+        self.delay = delay
+        self.outcome = outcome  # status given to newly initialized transactions
+        self.fail_next = 0
+        self.fail_status = 503
+        self.transactions = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.stub = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
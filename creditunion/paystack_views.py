@@ -1,11 +1,14 @@
 # views.py
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.conf import settings
-import requests, json
+from django.utils.dateparse import parse_datetime
+import json
 import datetime
-from . models import Transaction
+from . import payments
+from .idempotency import idempotent
+from .paystack_client import PaystackError, get_client
 from rest_framework import status
 from django.contrib.auth import get_user_model
 User = get_user_model()
@@ -17,6 +20,7 @@ User = get_user_model()
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent('initiate-payment')
 def initiate_momo_payment(request):
     
     
@@ -29,13 +33,6 @@ def initiate_momo_payment(request):
     if not paystack_secret:
         return Response({"error": "Invalid Paystack secret key"}, status=400)
 
-    # initiate a transaction for testing purpose   
-    
-    headers = {
-        "Authorization": f"Bearer {paystack_secret}",
-        "Content-Type": "application/json"
-    }
-    
     data = json.loads(request.body)
     deposit = {
         "email": user.email,
@@ -51,13 +48,18 @@ def initiate_momo_payment(request):
     payload = {
         "email": user.email,
         "amount": round(float(deposit["amount"])),  # Paystack uses Kobo
+        "metadata": {"member_id": user.id},  # lets the webhook find the member
         # "callback_url": settings.PAYSTACK_CALLBACK_URL
     }
 
-    response = requests.post("https://api.paystack.co/transaction/initialize", headers=headers, json=payload)
+    try:
+        status_code, body = get_client().initialize_transaction(**payload)
+    except PaystackError as e:
+        return Response({"error": "Payment provider unavailable, please try again.", "details": str(e)}, status=503)
 
-    if response.status_code == 200 and response.json().get("status"):
-        data = response.json()["data"]
+    if status_code == 200 and body.get("status"):
+        data = body["data"]
+        payments.create_intent(user, data["reference"], deposit["amount"])
         
 
         return Response({
@@ -80,18 +82,33 @@ def initiate_momo_payment(request):
         
     return Response({
         "error": "Failed to initiate payment",
-        "details": response.json()
+        "details": body
     }, status=400)
 
     
 
 
+def verified(status, data):
+    return status == 200 and data.get("status") == "success"
+
+
+def reference_key(request):
+    return request.GET.get("reference")
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@idempotent('verify-payment', default_key=reference_key, store_if=verified)
 def verify_transaction(request):
     """
-    Verifies Paystack transaction and records deposit if successful
+    Reports whether a Paystack payment has been recorded as a deposit.
     Endpoint: /api/verify-transaction/?reference=<ref>
+
+    The charge.success webhook normally records the deposit, so this answers
+    from our own database; Paystack is only asked when the webhook hasn't
+    arrived yet, and a successful answer is recorded the same (deduped) way.
+    A successful answer is then replayed from the cache for repeat polls
+    (keyed on the reference unless an Idempotency-Key is sent).
     """
     user = request.user
     reference = request.GET.get("reference")
@@ -99,6 +116,17 @@ def verify_transaction(request):
     if not reference:
         return Response({"error": "Transaction reference is required."}, status=400)
 
+    deposit = payments.find_deposit(reference)
+    if deposit is not None:
+        if deposit.member_id != user.id:
+            return Response({"status": "failed", "message": "Transaction not found."}, status=404)
+        return Response({
+            "status": "success",
+            "message": "Transaction verified and recorded successfully.",
+            "amount": deposit.amount,
+            "reference": reference
+        })
+
     verification = verify_paystack_transaction(reference)
 
     if verification["status"] == "success":
@@ -107,19 +135,18 @@ def verify_transaction(request):
         # print(data)
 
         if data["status"] == "success":
-            # ✅ Transaction was successful, now record in DB
-            Transaction.objects.create(
-                amount=data["amount"] ,  # Convert from kobo to Naira
-                member=user,
-                transaction_type="deposit",
-                date=datetime.date.today(),
-                notes="momo deposit",
-            )
+            # Only the member the payment belongs to may book it
+            owner = payments.payment_owner(reference, data)
+            if owner is None or owner.pk != user.id:
+                return Response({"status": "failed", "message": "Transaction not found."}, status=404)
+
+            # ✅ Transaction was successful, now record in DB (once, even if the webhook races us)
+            deposit, _ = payments.record_deposit(owner, reference, data["amount"])
 
             return Response({
                 "status": "success",
                 "message": "Transaction verified and recorded successfully.",
-                "amount": data["amount"] ,
+                "amount": deposit.amount,
                 "reference": reference
             })
 
@@ -133,10 +160,46 @@ def verify_transaction(request):
         return Response({
             "status": "failed",
             "message": verification["message"]
-        }, status=400)
+        }, status=503 if verification["status"] == "error" else 400)
+
 
 
 
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def paystack_webhook(request):
+    """
+    Receives Paystack events. Only requests signed with our secret key
+    (X-Paystack-Signature) are accepted; charge.success records the deposit
+    once per reference, so Paystack's retries are harmless.
+    Endpoint: /api/paystack/webhook/
+    """
+    if not payments.valid_signature(request.body, request.headers.get("X-Paystack-Signature")):
+        return Response({"detail": "Invalid signature."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        event = json.loads(request.body)
+    except ValueError:
+        return Response({"detail": "Invalid JSON."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if event.get("event") != "charge.success":
+        return Response({"status": "ignored"})
+
+    data = event.get("data") or {}
+    reference = data.get("reference")
+    member = payments.resolve_member(data)
+    if not reference or member is None or data.get("status") != "success":
+        # Acknowledge anyway; Paystack would otherwise keep retrying an event we can't use
+        return Response({"status": "ignored"})
+
+    paid_at = parse_datetime(data.get("paid_at") or "")
+    _, created = payments.record_deposit(
+        member, reference, data["amount"], paid_on=paid_at.date() if paid_at else None,
+    )
+    return Response({"status": "recorded" if created else "duplicate"})
+
+
 
 
 
@@ -145,17 +208,10 @@ def verify_transaction(request):
 
 def verify_paystack_transaction(reference):
     """Call Paystack API to verify a transaction by reference"""
-    url = f"https://api.paystack.co/transaction/verify/{reference}"
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_KEY}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        response = requests.get(url, headers=headers)
-        data = response.json()
+        status_code, data = get_client().verify_transaction(reference)
 
-        if response.status_code == 200 and data["status"]:
+        if status_code == 200 and data["status"]:
             return {
                 "status": "success",
                 "data": data["data"]
@@ -167,7 +223,7 @@ def verify_paystack_transaction(reference):
                 "data": data
             }
 
-    except Exception as e:
+    except PaystackError as e:
         return {
             "status": "error",
             "message": str(e),
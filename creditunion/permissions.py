@@ -0,0 +1,14 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsOfficer(BasePermission):
+    """
+    Allows account officers and admins (including Django staff/superusers).
+    """
+    message = "Only account officers can access this resource."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return bool(user.is_officer or user.is_admin or user.is_staff or user.is_superuser)
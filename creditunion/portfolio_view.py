@@ -0,0 +1,27 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .permissions import IsOfficer
+from . import portfolio
+
+
+
+
+@api_view(['GET'])
+@permission_classes([IsOfficer])
+def loan_portfolio(request):
+    """
+    Portfolio analytics for officers: PAR30/60/90, aging buckets,
+    outstanding principal and expected collections, with a per-church breakdown.
+    Query params: ?church=<id> to restrict to one church, ?horizon=<days> (default 30).
+    """
+    church_id = request.query_params.get('church')
+    horizon = request.query_params.get('horizon', 30)
+
+    try:
+        church_id = int(church_id) if church_id else None
+        horizon = int(horizon)
+    except ValueError:
+        return Response({"detail": "church and horizon must be integers."}, status=400)
+
+    return Response(portfolio.portfolio_report(church_id=church_id, horizon_days=horizon))
@@ -0,0 +1,139 @@
+"""
+Reconciliation of pending Paystack payment intents.
+
+Some payments are never settled by the webhook or by verify, for example
+when the member closed the tab. `reconcile()` picks stale pending intents,
+never-checked ones first and then those checked longest ago, and asks
+Paystack about each one. An intent isn't checked again until
+`recheck_after` has passed, so a backlog of still-pending payments can't
+starve the rest of the queue. Calls run on a small thread pool,
+with a shared rate limit so Paystack's API limits are respected. All database
+writes stay on the calling thread.
+
+- success: the deposit is recorded through payments.record_deposit, which is
+  deduped by reference. If it was already booked (e.g. by verify while the
+  intent was left pending), the intent is linked to it and succeeded.
+- failed / abandoned / reversed, or unknown to Paystack: the intent is failed.
+- anything else: the intent stays pending, or becomes expired once it is
+  older than `expire_after`.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import payments
+from .models import PaymentIntent
+from .paystack_client import PaystackError, get_client
+
+
+FAILED_STATUSES = {'failed', 'abandoned', 'reversed'}
+
+OUTCOMES = ('checked', 'recorded', 'failed', 'expired', 'still_pending', 'errors')
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart across threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def stale_intents(older_than, recheck_after, batch_size):
+    now = timezone.now()
+    return list(
+        PaymentIntent.objects.filter(status='pending', created_at__lte=now - older_than)
+        .filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lte=now - recheck_after))
+        .select_related('member')
+        .order_by(F('last_checked_at').asc(nulls_first=True), 'created_at')[:batch_size]
+    )
+
+
+def check(intent, limiter):
+    """
+    Asks Paystack about one intent (runs on a worker thread).
+    Returns (intent, status, body) or (intent, None, error message).
+    """
+    limiter.wait()
+    try:
+        status, body = get_client().verify_transaction(intent.reference)
+    except PaystackError as exc:
+        return intent, None, str(exc)
+    return intent, status, body
+
+
+def settle(intent, status, body, expire_before, now):
+    """
+    Applies one Paystack answer to its intent; returns the outcome name.
+    """
+    data = body.get('data') if status == 200 and body.get('status') else None
+    paystack_status = (data or {}).get('status')
+
+    if paystack_status == 'success':
+        deposit, created = payments.record_deposit(intent.member, intent.reference, data['amount'])
+        if not created:
+            PaymentIntent.objects.filter(pk=intent.pk).exclude(status='succeeded').update(
+                status='succeeded', transaction=deposit, attempts=intent.attempts + 1,
+                last_checked_at=now, updated_at=now,
+            )
+        return 'recorded'
+
+    if paystack_status in FAILED_STATUSES or (status == 400 and not body.get('status')):
+        new_status, outcome = 'failed', 'failed'
+    elif intent.created_at <= expire_before:
+        new_status, outcome = 'expired', 'expired'
+    else:
+        new_status, outcome = 'pending', 'still_pending'
+
+    PaymentIntent.objects.filter(pk=intent.pk, status='pending').update(
+        status=new_status, attempts=intent.attempts + 1, last_checked_at=now, updated_at=now,
+    )
+    return outcome
+
+
+def reconcile(older_than=timedelta(minutes=15), expire_after=timedelta(hours=24),
+              recheck_after=timedelta(minutes=15), batch_size=200, concurrency=4, rate=5.0):
+    """
+    Runs one reconciliation pass over at most `batch_size` intents that
+    have been pending for longer than `older_than` and weren't checked in
+    the last `recheck_after`.
+    Returns a Counter of OUTCOMES.
+    """
+    counts = Counter({outcome: 0 for outcome in OUTCOMES})
+    intents = stale_intents(older_than, recheck_after, batch_size)
+    if not intents:
+        return counts
+
+    limiter = RateLimiter(rate)
+    now = timezone.now()
+    expire_before = now - expire_after
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for intent, status, body in pool.map(lambda intent: check(intent, limiter), intents):
+            counts['checked'] += 1
+            if status is None:
+                counts['errors'] += 1
+                PaymentIntent.objects.filter(pk=intent.pk).update(
+                    attempts=intent.attempts + 1, last_checked_at=now, updated_at=now,
+                )
+                continue
+            counts[settle(intent, status, body, expire_before, now)] += 1
+
+    return counts
@@ -0,0 +1,132 @@
+"""
+Cache for read-mostly reference data: the church list and the member
+dropdown list (which depends on each user's role flags).
+
+Each data set has a version number in the shared cache. Writes to Church or
+CustomUser bump it once the transaction commits (see signals.py). Readers
+check the version on every call, which costs a cache lookup but no query:
+
+- the payload for the current version is first looked up in this process,
+- then in the shared cache,
+- and only then rebuilt from the database.
+
+Every payload carries an ETag, so list endpoints can answer If-None-Match
+with a 304.
+
+Without settings.SHARED_CACHE the versions would only change in the worker
+that did the write, so nothing is cached: every call rebuilds the payload
+and its ETag.
+"""
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Church, CustomUser
+
+
+VERSION_KEY = "reference:{name}:version"
+PAYLOAD_KEY = "reference:{name}:v{version}"
+
+# name -> (version, payload, etag), for this process only
+_local = {}
+
+
+def build_churches():
+    from .serializers import ChurchSerializer
+    return ChurchSerializer(Church.objects.order_by('id'), many=True).data
+
+
+def build_members():
+    from .serializers import MemberSerializer
+    members = CustomUser.objects.filter(is_member=True, is_active=True).order_by('id')
+    return MemberSerializer(members, many=True).data
+
+
+BUILDERS = {
+    'churches': build_churches,
+    'members': build_members,
+}
+
+
+def build(name):
+    """
+    Builds (payload, etag) for the data set `name` from the database.
+    """
+    payload = json.loads(json.dumps(BUILDERS[name](), cls=DjangoJSONEncoder))
+    etag = '"%s"' % hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return payload, etag
+
+
+def get_version(name):
+    # A missing version starts from the current time in ms, like response_cache
+    key = VERSION_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump(*names):
+    """
+    Invalidates the named data sets once the current transaction commits.
+    """
+    if not settings.SHARED_CACHE:
+        return
+
+    def apply():
+        for name in names:
+            key = VERSION_KEY.format(name=name)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, int(time.time() * 1000), timeout=None)
+
+    transaction.on_commit(apply)
+
+
+def get(name):
+    """
+    Returns (payload, etag) for the data set `name`.
+    """
+    if not settings.SHARED_CACHE:
+        return build(name)
+
+    version = get_version(name)
+    local = _local.get(name)
+    if local is not None and local[0] == version:
+        return local[1], local[2]
+
+    key = PAYLOAD_KEY.format(name=name, version=version)
+    stored = cache.get(key)
+    if stored is None:
+        stored = build(name)
+        cache.set(key, stored, settings.REFERENCE_CACHE_TTL)
+
+    _local[name] = (version, *stored)
+    return stored
+
+
+def church(church_id):
+    """
+    Returns the Church with this id built from the cached list, or None.
+    """
+    if not settings.SHARED_CACHE:
+        return Church.objects.filter(pk=church_id).first()
+
+    for row in get('churches')[0]:
+        if row['id'] == church_id:
+            instance = Church(**row)
+            instance._state.adding = False
+            return instance
+    return None
+
+
+def clear_local():
+    _local.clear()
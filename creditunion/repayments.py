@@ -0,0 +1,208 @@
+"""
+Loan repayment posting.
+
+Each repayment is inserted in the same transaction that updates the loan's
+running totals, with the loan row locked (SELECT ... FOR UPDATE) so two
+officers posting against the same loan at once can't lose an update.
+
+Batches (payroll deductions, group collections) go through
+`lock_active_loans` and `record_repayments`, which do the same work with a
+constant number of queries for the whole batch.
+
+Editing or deleting a repayment goes through `update_repayment` and
+`delete_repayment`, which take the same lock and re-derive the loan's totals,
+status and schedule from its remaining repayments (`resync_loan`).
+`verify_loans` / `rebuild_loans` check and repair the stored totals
+(see the rebuild_loan_totals command).
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import response_cache, schedules
+from .models import Loan, LoanInstallment, LoanRepayment
+
+
+def record_repayment(loan_id, amount_paid, payment_date=None):
+    """
+    Records a repayment against an active loan, updates its total_repaid and
+    balance, allocates it to the installment schedule, and marks the loan
+    completed once fully paid.
+    Returns the new LoanRepayment.
+    """
+    with transaction.atomic():
+        loan = Loan.objects.select_for_update().get(pk=loan_id)
+        if loan.status != 'active':
+            raise serializers.ValidationError("No active loan found for this member.")
+
+        repayment = LoanRepayment.objects.create(
+            loan=loan,
+            amount_paid=amount_paid,
+            member_id=loan.member_id,
+            payment_date=payment_date or timezone.now().date(),
+        )
+
+        schedules.allocate_payment(loan.pk, amount_paid)
+
+        loan.total_repaid += amount_paid
+        loan.balance = loan.total_amount - loan.total_repaid
+        update_fields = ['total_repaid', 'balance']
+
+        # Update loan status if fully paid
+        if loan.is_fully_paid():
+            loan.status = 'completed'
+            update_fields.append('status')
+
+        loan.save(update_fields=update_fields)
+
+    return repayment
+
+
+def resync_loan(loan):
+    """
+    Recomputes a locked loan's total_repaid, balance and schedule from its
+    repayments. An active or completed loan is completed exactly when it is
+    fully paid, so removing a payment can reopen it.
+    """
+    loan.total_repaid = loan.repayments.aggregate(total=Sum('amount_paid'))['total'] or Decimal('0.00')
+    loan.balance = loan.total_amount - loan.total_repaid
+    if loan.status in ('active', 'completed'):
+        loan.status = 'completed' if loan.is_fully_paid() else 'active'
+    loan.save(update_fields=['total_repaid', 'balance', 'status'])
+    schedules.reallocate(loan.pk, loan.total_repaid)
+    return loan
+
+
+def update_repayment(repayment_id, amount_paid):
+    """
+    Changes a repayment's amount under its loan's row lock, then re-derives
+    the loan. Returns the updated LoanRepayment.
+    """
+    with transaction.atomic():
+        loan_id = LoanRepayment.objects.values_list('loan_id', flat=True).get(pk=repayment_id)
+        loan = Loan.objects.select_for_update().get(pk=loan_id)
+        repayment = LoanRepayment.objects.get(pk=repayment_id)
+        repayment.amount_paid = amount_paid
+        repayment.save(update_fields=['amount_paid'])
+        resync_loan(loan)
+    return repayment
+
+
+def delete_repayment(repayment_id):
+    """
+    Deletes a repayment under its loan's row lock, then re-derives the loan.
+    """
+    with transaction.atomic():
+        loan_id = LoanRepayment.objects.values_list('loan_id', flat=True).get(pk=repayment_id)
+        loan = Loan.objects.select_for_update().get(pk=loan_id)
+        LoanRepayment.objects.get(pk=repayment_id).delete()
+        resync_loan(loan)
+
+
+def verify_loans():
+    """
+    Compares every loan's stored totals, status and schedule with what its
+    repayments imply. Returns a list of (loan id, field, stored, expected).
+    """
+    repaid = dict(
+        LoanRepayment.objects.order_by().values('loan_id').annotate(total=Sum('amount_paid'))
+        .values_list('loan_id', 'total')
+    )
+    schedules_by_loan = {}
+    for loan_id, amount_due, amount_paid in (
+        LoanInstallment.objects.order_by('loan_id', 'number').values_list('loan_id', 'amount_due', 'amount_paid')
+    ):
+        schedules_by_loan.setdefault(loan_id, []).append((amount_due, amount_paid))
+
+    mismatches = []
+    for loan in Loan.objects.order_by('pk').only('id', 'total_amount', 'total_repaid', 'balance', 'status').iterator():
+        expected = repaid.get(loan.pk) or Decimal('0.00')
+        checks = [
+            ('total_repaid', loan.total_repaid, expected),
+            ('balance', loan.balance, loan.total_amount - expected),
+        ]
+        if loan.status in ('active', 'completed'):
+            checks.append(('status', loan.status, 'completed' if expected >= loan.total_amount else 'active'))
+        installments = schedules_by_loan.get(loan.pk, [])
+        if installments:
+            checks.append((
+                'schedule',
+                [paid for _, paid in installments],
+                schedules.split_payment([due for due, _ in installments], expected),
+            ))
+        mismatches.extend((loan.pk, field, stored, value) for field, stored, value in checks if stored != value)
+    return mismatches
+
+
+def rebuild_loans(loan_ids):
+    """
+    Re-derives the given loans from their repayments, each under its own
+    row lock. Returns the number of loans rebuilt.
+    """
+    for loan_id in loan_ids:
+        with transaction.atomic():
+            resync_loan(Loan.objects.select_for_update().get(pk=loan_id))
+    return len(loan_ids)
+
+
+
+def lock_active_loans(member_ids):
+    """
+    Locks the active loans of the given members in one query.
+    Returns {member id: loan}. Must run inside a transaction.
+    """
+    loans = {}
+    for loan in Loan.objects.select_for_update().filter(member_id__in=member_ids, status='active').order_by('pk'):
+        loans.setdefault(loan.member_id, loan)
+    return loans
+
+
+def record_repayments(loans, entries):
+    """
+    Records a batch of repayments against loans locked by lock_active_loans()
+    in the same transaction. `entries` are (row index, member id, amount,
+    payment date or None) in posting order.
+
+    Inserts the repayments with one bulk_create, allocates them to the
+    schedules, and updates the loans' totals (completing the fully paid ones)
+    with one bulk_update. Like record_repayment, a row for a loan an earlier
+    row already paid off is rejected.
+    Returns (repayments, {row index: error}).
+    """
+    today = timezone.now().date()
+    repayments, errors = [], {}
+    paid = defaultdict(Decimal)
+
+    for index, member_id, amount, payment_date in entries:
+        loan = loans[member_id]
+        if loan.status != 'active':
+            errors[index] = "No active loan found for this member."
+            continue
+        repayments.append(LoanRepayment(
+            loan=loan,
+            amount_paid=amount,
+            member_id=member_id,
+            payment_date=payment_date or today,
+        ))
+        paid[loan.pk] += amount
+        loan.total_repaid += amount
+        loan.balance = loan.total_amount - loan.total_repaid
+        if loan.is_fully_paid():
+            loan.status = 'completed'
+
+    if not repayments:
+        return repayments, errors
+
+    LoanRepayment.objects.bulk_create(repayments)
+    schedules.allocate_payments(paid)
+    changed = [loan for loan in loans.values() if loan.pk in paid]
+    Loan.objects.bulk_update(changed, ['total_repaid', 'balance', 'status'])
+
+    # bulk writes skip the signals that normally refresh member dashboards
+    response_cache.bump_versions(loan.member_id for loan in changed)
+    return repayments, errors
@@ -0,0 +1,117 @@
+"""
+Per-member response cache for the member portal endpoints.
+
+Payloads are stored under a key that embeds the member's current version
+number. Any write to that member's Transaction, Loan or LoanRepayment rows
+bumps the version (see signals.py), so stale payloads are never read again
+and simply age out after MEMBER_CACHE_TTL.
+
+Caching is off unless settings.SHARED_CACHE is set: with a per-process cache
+another worker would never see the version bump.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = "member:{member_id}:version"
+PAYLOAD_KEY = "member:{member_id}:{name}:v{version}"
+STATS_KEY = "response_cache:{name}:{outcome}"
+
+CACHED_VIEWS = ("dashboard", "loan_summary")
+
+
+def _incr(key, initial):
+    """
+    Increments a counter, creating it with `initial` if it doesn't exist yet.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def get_version(member_id):
+    """
+    Returns the member's current cache version.
+    A missing (or evicted) version starts from the current time in ms so it
+    can never collide with a version used by payloads still in the cache.
+    """
+    key = VERSION_KEY.format(member_id=member_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(member_id):
+    _incr(VERSION_KEY.format(member_id=member_id), int(time.time() * 1000))
+
+
+def bump_versions(member_ids):
+    """
+    Invalidates the cached payloads of every given member once the current
+    database transaction commits, so a reader can't re-cache the old state.
+    """
+    member_ids = {member_id for member_id in member_ids if member_id is not None}
+    if not member_ids or not settings.SHARED_CACHE:
+        return
+
+    def bump():
+        for member_id in member_ids:
+            bump_version(member_id)
+
+    transaction.on_commit(bump)
+
+
+def get_or_build(name, member_id, build):
+    """
+    Returns (payload, hit) for one member's view `name`, calling `build()`
+    and caching its result on a miss.
+    """
+    if not settings.SHARED_CACHE:
+        return build(), False
+
+    key = PAYLOAD_KEY.format(member_id=member_id, name=name, version=get_version(member_id))
+    payload = cache.get(key)
+    if payload is not None:
+        _incr(STATS_KEY.format(name=name, outcome="hit"), 1)
+        return payload, True
+
+    _incr(STATS_KEY.format(name=name, outcome="miss"), 1)
+    payload = build()
+    cache.set(key, payload, settings.MEMBER_CACHE_TTL)
+    return payload, False
+
+
+def cache_stats():
+    """
+    Returns {view name: {"hit": n, "miss": n}} for every cached view.
+    """
+    keys = [
+        STATS_KEY.format(name=name, outcome=outcome)
+        for name in CACHED_VIEWS
+        for outcome in ("hit", "miss")
+    ]
+    values = cache.get_many(keys)
+    return {
+        name: {
+            outcome: values.get(STATS_KEY.format(name=name, outcome=outcome), 0)
+            for outcome in ("hit", "miss")
+        }
+        for name in CACHED_VIEWS
+    }
+
+
+def reset_stats():
+    cache.delete_many([
+        STATS_KEY.format(name=name, outcome=outcome)
+        for name in CACHED_VIEWS
+        for outcome in ("hit", "miss")
+    ])
@@ -0,0 +1,85 @@
+"""
+Refresh-token blacklist lookups and pruning.
+
+simplejwt checks the blacklist with a join on every refresh. Here the answer
+is kept in the cache under the token's jti:
+
+- A blacklisted jti is kept until the token itself expires. It is stored when
+  the BlacklistedToken row is saved (see signals.py), so signout takes effect
+  at once on every worker that shares the cache.
+- A jti that isn't blacklisted is kept for settings.TOKEN_BLACKLIST_CACHE_TTL
+  seconds. That bounds how long a worker with a process-local cache can miss
+  a blacklisting done elsewhere.
+
+Expired tokens can't be used anyway, so `prune_expired` deletes their
+outstanding and blacklisted rows in batches to keep both tables small.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def cache_key(jti):
+    return f"jwt-blacklist:{jti}"
+
+
+def mark_blacklisted(jti, expires_at):
+    """
+    Remembers a blacklisted jti until the token's expiry.
+    """
+    remaining = (expires_at - timezone.now()).total_seconds()
+    if remaining > 0:
+        cache.set(cache_key(jti), 1, int(remaining) + 1)
+
+
+def is_blacklisted(jti):
+    cached = cache.get(cache_key(jti))
+    if cached is not None:
+        return bool(cached)
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    # add() so a negative answer never overwrites a concurrent mark_blacklisted()
+    cache.add(cache_key(jti), int(blacklisted), settings.TOKEN_BLACKLIST_CACHE_TTL)
+    return blacklisted
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check goes through the cache.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+def prune_expired(batch_size=5000, pause=0, now=None):
+    """
+    Deletes outstanding tokens that expired before `now`, with their
+    blacklist entries, `batch_size` at a time, sleeping `pause` seconds
+    between batches. Returns (outstanding, blacklisted) rows deleted.
+    """
+    now = now or timezone.now()
+    expired = OutstandingToken.objects.filter(expires_at__lt=now).order_by('id')
+    outstanding = blacklisted = 0
+
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+        outstanding += deleted.get(OutstandingToken._meta.label, 0)
+        blacklisted += deleted.get(BlacklistedToken._meta.label, 0)
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return outstanding, blacklisted
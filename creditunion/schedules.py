@@ -0,0 +1,129 @@
+"""
+Loan amortization schedules.
+
+An approved loan's repayment is split into `term` monthly LoanInstallment
+rows, written once at approval. Repayments are allocated against the oldest
+unpaid installments, so the next payment and arrears are simple lookups.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from dateutil.relativedelta import relativedelta
+
+from .models import LoanInstallment
+
+
+CENT = Decimal('0.01')
+
+
+def build_installments(loan):
+    """
+    Returns the unsaved installments for a loan: equal monthly amounts
+    (the last one absorbs rounding) due one month apart from disbursement.
+    """
+    if not loan.term:
+        return []
+
+    start = loan.disbursed_date or loan.created_at
+    amount = (loan.total_amount / loan.term).quantize(CENT, rounding=ROUND_HALF_UP)
+    last_amount = loan.total_amount - amount * (loan.term - 1)
+
+    return [
+        LoanInstallment(
+            loan=loan,
+            number=number,
+            due_date=start + relativedelta(months=number),
+            amount_due=last_amount if number == loan.term else amount,
+        )
+        for number in range(1, loan.term + 1)
+    ]
+
+
+def create_schedule(loan):
+    """
+    Writes a loan's installment schedule in one bulk insert.
+    """
+    return LoanInstallment.objects.bulk_create(build_installments(loan))
+
+
+def allocate_payment(loan_id, amount):
+    """
+    Applies a payment to a loan's unpaid installments, oldest first.
+    Must run inside the transaction that holds the loan's row lock.
+    Any excess over the schedule is left unallocated.
+    """
+    return allocate_payments({loan_id: amount})
+
+
+def allocate_payments(amounts):
+    """
+    allocate_payment for many loans at once: `amounts` maps loan id to the
+    total paid. Reads every unpaid installment in one query and writes the
+    changed ones in one bulk update.
+    """
+    installments = (
+        LoanInstallment.objects.select_for_update()
+        .filter(loan_id__in=list(amounts))
+        .exclude(status='paid')
+        .order_by('loan_id', 'number')
+    )
+
+    changed = []
+    remaining = {loan_id: Decimal(amount) for loan_id, amount in amounts.items()}
+    for installment in installments:
+        if remaining[installment.loan_id] <= 0:
+            continue
+        applied = min(remaining[installment.loan_id], installment.amount_outstanding)
+        installment.amount_paid += applied
+        installment.status = 'paid' if installment.amount_outstanding <= 0 else 'partial'
+        remaining[installment.loan_id] -= applied
+        changed.append(installment)
+
+    LoanInstallment.objects.bulk_update(changed, ['amount_paid', 'status'])
+    return changed
+
+
+def split_payment(amounts_due, total_paid):
+    """
+    Splits a loan's total repaid over its installment amounts, oldest first.
+    Returns the amount paid on each installment.
+    """
+    paid = []
+    remaining = Decimal(total_paid)
+    for amount_due in amounts_due:
+        applied = max(min(remaining, amount_due), Decimal('0'))
+        remaining -= applied
+        paid.append(applied)
+    return paid
+
+
+def reallocate(loan_id, total_paid):
+    """
+    Re-derives a loan's whole schedule from its total repaid, for when a
+    repayment was edited or deleted and an incremental allocation can't be
+    undone. Must run inside the transaction that holds the loan's row lock.
+    """
+    installments = list(LoanInstallment.objects.select_for_update().filter(loan_id=loan_id).order_by('number'))
+    for installment, paid in zip(installments, split_payment([i.amount_due for i in installments], total_paid)):
+        installment.amount_paid = paid
+        installment.status = 'paid' if paid >= installment.amount_due else ('partial' if paid else 'pending')
+
+    LoanInstallment.objects.bulk_update(installments, ['amount_paid', 'status'])
+    return installments
+
+
+def schedule_position(loan, today):
+    """
+    Returns (next_installment, arrears) for a loan: the earliest unpaid
+    installment (or None) and the unpaid amount of installments already due.
+    """
+    unpaid = list(
+        LoanInstallment.objects.filter(loan=loan)
+        .exclude(status='paid')
+        .order_by('number')
+    )
+    arrears = sum(
+        (installment.amount_outstanding for installment in unpaid if installment.due_date < today),
+        Decimal('0.00'),
+    )
+    return (unpaid[0] if unpaid else None), arrears
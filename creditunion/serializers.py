@@ -4,7 +4,7 @@ from .models import Transaction
 from .models import CustomUser, Loan, LoanRepayment, Member, Church
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db import models  # Add this line
+from . import reference_cache, repayments
 from datetime import datetime
 import os
 
@@ -29,6 +29,8 @@ class TransactionSerializer(serializers.ModelSerializer):
             'date', 'reference', 'notes'
         ]
         read_only_fields = ['account_officer']
+        # Rows saved here are 'manual', which unique_paystack_reference doesn't cover
+        extra_kwargs = {'reference': {'validators': []}}
         
         
 
@@ -43,6 +45,21 @@ class TransactionSerializer(serializers.ModelSerializer):
 
 
 
+class TransactionImportSerializer(TransactionSerializer):
+    """
+    Validates one row of a bulk transaction import.
+    Member ids are checked against a set resolved once for the whole batch
+    (context['member_ids']) instead of a lookup per row.
+    """
+    member = serializers.IntegerField()
+
+    def validate_member(self, value):
+        if value not in self.context['member_ids']:
+            raise serializers.ValidationError("Unknown member.")
+        return value
+
+
+
 class MemberSerializer(serializers.ModelSerializer):
     """Serializer for listing members in dropdowns."""
     class Meta:
@@ -50,12 +67,25 @@ class MemberSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'email']
 
 
+class MemberSearchSerializer(serializers.ModelSerializer):
+    """Serializer for member typeahead results (see MemberSearchView)."""
+    full_name = serializers.CharField(source='member.full_name', read_only=True, allow_null=True)
+    membership_number = serializers.CharField(source='member.membership_number', read_only=True, allow_null=True)
+
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'phone', 'full_name', 'membership_number']
+
+
 
 class LoanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = '__all__'
-        read_only_fields = ['status', 'total_amount', 'disbursed_date', 'due_date', 'created_at']
+        read_only_fields = [
+            'status', 'total_amount', 'total_repaid', 'balance',
+            'disbursed_date', 'due_date', 'created_at',
+        ]
 
     def create(self, validated_data):
         """
@@ -80,6 +110,15 @@ class LoanSerializer(serializers.ModelSerializer):
     
     
 
+class LoanDecisionSerializer(serializers.Serializer):
+    """Request body for LoanViewSet.decide: one action applied to many loans."""
+    MAX_LOANS = 200
+
+    action = serializers.ChoiceField(choices=['approve', 'reject', 'cancel'])
+    loans = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_LOANS)
+
+
+
 class LoanRepaymentSerializer(serializers.ModelSerializer):
     """
     Serializer for recording loan repayments.
@@ -89,9 +128,12 @@ class LoanRepaymentSerializer(serializers.ModelSerializer):
     - Loan status is 'active'.
     - Prevents repayment to non-active loans.
 
-    Handles:
-    - Updating total repaid.
+    Handles (via repayments.record_repayment):
+    - Updating total repaid and balance on the loan.
     - Automatically marking loan as completed if fully paid.
+
+    Only the amount can be changed afterwards; repayments.update_repayment
+    then re-derives the loan's totals, status and schedule.
     """
 
     loan_id = serializers.IntegerField(write_only=True, required=False)  # <-- not required
@@ -115,25 +157,40 @@ class LoanRepaymentSerializer(serializers.ModelSerializer):
         member = validated_data['member']
         amount_paid = validated_data['amount_paid']
 
-        # Find active loan
-        loan = Loan.objects.filter(member=member, status='active').first()
+        # Use the loan resolved by the view, else find the active loan
+        loan = validated_data.get('loan') or Loan.objects.filter(member=member, status='active').first()
         if not loan:
             raise serializers.ValidationError("No active loan found for this member.")
 
-        repayment = LoanRepayment.objects.create(
-            loan=loan,
-            amount_paid=amount_paid,
-            member=loan.member,  # ✅ ensure member is set
-            payment_date=timezone.now().date(),
-        )
+        # Locks the loan, inserts the repayment and updates its totals/status together
+        return repayments.record_repayment(loan.pk, amount_paid)
 
-        # Update loan status if fully paid
-        total_paid = loan.repayments.aggregate(total=models.Sum('amount_paid'))['total'] or Decimal('0.00')
-        if total_paid >= loan.total_amount:
-            loan.status = 'completed'
-            loan.save()
+    def update(self, instance, validated_data):
+        if 'amount_paid' not in validated_data:
+            return instance
+        return repayments.update_repayment(instance.pk, validated_data['amount_paid'])
 
-        return repayment
+
+class LoanRepaymentImportSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk repayment import. Members are checked
+    against the active loans resolved once for the whole batch
+    (context['loans']) instead of a lookup per row.
+    """
+    member = serializers.IntegerField()
+    amount_paid = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    payment_date = serializers.DateField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # A blank CSV cell means "today", like a missing key
+        if data.get('payment_date') == '':
+            data = {**data, 'payment_date': None}
+        return super().to_internal_value(data)
+
+    def validate_member(self, value):
+        if value not in self.context['loans']:
+            raise serializers.ValidationError("No active loan found for this member.")
+        return value
 
 
 class LoanListSerializer(serializers.ModelSerializer):
@@ -165,6 +222,26 @@ class LoanListSerializer(serializers.ModelSerializer):
         
 
 
+class CachedChurchField(serializers.PrimaryKeyRelatedField):
+    """
+    Church id validated against the cached church list instead of a query.
+    """
+
+    def get_queryset(self):
+        return Church.objects.all()
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            church = reference_cache.church(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if church is None:
+            self.fail('does_not_exist', pk_value=data)
+        return church
+
+
 class MemberProfileSerializer(serializers.ModelSerializer):
     """
     Serializer for fetching and updating a member's profile,
@@ -175,10 +252,7 @@ class MemberProfileSerializer(serializers.ModelSerializer):
     membership_number = serializers.CharField(source='member.membership_number', read_only=True)
 
     
-    church = serializers.PrimaryKeyRelatedField(
-        queryset=CustomUser._meta.get_field('church').related_model.objects.all(),
-        required=False
-    )
+    church = CachedChurchField(required=False)
     phone = serializers.CharField(source='user.phone', required=False)
     email = serializers.EmailField(source='user.email', required=False)
 
@@ -0,0 +1,90 @@
+"""
+Signal handlers that keep derived data in step with the models it is built from.
+Connected in CreditunionConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import ledger, reference_cache, response_cache, revocation
+from .authentication import user_cache
+from .models import Church, CustomUser, Loan, LoanRepayment, Transaction
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """
+    Captures the stored version of an edited transaction so its
+    old effect can be reversed once the new one is written.
+    """
+    instance._ledger_previous = None
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Transaction.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .values_list('member_id', 'transaction_type', 'amount', 'date')
+        .first()
+    )
+    instance._ledger_previous = previous
+
+
+@receiver(post_save, sender=Transaction)
+def apply_saved_transaction(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    ledger.apply_transactions(
+        added=[ledger.ledger_row(instance)],
+        removed=[previous] if previous else [],
+    )
+
+
+@receiver(post_delete, sender=Transaction)
+def apply_deleted_transaction(sender, instance, origin=None, **kwargs):
+    # Deleting the member cascades to their ledger rows as well; nothing to maintain
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is CustomUser:
+        return
+    ledger.apply_transactions(removed=[ledger.ledger_row(instance)])
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+@receiver(post_save, sender=LoanRepayment)
+@receiver(post_delete, sender=LoanRepayment)
+def invalidate_member_responses(sender, instance, **kwargs):
+    member_ids = [instance.member_id]
+    # An edited transaction may have moved to another member
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        member_ids.append(previous[0])
+    response_cache.bump_versions(member_ids)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def evict_cached_user(sender, instance, **kwargs):
+    # Only this process's copy; other workers' expire within AUTH_USER_CACHE_TTL
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Church)
+@receiver(post_delete, sender=Church)
+def invalidate_churches(sender, instance, **kwargs):
+    reference_cache.bump('churches')
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_member_list(sender, instance, **kwargs):
+    reference_cache.bump('members')
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def remember_blacklisted_token(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        revocation.mark_blacklisted(instance.token.jti, instance.token.expires_at)
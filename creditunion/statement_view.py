@@ -0,0 +1,185 @@
+import csv
+import json
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Transaction
+from .permissions import IsOfficer
+from . import ledger
+
+
+STATEMENT_COLUMNS = ['id', 'date', 'type', 'amount', 'reference', 'notes', 'balance']
+
+STATEMENT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per round-trip while streaming
+STATEMENT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    File-like object whose write() hands the line back,
+    so csv.writer can format rows for a streaming response.
+    """
+    def write(self, value):
+        return value
+
+
+
+
+def statement_queryset(member_id, start=None, end=None):
+    """
+    Returns the member's transactions in date order as value tuples, and the
+    balance carried in from before `start`.
+    """
+    transactions = Transaction.objects.filter(member_id=member_id)
+    balance = ledger.ZERO
+    if start:
+        transactions = transactions.filter(date__gte=start)
+        balance = ledger.balance_before(member_id, start)
+    if end:
+        transactions = transactions.filter(date__lte=end)
+
+    rows = transactions.order_by('date', 'id').values_list(
+        'id', 'date', 'transaction_type', 'amount', 'reference', 'notes',
+    )
+    return rows, balance
+
+
+def statement_rows(member_id, start=None, end=None):
+    """
+    Yields (id, date, type, amount, reference, notes, running balance)
+    for a member's transactions in date order, reading the table in chunks.
+    """
+    rows, balance = statement_queryset(member_id, start=start, end=end)
+    for tx_id, tx_date, tx_type, amount, reference, notes in rows.iterator(chunk_size=STATEMENT_CHUNK_SIZE):
+        balance += ledger.signed_amount(tx_type, amount)
+        yield tx_id, tx_date, tx_type, amount, reference, notes, balance
+
+
+async def astatement_rows(rows, balance):
+    """
+    Async version of statement_rows, for responses served under ASGI.
+    Takes statement_queryset()'s result, which has to be built in sync code,
+    and reads it in (date, id) keyset chunks, each fetched off the event loop.
+    """
+    fetch = sync_to_async(list)
+    chunk = await fetch(rows[:STATEMENT_CHUNK_SIZE])
+    while chunk:
+        for tx_id, tx_date, tx_type, amount, reference, notes in chunk:
+            balance += ledger.signed_amount(tx_type, amount)
+            yield tx_id, tx_date, tx_type, amount, reference, notes, balance
+        if len(chunk) < STATEMENT_CHUNK_SIZE:
+            break
+        last_id, last_date = chunk[-1][0], chunk[-1][1]
+        after = Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id)
+        chunk = await fetch(rows.filter(after)[:STATEMENT_CHUNK_SIZE])
+
+
+def query_date(request, name):
+    """
+    Parses an optional YYYY-MM-DD query param; raises ValueError if malformed.
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date for {name}: {value}")
+    return parsed
+
+
+def ndjson_line(row):
+    tx_id, tx_date, tx_type, amount, reference, notes, balance = row
+    return json.dumps({
+        'id': tx_id,
+        'date': tx_date.isoformat(),
+        'type': tx_type,
+        'amount': str(amount),
+        'reference': reference,
+        'notes': notes,
+        'balance': str(balance),
+    }) + '\n'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STATEMENT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield ndjson_line(row)
+
+
+async def astream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STATEMENT_COLUMNS)
+    async for row in rows:
+        yield writer.writerow(row)
+
+
+async def astream_ndjson(rows):
+    async for row in rows:
+        yield ndjson_line(row)
+
+
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def member_statement_export(request):
+    """
+    Streams a full statement with a running balance column.
+    Query params:
+    - export_format: csv (default) or ndjson
+    - start / end: optional YYYY-MM-DD bounds (the balance still includes earlier history)
+    - member: user id to export; officers only, defaults to the requesting user
+    Under ASGI the rows are read with an async iterator, so the export is
+    never held in memory whole.
+    """
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in STATEMENT_CONTENT_TYPES:
+        return Response({"detail": "export_format must be 'csv' or 'ndjson'."}, status=400)
+
+    member_id = request.user.id
+    if request.query_params.get('member'):
+        if not IsOfficer().has_permission(request, None):
+            return Response({"detail": "Only account officers can export another member's statement."}, status=403)
+        try:
+            member_id = int(request.query_params['member'])
+        except ValueError:
+            return Response({"detail": "member must be a user id."}, status=400)
+
+    try:
+        start = query_date(request, 'start')
+        end = query_date(request, 'end')
+    except ValueError:
+        return Response({"detail": "start and end must be dates (YYYY-MM-DD)."}, status=400)
+
+    if isinstance(request._request, ASGIRequest):
+        # Django buffers a sync iterator whole before sending it over ASGI,
+        # so the export is streamed from an async iterator there
+        rows = astatement_rows(*statement_queryset(member_id, start=start, end=end))
+        stream = astream_csv(rows) if export_format == 'csv' else astream_ndjson(rows)
+    else:
+        rows = statement_rows(member_id, start=start, end=end)
+        stream = stream_csv(rows) if export_format == 'csv' else stream_ndjson(rows)
+
+    response = StreamingHttpResponse(stream, content_type=STATEMENT_CONTENT_TYPES[export_format])
+    filename = f"statement-{member_id}-{date.today().isoformat()}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,3 +1,1699 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import importlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import (
+    benchmarks, ledger, payments, paystack_client, portfolio, reconciliation, reference_cache, repayments, response_cache, revocation,
+    schedules, statement_view,
+)
+from .paystack_client import CircuitBreaker, PaystackClient, PaystackError, PaystackUnavailable
+from .paystack_stub import PaystackStub
+from .authentication import user_cache, user_from_claims
+from .models import (
+    Church, CustomUser, Loan, LoanRepayment, Member, MemberBalance, MonthlyRollup, PaymentIntent, Transaction,
+)
+
+
+class LoanSummaryQueryCountTests(TestCase):
+    """
+    The loan summary must be served in a constant number of queries,
+    however many loans and repayments a member has.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def make_member(self, username, loan_count):
+        user = CustomUser.objects.create(username=username)
+        Member.objects.create(user=user, full_name=username, membership_number=f"MBR-{username}")
+
+        for i in range(loan_count):
+            loan = Loan.objects.create(
+                member=user,
+                amount=Decimal('1000.00'),
+                interest_rate=Decimal('12.00'),
+                term=12,
+                total_amount=Decimal('1120.00'),
+                status='active' if i == 0 else 'completed',
+                disbursed_date=date(2024, 1, 1),
+                due_date=date(2025, 1, 1),
+            )
+            for _ in range(3):
+                LoanRepayment.objects.create(loan=loan, member=user, amount_paid=Decimal('100.00'))
+        return user
+
+    def count_queries(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/loan-summary/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response.json()
+
+    def test_query_count_does_not_scale_with_loans(self):
+        few_queries, few = self.count_queries(self.make_member('few', 1))
+        many_queries, many = self.count_queries(self.make_member('many', 8))
+
+        self.assertEqual(len(few['loanHistory']), 1)
+        self.assertEqual(len(many['loanHistory']), 8)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_repayment_totals(self):
+        _, data = self.count_queries(self.make_member('totals', 2))
+
+        self.assertEqual(data['activeLoan']['paidAmount'], 300.0)
+        for loan in data['loanHistory']:
+            self.assertEqual(loan['totalPayment'], 300.0)
+
+
+
+class QueryPlanTests(TestCase):
+    """
+    Captures every query the hot member endpoints run and checks its EXPLAIN
+    plan: none of them may fall back to a sequential scan of an app table,
+    and each endpoint's plans must name the indexes it was tuned for.
+    """
+
+    # url -> indexes that must appear in the plans of the queries it runs
+    ENDPOINTS = {
+        '/api/member-dashboard/': ['txn_member_date_id'],
+        '/api/loan-summary/': ['loan_member_status', 'repayment_loan_amount'],
+        '/api/loan-history/': ['creditunion_loan_member_id_628c2302'],
+        '/api/loans/active/': ['loan_member_status'],
+        '/api/loans/pending/': ['loan_member_status'],
+        '/api/user-transactions/': ['txn_member_date_id'],
+        '/api/member-statement/?start=2024-06-01': ['txn_member_date_id'],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        users = []
+        for i in range(30):
+            user = CustomUser.objects.create(username=f"plan{i}")
+            Member.objects.create(user=user, full_name=user.username, membership_number=f"MBR-PLAN{i}")
+            users.append(user)
+
+            for status in ('active', 'completed', 'pending'):
+                loan = Loan.objects.create(
+                    member=user,
+                    amount=Decimal('500.00'),
+                    interest_rate=Decimal('10.00'),
+                    term=6,
+                    total_amount=Decimal('525.00'),
+                    status=status,
+                    disbursed_date=date(2024, 1, 1),
+                    due_date=date(2024, 7, 1),
+                )
+                if status == 'active':
+                    schedules.create_schedule(loan)
+                LoanRepayment.objects.create(loan=loan, member=user, amount_paid=Decimal('50.00'))
+
+            for day in range(1, 11):
+                Transaction.objects.create(
+                    member=user,
+                    transaction_type='deposit' if day % 3 else 'withdrawal',
+                    amount=Decimal('20.00'),
+                    date=date(2024, day, 1),
+                )
+        cls.user = users[0]
+
+        # Give the planner statistics, as a production database would have
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # On tables this small Postgres rightly prefers a seq scan, so
+                # make it a last resort. With seq scans off the planner will use
+                # *any* index over none, which is why the test also checks the
+                # index names. SET LOCAL would last for the whole test
+                # transaction, so reset it before the app runs again.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                try:
+                    cursor.execute(f'EXPLAIN {sql}')
+                    return [row[0] for row in cursor.fetchall()]
+                finally:
+                    cursor.execute('RESET enable_seqscan')
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def sequential_scans(self, plan):
+        scans = []
+        for line in plan:
+            if connection.vendor == 'postgresql':
+                if 'Seq Scan on creditunion_' in line:
+                    scans.append(line.strip())
+            elif line.startswith('SCAN creditunion_') and 'INDEX' not in line:
+                scans.append(line)
+        return scans
+
+    def test_hot_endpoints_use_indexes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        for url, indexes in self.ENDPOINTS.items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = client.get(url, HTTP_HOST='localhost')
+                    if hasattr(response, 'streaming_content'):
+                        b''.join(response.streaming_content)
+                self.assertIn(response.status_code, (200, 404))
+
+                selects = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+                self.assertTrue(selects)
+                plans = []
+                for sql in selects:
+                    plan = self.explain(sql)
+                    self.assertEqual(self.sequential_scans(plan), [], f"{sql}\n" + "\n".join(plan))
+                    plans.extend(plan)
+
+                for index in indexes:
+                    self.assertTrue(any(index in line for line in plans), f"{index} not used:\n" + "\n".join(plans))
+
+
+
+@override_settings(SHARED_CACHE=True)
+class BenchmarkTests(TestCase):
+    """
+    Smoke test for the benchmark runner, so the suite doesn't rot
+    between the runs that actually use it.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.member = CustomUser.objects.create_user(username='bench_member', password='pw-bench-1')
+        Member.objects.create(user=self.member, full_name='bench', membership_number='MBR-BENCH')
+        CustomUser.objects.create_user(username='bench_officer', password='pw-bench-1', is_officer=True)
+        Transaction.objects.create(
+            member=self.member, transaction_type='deposit', amount=Decimal('10.00'), date=date(2024, 1, 1),
+        )
+
+    def test_run_and_compare(self):
+        results = benchmarks.run_benchmarks(
+            'bench_member', 'bench_officer', 'pw-bench-1',
+            iterations=3, warmup=0, only=['dashboard', 'transactions', 'signin'],
+        )
+
+        self.assertEqual(set(results['endpoints']), {'dashboard', 'transactions', 'signin'})
+        for metrics in results['endpoints'].values():
+            self.assertEqual(metrics['status'], [200])
+            self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+        # A cached dashboard read under a claims token needs no query at all
+        self.assertEqual(results['endpoints']['dashboard']['queries'], 0)
+        self.assertGreater(results['endpoints']['signin']['queries'], 0)
+
+        _, regressions = benchmarks.compare(results, results)
+        self.assertEqual(regressions, [])
+
+        slower = {'endpoints': {'dashboard': {**results['endpoints']['dashboard']}}}
+        slower['endpoints']['dashboard']['queries'] += 1
+        _, regressions = benchmarks.compare(results, slower)
+        self.assertEqual([(name, metric) for name, metric, *_ in regressions], [('dashboard', 'queries')])
+
+
+
+class PaystackClientTests(SimpleTestCase):
+    """
+    Runs the Paystack client against the local stub server.
+    """
+
+    def setUp(self):
+        self.stub = PaystackStub().start()
+        self.addCleanup(self.stub.stop)
+
+    def make_client(self, **kwargs):
+        kwargs.setdefault('backoff_factor', 0)
+        client = PaystackClient('sk_test', base_url=self.stub.url, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_initialize_then_verify(self):
+        client = self.make_client()
+        status, body = client.initialize_transaction('m@example.com', 5000, reference='ref-1')
+        self.assertEqual((status, body['data']['reference']), (200, 'ref-1'))
+
+        status, body = client.verify_transaction('ref-1')
+        self.assertEqual((status, body['data']['status']), (200, 'success'))
+
+    def test_get_is_retried_but_post_is_not(self):
+        client = self.make_client(max_retries=2)
+        client.initialize_transaction('m@example.com', 5000, reference='ref-2')
+
+        self.stub.fail_next = 2
+        status, _ = client.verify_transaction('ref-2')
+        self.assertEqual(status, 200)
+
+        self.stub.fail_next = 1
+        status, _ = client.initialize_transaction('m@example.com', 5000)
+        self.assertEqual(status, 503)
+        self.assertEqual(len(self.stub.requests), 5)
+
+    def test_read_timeout(self):
+        self.stub.delay = 0.5
+        client = self.make_client(read_timeout=0.1, max_retries=0)
+        with self.assertRaises(PaystackError):
+            client.verify_transaction('missing')
+
+    def test_breaker_opens_and_recovers(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        client = self.make_client(max_retries=0, breaker=breaker)
+        client.initialize_transaction('m@example.com', 5000, reference='ref-3')
+
+        self.stub.fail_next = 2
+        client.verify_transaction('ref-3')
+        client.verify_transaction('ref-3')
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(PaystackUnavailable):
+            client.verify_transaction('ref-3')
+        self.assertEqual(len(self.stub.requests), 3)
+
+        now[0] = 11
+        status, _ = client.verify_transaction('ref-3')
+        self.assertEqual((status, breaker.state), (200, 'closed'))
+
+
+
+@override_settings(PAYSTACK_KEY='sk_test_webhook')
+class PaystackWebhookTests(TestCase):
+    """
+    charge.success webhooks record a deposit once, and verify then answers
+    from the database without calling Paystack.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.stub = PaystackStub().start()
+        self.addCleanup(self.stub.stop)
+        self.addCleanup(setattr, paystack_client, '_client', paystack_client._client)
+        paystack_client._client = PaystackClient('sk_test_webhook', base_url=self.stub.url, max_retries=0)
+
+        self.user = CustomUser.objects.create(username='payer', email='payer@example.com')
+        self.client = APIClient()
+
+    def post_event(self, event, secret='sk_test_webhook'):
+        body = json.dumps(event).encode()
+        signature = hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+        return self.client.post('/api/paystack/webhook/', body, content_type='application/json',
+                                HTTP_X_PAYSTACK_SIGNATURE=signature, HTTP_HOST='localhost')
+
+    def charge(self, reference, amount=5000):
+        return {'event': 'charge.success', 'data': {
+            'reference': reference, 'status': 'success', 'amount': amount,
+            'paid_at': '2024-03-05T10:00:00.000Z', 'metadata': {'member_id': self.user.id},
+        }}
+
+    def test_rejects_bad_signature(self):
+        response = self.post_event(self.charge('ref-bad'), secret='wrong')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_replayed_webhook_records_once(self):
+        first = self.post_event(self.charge('ref-1'))
+        second = self.post_event(self.charge('ref-1'))
+
+        self.assertEqual((first.json()['status'], second.json()['status']), ('recorded', 'duplicate'))
+        deposit = Transaction.objects.get(reference='ref-1')
+        self.assertEqual((deposit.member, deposit.amount, deposit.date), (self.user, Decimal('5000'), date(2024, 3, 5)))
+
+    def test_verify_answers_from_database(self):
+        self.post_event(self.charge('ref-2'))
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get('/api/verify-transaction/?reference=ref-2', HTTP_HOST='localhost')
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(self.stub.requests, [])
+
+    def test_verify_falls_back_to_paystack_once(self):
+        paystack_client._client.initialize_transaction('payer@example.com', 700, reference='ref-3')
+        self.client.force_authenticate(self.user)
+
+        for _ in range(2):
+            response = self.client.get('/api/verify-transaction/?reference=ref-3', HTTP_HOST='localhost')
+            self.assertEqual(response.json()['status'], 'success')
+        self.post_event(self.charge('ref-3', amount=700))
+
+        self.assertEqual(Transaction.objects.filter(reference='ref-3').count(), 1)
+        self.assertEqual(len(self.stub.requests), 2)  # initialize + the first verify
+
+    def test_verify_refuses_someone_elses_payment(self):
+        paystack_client._client.initialize_transaction('payer@example.com', 700, reference='ref-4')
+        payments.create_intent(self.user, 'ref-4', 700)
+        self.client.force_authenticate(CustomUser.objects.create(username='snoop', email='snoop@example.com'))
+
+        response = self.client.get('/api/verify-transaction/?reference=ref-4', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Transaction.objects.filter(reference='ref-4').exists())
+
+
+
+@override_settings(PAYSTACK_KEY='sk_test_async')
+class AsyncPaystackViewTests(TestCase):
+    """
+    The async initiate/verify views, against the local stub.
+    """
+
+    def setUp(self):
+        self.stub = PaystackStub().start()
+        self.addCleanup(self.stub.stop)
+        self.addCleanup(paystack_client.reset_clients)
+        cache.clear()
+        self.user = CustomUser.objects.create(username='async_payer', email='async@example.com')
+        self.headers = {'Authorization': f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def call(self, method, url, **kwargs):
+        with self.settings(PAYSTACK_BASE_URL=self.stub.url):
+            paystack_client.reset_clients()
+            try:
+                return await getattr(AsyncClient(), method)(url, **kwargs)
+            finally:
+                await paystack_client.get_async_client().aclose()
+
+    async def test_requires_token(self):
+        response = await self.call('post', '/api/async/connect-paystack/', data={'amount': 10},
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_initiate_then_verify(self):
+        response = await self.call('post', '/api/async/connect-paystack/', data={'amount': 250},
+                                   content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        reference = response.json()['reference']
+        self.assertEqual(self.stub.transactions[reference]['metadata'], {'member_id': self.user.id})
+
+        for _ in range(2):
+            response = await self.call('get', f'/api/async/verify-transaction/?reference={reference}',
+                                       headers=self.headers)
+            self.assertEqual(response.json()['status'], 'success')
+
+        self.assertEqual(await Transaction.objects.filter(reference=reference).acount(), 1)
+        self.assertEqual(len(self.stub.requests), 2)  # initialize + the first verify
+
+    async def test_initiate_rejects_bad_bodies(self):
+        for body in ('[]', '"5"', '1', '{"amount": "lots"}', 'not json'):
+            with self.subTest(body=body):
+                response = await self.call('post', '/api/async/connect-paystack/', data=body,
+                                           content_type='application/json', headers=self.headers)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "A numeric amount is required."})
+        self.assertEqual(self.stub.requests, [])
+
+    async def test_initiate_replays_same_key(self):
+        headers = {**self.headers, 'Idempotency-Key': 'async-attempt-1'}
+
+        async def initiate(amount):
+            return await self.call('post', '/api/async/connect-paystack/', data={'amount': amount},
+                                   content_type='application/json', headers=headers)
+
+        first, second = await initiate(75), await initiate(75)
+        self.assertEqual(first.json()['reference'], second.json()['reference'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(await PaymentIntent.objects.filter(member=self.user).acount(), 1)
+
+        self.assertEqual((await initiate(80)).status_code, 422)
+
+    async def test_verify_refuses_someone_elses_payment(self):
+        response = await self.call('post', '/api/async/connect-paystack/', data={'amount': 250},
+                                   content_type='application/json', headers=self.headers)
+        reference = response.json()['reference']
+        snoop = await CustomUser.objects.acreate(username='async_snoop', email='async_snoop@example.com')
+
+        response = await self.call('get', f'/api/async/verify-transaction/?reference={reference}',
+                                   headers={'Authorization': f"Bearer {AccessToken.for_user(snoop)}"})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(await Transaction.objects.filter(reference=reference).aexists())
+
+
+
+@override_settings(PAYSTACK_KEY='sk_test_reconcile')
+class ReconciliationTests(TestCase):
+    """
+    Stale pending intents are verified against Paystack and settled.
+    """
+
+    def setUp(self):
+        self.stub = PaystackStub().start()
+        self.addCleanup(self.stub.stop)
+        settings_override = self.settings(PAYSTACK_BASE_URL=self.stub.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        paystack_client.reset_clients()
+        self.addCleanup(paystack_client.reset_clients)
+
+        self.user = CustomUser.objects.create(username='intent_member', email='intent@example.com')
+
+    def intent(self, reference, age, paystack_status=None):
+        intent = PaymentIntent.objects.create(member=self.user, reference=reference, amount=Decimal('40'))
+        PaymentIntent.objects.filter(pk=intent.pk).update(created_at=timezone.now() - age)
+        if paystack_status:
+            self.stub.transactions[reference] = {'reference': reference, 'amount': 40, 'status': paystack_status}
+
+    def test_initiate_stores_intent(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/connect-paystack/', {'amount': 40}, format='json', HTTP_HOST='localhost')
+
+        intent = PaymentIntent.objects.get(reference=response.json()['reference'])
+        self.assertEqual((intent.member, intent.status), (self.user, 'pending'))
+
+    def test_reconcile_settles_stale_intents(self):
+        self.intent('paid', timedelta(hours=1), 'success')
+        self.intent('abandoned', timedelta(hours=1), 'abandoned')
+        self.intent('unknown', timedelta(hours=1))
+        self.intent('ongoing', timedelta(hours=1), 'ongoing')
+        self.intent('old', timedelta(days=2), 'ongoing')
+        self.intent('fresh', timedelta(minutes=1), 'success')
+
+        counts = reconciliation.reconcile(concurrency=3, rate=1000)
+
+        self.assertEqual(
+            {k: v for k, v in counts.items() if v},
+            {'checked': 5, 'recorded': 1, 'failed': 2, 'expired': 1, 'still_pending': 1},
+        )
+        statuses = dict(PaymentIntent.objects.values_list('reference', 'status'))
+        self.assertEqual(statuses, {
+            'paid': 'succeeded', 'abandoned': 'failed', 'unknown': 'failed',
+            'ongoing': 'pending', 'old': 'expired', 'fresh': 'pending',
+        })
+        deposit = Transaction.objects.get(reference='paid')
+        self.assertEqual(PaymentIntent.objects.get(reference='paid').transaction, deposit)
+
+        # Settled intents aren't checked again, and pending ones only after recheck_after
+        self.assertEqual(reconciliation.reconcile(rate=1000)['checked'], 0)
+        self.assertEqual(reconciliation.reconcile(recheck_after=timedelta(0), rate=1000)['checked'], 1)
+
+    def test_least_recently_checked_first(self):
+        for reference, checked in [('never', None), ('recent', timedelta(minutes=5)),
+                                   ('older', timedelta(hours=2)), ('old', timedelta(hours=1))]:
+            self.intent(reference, timedelta(hours=3), 'ongoing')
+            if checked:
+                PaymentIntent.objects.filter(reference=reference).update(last_checked_at=timezone.now() - checked)
+
+        intents = reconciliation.stale_intents(timedelta(minutes=15), timedelta(minutes=15), 10)
+        self.assertEqual([intent.reference for intent in intents], ['never', 'older', 'old'])
+        self.assertEqual(reconciliation.reconcile(batch_size=2, rate=1000)['checked'], 2)
+        self.assertEqual(reconciliation.reconcile(batch_size=2, rate=1000)['checked'], 1)
+
+    def test_already_booked_deposit_settles_intent(self):
+        self.intent('booked', timedelta(hours=1), 'success')
+        deposit, _ = payments.record_deposit(self.user, 'booked', 40)
+        PaymentIntent.objects.filter(reference='booked').update(status='pending', transaction=None)
+
+        self.assertEqual(reconciliation.reconcile(rate=1000)['recorded'], 1)
+        intent = PaymentIntent.objects.get(reference='booked')
+        self.assertEqual((intent.status, intent.transaction, intent.attempts), ('succeeded', deposit, 1))
+        self.assertEqual(Transaction.objects.filter(reference='booked').count(), 1)
+
+
+
+@override_settings(PAYSTACK_KEY='sk_test_idempotency')
+class IdempotencyTests(TestCase):
+    """
+    External references are unique per type, and repeated payment calls
+    are answered from the stored result.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.stub = PaystackStub().start()
+        self.addCleanup(self.stub.stop)
+        settings_override = self.settings(PAYSTACK_BASE_URL=self.stub.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        paystack_client.reset_clients()
+        self.addCleanup(paystack_client.reset_clients)
+
+        self.user = CustomUser.objects.create(username='idem_member', email='idem@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def deposit(self, reference, source='manual'):
+        return Transaction.objects.create(
+            member=self.user, transaction_type='deposit', amount=Decimal('5.00'),
+            date=date(2024, 1, 1), reference=reference, source=source,
+        )
+
+    def test_reference_unique_for_paystack_only(self):
+        self.deposit('')
+        self.deposit('', source='paystack')
+        self.deposit('', source='paystack')
+        self.deposit('RCPT-1')
+        self.deposit('RCPT-1')
+        self.deposit('PSK-1', source='paystack')
+        self.deposit('PSK-1')
+        with self.assertRaises(IntegrityError):
+            self.deposit('PSK-1', source='paystack')
+
+    def test_record_deposit_ignores_manual_rows(self):
+        self.deposit('PSK-2')
+        deposit, created = payments.record_deposit(self.user, 'PSK-2', '7.00')
+        self.assertTrue(created)
+        self.assertEqual(deposit.source, 'paystack')
+        self.assertEqual(payments.record_deposit(self.user, 'PSK-2', '7.00'), (deposit, False))
+        self.assertEqual(payments.find_deposit('PSK-2'), deposit)
+
+    def test_initiate_replays_same_key(self):
+        def initiate(amount):
+            return self.client.post('/api/connect-paystack/', {'amount': amount}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='attempt-1', HTTP_HOST='localhost')
+
+        first, second = initiate(50), initiate(50)
+        self.assertEqual(first.json()['reference'], second.json()['reference'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(self.stub.requests), 1)
+
+        self.assertEqual(initiate(60).status_code, 422)
+
+    def test_repeat_verify_skips_paystack_and_database(self):
+        paystack_client.get_client().initialize_transaction('idem@example.com', 90, reference='ref-idem')
+        url = '/api/verify-transaction/?reference=ref-idem'
+
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost').json()['status'], 'success')
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(len(self.stub.requests), 2)  # initialize + the first verify
+        self.assertEqual(Transaction.objects.filter(reference='ref-idem').count(), 1)
+
+    def test_bulk_import_allows_repeated_references(self):
+        self.user.is_officer = True
+        self.user.save()
+        self.deposit('PSK-9', source='paystack')
+        row = {'member': self.user.id, 'transaction_type': 'deposit', 'amount': '5.00', 'date': '2024-02-01'}
+
+        response = self.client.post('/api/transactions/bulk/', [
+            {**row, 'reference': 'PSK-9'},
+            {**row, 'reference': 'RCPT-10'},
+            {**row, 'reference': 'RCPT-10'},
+            row,
+        ], format='json', HTTP_HOST='localhost')
+
+        self.assertEqual(response.json()['created'], 4)
+        self.assertFalse(Transaction.objects.filter(source='paystack').exclude(reference='PSK-9').exists())
+
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """
+    Read-only requests are authenticated from the token claims; writes
+    use the cached user row.
+    """
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.church = Church.objects.create(name='Claims Chapel')
+        self.user = CustomUser.objects.create_user(
+            username='claims_member', password='pw-claims-1', email='claims@example.com',
+            church=self.church,
+        )
+        self.member = Member.objects.create(user=self.user, full_name='Claims', membership_number='MBR-CLAIMS')
+
+    def signin(self):
+        response = APIClient().post('/api/auth-signin/', {'username': 'claims_member', 'password': 'pw-claims-1'},
+                                    format='json', HTTP_HOST='localhost')
+        return response.json()['access']
+
+    def client_for(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return client
+
+    def test_signin_token_carries_claims(self):
+        token = AccessToken(self.signin())
+        self.assertEqual(
+            (token['is_officer'], token['is_member'], token['church_id'], token['member_id']),
+            (False, True, self.church.id, self.member.id),
+        )
+
+    def test_safe_request_skips_user_lookup(self):
+        claims_client = self.client_for(self.signin())
+        plain_client = self.client_for(str(AccessToken.for_user(self.user)))
+
+        with CaptureQueriesContext(connection) as claims:
+            response = claims_client.get('/api/loan-history/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as plain:
+            plain_client.get('/api/loan-history/', HTTP_HOST='localhost')
+
+        self.assertEqual(len(plain) - len(claims), 1)
+        self.assertFalse(any('creditunion_customuser' in q['sql'] for q in claims.captured_queries))
+
+    def test_officer_reads_recheck_the_user_row(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_officer=True)
+        client = self.client_for(self.signin())
+        self.assertEqual(client.get('/api/loan-portfolio/', HTTP_HOST='localhost').status_code, 200)
+
+        self.user.refresh_from_db()
+        self.user.is_officer = False
+        self.user.save()
+        self.assertEqual(client.get('/api/loan-portfolio/', HTTP_HOST='localhost').status_code, 403)
+        other = f'/api/member-statement/?member={self.user.pk}'
+        self.assertEqual(client.get(other, HTTP_HOST='localhost').status_code, 403)
+
+        self.user.is_officer = True
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get('/api/loan-portfolio/', HTTP_HOST='localhost').status_code, 401)
+
+    def test_profile_same_under_both_token_types(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(phone='0244000000', first_name='Claire')
+        user_cache.clear()
+        plain = self.client_for(str(AccessToken.for_user(self.user))).get('/api/member/profile/', HTTP_HOST='localhost')
+        claims = self.client_for(self.signin()).get('/api/member/profile/', HTTP_HOST='localhost')
+
+        self.assertEqual(plain.status_code, 200)
+        self.assertEqual(plain.json()['phone'], '0244000000')
+        self.assertEqual(claims.json(), plain.json())
+
+    def test_claims_user_is_read_only(self):
+        user = user_from_claims(AccessToken(self.signin()))
+        self.assertEqual((user.pk, user.church, user.member), (self.user.pk, self.church, self.member))
+        with self.assertRaises(RuntimeError):
+            user.save()
+
+    def test_writes_use_cached_row_until_user_changes(self):
+        loads = []
+
+        def load(pk):
+            loads.append(pk)
+            return CustomUser.objects.get(pk=pk)
+
+        first = user_cache.get(self.user.pk, load)
+        second = user_cache.get(self.user.pk, load)
+        self.assertEqual(loads, [self.user.pk])
+        self.assertIsNot(first, second)
+
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.assertEqual(user_cache.get(self.user.pk, load).first_name, 'Changed')
+        self.assertEqual(len(loads), 2)
+
+    def test_unsafe_request_loads_full_row_once(self):
+        client = self.client_for(self.signin())
+        for _ in range(2):
+            response = client.post('/api/member/change-password/', {}, format='json', HTTP_HOST='localhost')
+            self.assertEqual(response.status_code, 400)
+        self.assertIn(self.user.pk, user_cache.entries)
+
+        self.user.save()
+        self.assertNotIn(self.user.pk, user_cache.entries)
+
+    def test_refresh_restamps_claims(self):
+        refresh = APIClient().post('/api/token/', {'username': 'claims_member', 'password': 'pw-claims-1'},
+                                   format='json', HTTP_HOST='localhost').json()['refresh']
+        CustomUser.objects.filter(pk=self.user.pk).update(is_officer=False)
+
+        access = APIClient().post('/api/token/refresh/', {'refresh': refresh},
+                                  format='json', HTTP_HOST='localhost').json()['access']
+        self.assertIs(AccessToken(access)['is_officer'], False)
+
+
+class TokenRevocationTests(TestCase):
+    """
+    Refresh-token blacklist checks are answered from the cache; expired
+    tokens are pruned in batches.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='revoked_member', password='pw-revoke-1')
+
+    def refresh(self, refresh):
+        return APIClient().post('/api/token/refresh/', {'refresh': refresh}, format='json', HTTP_HOST='localhost')
+
+    def test_repeat_refresh_skips_blacklist_query(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(refresh).status_code, 200)
+        self.assertFalse(any('token_blacklist' in q['sql'] for q in queries.captured_queries))
+
+    def test_signout_revokes_cached_token(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+
+        response = APIClient().post('/api/auth-signout/', {'refresh': refresh}, format='json', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f'old-{i}', token='x', expires_at=now - timedelta(hours=1),
+            )
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(user=self.user, jti='live', token='x', expires_at=now + timedelta(hours=1))
+
+        self.assertEqual(revocation.prune_expired(batch_size=2, now=now), (5, 5))
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+
+
+class MemberSearchTests(TestCase):
+    """
+    Member typeahead: scoped to the officer's church, prefix matches first,
+    paginated without a count.
+    """
+
+    def setUp(self):
+        self.church = Church.objects.create(name='Search Chapel')
+        other = Church.objects.create(name='Elsewhere')
+        self.officer = CustomUser.objects.create_user(
+            username='search_officer', password='pw', church=self.church, is_officer=True, is_member=False,
+        )
+        for i, name in enumerate(['Ama Mensah', 'Kwame Amankwah', 'Yaw Boateng']):
+            user = CustomUser.objects.create_user(username=f'member{i}', password='pw', church=self.church)
+            Member.objects.create(user=user, full_name=name, membership_number=f'MBR-S{i}')
+        outsider = CustomUser.objects.create_user(username='amara', password='pw', church=other)
+        Member.objects.create(user=outsider, full_name='Amara Owusu', membership_number='MBR-X0')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.officer)
+
+    def search(self, query, **params):
+        return self.client.get('/api/members/search/', {'q': query, **params}, HTTP_HOST='localhost')
+
+    def test_matches_within_church_prefix_first(self):
+        response = self.search('ama')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['full_name'] for row in response.json()['results']], ['Ama Mensah', 'Kwame Amankwah'])
+
+    def test_membership_number_and_pagination(self):
+        first = self.search('MBR-S', limit=2).json()
+        self.assertEqual([row['membership_number'] for row in first['results']], ['MBR-S0', 'MBR-S1'])
+        self.assertIsNotNone(first['next'])
+
+        second = self.client.get(first['next'], HTTP_HOST='localhost').json()
+        self.assertEqual([row['membership_number'] for row in second['results']], ['MBR-S2'])
+        self.assertIsNone(second['next'])
+
+    def test_short_query_and_non_officer(self):
+        self.assertEqual(self.search('a').json()['results'], [])
+
+        self.client.force_authenticate(CustomUser.objects.get(username='member0'))
+        self.assertEqual(self.search('ama').status_code, 403)
+
+
+@override_settings(SHARED_CACHE=True)
+class ResponseCacheTests(TestCase):
+    """
+    Member payloads are cached per version; writes bump the version and
+    the hit/miss counters track every read.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='cached_member', password='pw')
+        Member.objects.create(user=self.user, full_name='Cached', membership_number='MBR-CACHED')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def dashboard(self):
+        response = self.client.get('/api/member-dashboard/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def deposit(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(member=self.user, transaction_type='deposit',
+                                              amount=Decimal(amount), date=date.today())
+
+    def test_write_bumps_version(self):
+        version = response_cache.get_version(self.user.id)
+        self.assertEqual(self.dashboard()['X-Cache'], 'MISS')
+        self.assertEqual(self.dashboard()['X-Cache'], 'HIT')
+
+        tx = self.deposit('40.00')
+        self.assertEqual(response_cache.get_version(self.user.id), version + 1)
+        response = self.dashboard()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['data']['summary']['current_balance'], 40.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tx.delete()
+        self.assertEqual(response_cache.get_version(self.user.id), version + 2)
+
+    def test_hit_and_miss_counters(self):
+        response_cache.reset_stats()
+        self.dashboard()
+        self.dashboard()
+        self.deposit('5.00')
+        self.dashboard()
+        self.client.get('/api/loan-summary/', HTTP_HOST='localhost')
+
+        self.assertEqual(response_cache.cache_stats(), {
+            'dashboard': {'hit': 1, 'miss': 2},
+            'loan_summary': {'hit': 0, 'miss': 1},
+        })
+
+    @override_settings(SHARED_CACHE=False)
+    def test_off_without_shared_cache(self):
+        response_cache.reset_stats()
+        self.assertEqual(self.dashboard()['X-Cache'], 'MISS')
+        # A write seen by another worker only: no version bump reaches this one
+        Transaction.objects.create(member=self.user, transaction_type='deposit',
+                                   amount=Decimal('9.00'), date=date.today())
+        response = self.dashboard()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['data']['summary']['current_balance'], 9.0)
+        self.assertEqual(response_cache.cache_stats()['dashboard'], {'hit': 0, 'miss': 0})
+
+
+@override_settings(SHARED_CACHE=True)
+class ReferenceCacheTests(TestCase):
+    """
+    Church and member lists are served from the reference cache with
+    ETags, and church writes invalidate them.
+    """
+
+    def setUp(self):
+        cache.clear()
+        reference_cache.clear_local()
+        self.church = Church.objects.create(name='Reference Chapel')
+        self.user = CustomUser.objects.create_user(username='ref_member', password='pw', church=self.church)
+        self.member = Member.objects.create(user=self.user, full_name='Ref', membership_number='MBR-REF')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_church_list_cached_with_etag(self):
+        first = self.client.get('/api/churches/', HTTP_HOST='localhost')
+        self.assertEqual([row['name'] for row in first.json()], ['Reference Chapel'])
+
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/churches/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Church.objects.create(name='New Chapel')
+        changed = self.client.get('/api/churches/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.json()), 2)
+
+    def test_profile_church_validated_from_cache(self):
+        other = Church.objects.create(name='Other Chapel')
+        reference_cache.clear_local()
+        cache.clear()
+        reference_cache.get('churches')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch('/api/member/profile/', {'church': other.id}, format='json', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('FROM "creditunion_church"' in q['sql'] for q in queries.captured_queries))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.church_id, other.id)
+
+        response = self.client.patch('/api/member/profile/', {'church': 999999}, format='json', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_church_list_rebuilt_without_shared_cache(self):
+        first = self.client.get('/api/churches/', HTTP_HOST='localhost')
+        # Written by another worker: the bump never reaches this one
+        Church.objects.create(name='Elsewhere Chapel')
+        changed = self.client.get('/api/churches/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(len(changed.json()), 2)
+
+        again = self.client.get('/api/churches/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+
+class LoanQueueTests(TestCase):
+    """
+    loan_list and the officer loan queue load in a constant number of
+    queries; the queue filters by status, church and request date.
+    """
+
+    def setUp(self):
+        self.church = Church.objects.create(name='Queue Chapel')
+        other = Church.objects.create(name='Other Queue Chapel')
+        self.officer = CustomUser.objects.create_user(username='queue_officer', password='pw', is_officer=True)
+        for i, status in enumerate(['pending', 'pending', 'active', 'rejected', 'completed']):
+            user = CustomUser.objects.create_user(
+                username=f'queue{i}', password='pw', church=self.church if i < 4 else other,
+            )
+            Member.objects.create(user=user, full_name=f'Queue {i}', membership_number=f'MBR-Q{i}')
+            Loan.objects.create(
+                member=user, amount=Decimal('500.00'), interest_rate=Decimal('10.00'), term=6,
+                total_amount=Decimal('525.00'), status=status,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.officer)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_loan_list_single_query(self):
+        data, queries = self.get('/api/loan-list/')
+        self.assertEqual(len(data), 4)
+        self.assertEqual(queries, 1)
+        self.assertEqual({row['memberName'] for row in data}, {'Queue 0', 'Queue 1', 'Queue 2', 'Queue 3'})
+
+    def test_queue_filters_and_pages(self):
+        first, queries = self.get('/api/loan-queue/', status='pending', church=self.church.id, page_size=1)
+        self.assertEqual(queries, 1)
+        self.assertEqual([row['status'] for row in first['results']], ['pending'])
+
+        second = self.client.get(first['next'], HTTP_HOST='localhost').json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        self.assertNotEqual(first['results'][0]['id'], second['results'][0]['id'])
+
+        today = date.today().isoformat()
+        data, _ = self.get('/api/loan-queue/', status=['active', 'completed'], created_from=today, created_to=today)
+        self.assertEqual(sorted(row['memberUuid'] for row in data['results']), ['MBR-Q2', 'MBR-Q4'])
+
+    def test_queue_requires_officer(self):
+        self.client.force_authenticate(CustomUser.objects.get(username='queue0'))
+        self.assertEqual(self.client.get('/api/loan-queue/', HTTP_HOST='localhost').status_code, 403)
+
+
+class BulkLoanDecisionTests(TestCase):
+    """
+    Officers approve, reject or cancel many loans in one request,
+    with per-loan results.
+    """
+
+    def setUp(self):
+        self.officer = CustomUser.objects.create_user(username='committee', password='pw', is_officer=True)
+        self.loans = []
+        for i, status in enumerate(['pending', 'pending', 'pending', 'active']):
+            user = CustomUser.objects.create_user(username=f'applicant{i}', password='pw')
+            self.loans.append(Loan.objects.create(
+                member=user, amount=Decimal('600.00'), interest_rate=Decimal('10.00'), term=6,
+                total_amount=Decimal('630.00'), status=status,
+            ))
+        self.client = APIClient()
+        self.client.force_authenticate(self.officer)
+
+    def decide(self, action, loan_ids):
+        return self.client.post('/api/loans/decide/', {'action': action, 'loans': loan_ids},
+                                format='json', HTTP_HOST='localhost')
+
+    def test_bulk_approve_with_schedules(self):
+        pending = [loan.id for loan in self.loans[:3]]
+        with CaptureQueriesContext(connection) as few:
+            self.decide('approve', pending[:1])
+        with CaptureQueriesContext(connection) as many:
+            response = self.decide('approve', pending[1:] + [self.loans[3].id, 999999])
+
+        self.assertEqual(len(few), len(many))
+        data = response.json()
+        self.assertEqual((data['updated'], data['failed']), (2, 2))
+        self.assertEqual([row['ok'] for row in data['results']], [True, True, False, False])
+        self.assertEqual(data['results'][3]['detail'], 'Loan not found.')
+
+        for loan in Loan.objects.filter(pk__in=pending):
+            self.assertEqual((loan.status, loan.disbursed_date), ('active', date.today()))
+            self.assertEqual(loan.installments.count(), 6)
+
+    def test_reject_and_cancel_need_staff(self):
+        self.assertEqual(self.decide('reject', [self.loans[0].id]).status_code, 403)
+
+        self.officer.is_staff = True
+        self.officer.save()
+        data = self.decide('cancel', [loan.id for loan in self.loans]).json()
+        self.assertEqual(data['updated'], 4)
+        self.assertEqual(set(Loan.objects.values_list('status', flat=True)), {'cancelled'})
+
+    def test_invalid_body(self):
+        self.assertEqual(self.decide('approve', []).status_code, 400)
+        self.assertEqual(self.decide('disburse', [self.loans[0].id]).status_code, 400)
+
+
+@override_settings(SHARED_CACHE=True)
+class BulkTransactionTests(TestCase):
+    """
+    Batch transaction entry reports errors per row, writes the valid rows,
+    and updates the ledger tables and cached dashboards once per batch.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.officer = CustomUser.objects.create_user(username='teller', password='pw', is_officer=True)
+        self.members = [CustomUser.objects.create_user(username=f'saver{i}', password='pw') for i in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.officer)
+
+    def post(self, rows):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/transactions/bulk/', rows, format='json', HTTP_HOST='localhost')
+
+    def dashboard(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/member-dashboard/', HTTP_HOST='localhost')
+
+    def test_batch_with_row_errors(self):
+        first, second = self.members
+        self.assertEqual(self.dashboard(first)['X-Cache'], 'MISS')
+        self.assertEqual(self.dashboard(first)['X-Cache'], 'HIT')
+
+        response = self.post([
+            {'member': first.id, 'transaction_type': 'deposit', 'amount': '100.00', 'date': '2024-02-01'},
+            {'member': 999999, 'transaction_type': 'deposit', 'amount': '5.00', 'date': '2024-02-01'},
+            {'member': first.id, 'transaction_type': 'gift', 'amount': '5.00', 'date': '2024-02-01'},
+            {'member': second.id, 'transaction_type': 'deposit', 'amount': 'lots', 'date': '2024-02-01'},
+            {'member': second.id, 'transaction_type': 'deposit', 'amount': '40.00'},
+            {'member': first.id, 'transaction_type': 'withdrawal', 'amount': '30.00', 'date': '2024-03-05'},
+            {'member': second.id, 'transaction_type': 'deposit', 'amount': '12.50', 'date': '2024-03-05'},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (3, 4))
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in data['errors']],
+            [(1, ['member']), (2, ['transaction_type']), (3, ['amount']), (4, ['date'])],
+        )
+        self.assertEqual(set(Transaction.objects.values_list('account_officer', flat=True)), {self.officer.id})
+
+        self.assertEqual(ledger.get_balance(first), Decimal('70.00'))
+        self.assertEqual(ledger.get_balance(second), Decimal('12.50'))
+        self.assertEqual(ledger.verify_balances(), [])
+        self.assertEqual(ledger.verify_rollups(), [])
+
+        response = self.dashboard(first)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['data']['summary']['current_balance'], 70.0)
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile('deposits.csv', (
+            "member,transaction_type,amount,date,reference\n"
+            f"{self.members[0].id},deposit,25.00,2024-04-01,RCPT-1\n"
+            f"{self.members[1].id},deposit,-,2024-04-01,RCPT-2\n"
+        ).encode())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/transactions/bulk/', {'file': upload}, HTTP_HOST='localhost')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (1, 1))
+        self.assertEqual(Transaction.objects.get().reference, 'RCPT-1')
+        self.assertEqual(ledger.get_balance(self.members[0]), Decimal('25.00'))
+
+    def test_rejected_batches(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post({'member': self.members[0].id}).status_code, 400)
+
+        response = self.post([{'member': 999999, 'transaction_type': 'deposit', 'amount': '5.00', 'date': '2024-02-01'}])
+        self.assertEqual((response.status_code, response.json()['created']), (400, 0))
+
+        self.client.force_authenticate(self.members[0])
+        self.assertEqual(self.post([]).status_code, 403)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class BulkRepaymentTests(TestCase):
+    """
+    Batch repayment posting resolves every active loan in one query and
+    writes repayments, schedules and loan totals with bulk statements.
+    """
+
+    def setUp(self):
+        self.officer = CustomUser.objects.create_user(username='collector', password='pw', is_officer=True)
+        self.members, self.loans = [], []
+        for i in range(3):
+            user = CustomUser.objects.create_user(username=f'payroll{i}', password='pw')
+            loan = Loan.objects.create(
+                member=user, amount=Decimal('300.00'), interest_rate=Decimal('0.00'), term=3,
+                total_amount=Decimal('300.00'), status='active', disbursed_date=date(2024, 1, 1),
+            )
+            schedules.create_schedule(loan)
+            self.members.append(user)
+            self.loans.append(loan)
+        self.client = APIClient()
+        self.client.force_authenticate(self.officer)
+
+    def post(self, rows):
+        return self.client.post('/api/loan-repayments/bulk/', rows, format='json', HTTP_HOST='localhost')
+
+    def test_batch_posts_and_closes_paid_loans(self):
+        with CaptureQueriesContext(connection) as few:
+            self.post([{'member': self.members[0].id, 'amount_paid': '50.00'}])
+        rows = [
+            {'member': self.members[1].id, 'amount_paid': '150.00'},
+            {'member': self.members[1].id, 'amount_paid': '150.00'},
+            {'member': self.members[1].id, 'amount_paid': '10.00'},
+            {'member': self.members[2].id, 'amount_paid': '120.00', 'payment_date': '2024-03-01'},
+            {'member': 999999, 'amount_paid': '10.00'},
+        ]
+        with CaptureQueriesContext(connection) as many:
+            response = self.post(rows)
+
+        self.assertEqual(len(few), len(many))
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (3, 2))
+        self.assertEqual([error['row'] for error in data['errors']], [2, 4])
+
+        paid_off = Loan.objects.get(pk=self.loans[1].pk)
+        self.assertEqual((paid_off.status, paid_off.balance), ('completed', Decimal('0.00')))
+        self.assertFalse(paid_off.installments.exclude(status='paid').exists())
+
+        partial = Loan.objects.get(pk=self.loans[2].pk)
+        self.assertEqual((partial.status, partial.total_repaid), ('active', Decimal('120.00')))
+        self.assertEqual(list(partial.installments.values_list('status', flat=True).order_by('number')),
+                         ['paid', 'partial', 'pending'])
+        self.assertEqual(partial.repayments.get().payment_date, date(2024, 3, 1))
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile('payroll.csv', (
+            "member,amount_paid,payment_date\n"
+            f"{self.members[0].id},25.00,\n"
+            f"{self.members[1].id},-5,\n"
+        ).encode())
+        response = self.client.post('/api/loan-repayments/bulk/', {'file': upload}, HTTP_HOST='localhost')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (1, 1))
+        self.assertEqual(Loan.objects.get(pk=self.loans[0].pk).balance, Decimal('275.00'))
+
+
+class TransactionPaginationTests(TestCase):
+    """
+    Transaction listings page by a (date, id) keyset, so rows sharing a
+    date are neither repeated nor skipped.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='pager', password='pw')
+        Transaction.objects.bulk_create(
+            [Transaction(member=self.user, transaction_type='deposit', amount=Decimal('1.00'), date=date(2024, 5, 1))
+             for _ in range(23)]
+            + [Transaction(member=self.user, transaction_type='deposit', amount=Decimal('1.00'), date=date(2024, day, 2))
+               for day in (4, 6)]
+        )
+        self.expected = list(Transaction.objects.filter(member=self.user).order_by('-date', '-id').values_list('id', flat=True))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url, HTTP_HOST='localhost').json()
+            self.assertNotIn('OFFSET', queries.captured_queries[-1]['sql'].upper())
+            pages.append([row['id'] for row in data['results']])
+            url = data[link]
+        return pages
+
+    def test_pages_across_ties_on_one_date(self):
+        pages = self.walk('/api/user-transactions/?page_size=4', 'next')
+        self.assertEqual(len(pages), 7)
+        self.assertEqual([row for page in pages for row in page], self.expected)
+
+    def test_previous_links_walk_back(self):
+        first = self.client.get('/api/user-transactions/?page_size=4', HTTP_HOST='localhost').json()
+        self.assertIsNone(first['previous'])
+        url = first['next']
+        for _ in range(4):
+            url = self.client.get(url, HTTP_HOST='localhost').json()['next']
+        last = self.client.get(url, HTTP_HOST='localhost').json()
+
+        pages = self.walk(last['previous'], 'previous')
+        self.assertEqual(pages[-1], self.expected[:4])
+        self.assertEqual([row for page in reversed(pages) for row in page], self.expected[:20])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/user-transactions/?cursor=bogus', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+
+
+class LedgerTests(TestCase):
+    """
+    MemberBalance and MonthlyRollup follow every Transaction write through
+    the signal handlers, and rebuild_ledger restores them from the ledger.
+    """
+
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='ledger_alice', password='pw')
+        self.bob = CustomUser.objects.create_user(username='ledger_bob', password='pw')
+
+    def balance(self, user):
+        return ledger.get_balance(user)
+
+    def rollups(self, user):
+        return {
+            (year, month, tx_type): (total, count)
+            for year, month, tx_type, total, count in MonthlyRollup.objects.filter(member=user, count__gt=0)
+            .values_list('year', 'month', 'transaction_type', 'total', 'count')
+        }
+
+    def assertInSync(self):
+        self.assertEqual(ledger.verify_balances(), [])
+        self.assertEqual(ledger.verify_rollups(), [])
+
+    def test_create(self):
+        Transaction.objects.create(member=self.alice, transaction_type='deposit', amount=Decimal('100.00'), date=date(2024, 1, 5))
+        Transaction.objects.create(member=self.alice, transaction_type='deposit', amount=Decimal('20.00'), date=date(2024, 1, 9))
+        Transaction.objects.create(member=self.alice, transaction_type='charges', amount=Decimal('2.50'), date=date(2024, 2, 1))
+
+        self.assertEqual(self.balance(self.alice), Decimal('117.50'))
+        self.assertEqual(self.rollups(self.alice), {
+            (2024, 1, 'deposit'): (Decimal('120.00'), 2),
+            (2024, 2, 'charges'): (Decimal('2.50'), 1),
+        })
+        self.assertInSync()
+
+    def test_edit_amount_type_and_date(self):
+        tx = Transaction.objects.create(member=self.alice, transaction_type='deposit', amount=Decimal('50.00'), date=date(2024, 3, 1))
+
+        tx.amount = Decimal('80.00')
+        tx.save()
+        self.assertEqual(self.balance(self.alice), Decimal('80.00'))
+
+        tx.transaction_type = 'withdrawal'
+        tx.date = date(2024, 4, 2)
+        tx.save()
+        self.assertEqual(self.balance(self.alice), Decimal('-80.00'))
+        self.assertEqual(self.rollups(self.alice), {(2024, 4, 'withdrawal'): (Decimal('80.00'), 1)})
+        self.assertInSync()
+
+    def test_edit_moves_to_another_member(self):
+        tx = Transaction.objects.create(member=self.alice, transaction_type='deposit', amount=Decimal('30.00'), date=date(2024, 5, 1))
+        Transaction.objects.create(member=self.bob, transaction_type='deposit', amount=Decimal('10.00'), date=date(2024, 5, 1))
+
+        tx.member = self.bob
+        tx.save()
+
+        self.assertEqual(self.balance(self.alice), Decimal('0.00'))
+        self.assertEqual(self.balance(self.bob), Decimal('40.00'))
+        self.assertEqual(self.rollups(self.alice), {})
+        self.assertEqual(self.rollups(self.bob), {(2024, 5, 'deposit'): (Decimal('40.00'), 2)})
+        self.assertInSync()
+
+    def test_delete(self):
+        kept = Transaction.objects.create(member=self.alice, transaction_type='deposit', amount=Decimal('60.00'), date=date(2024, 6, 1))
+        Transaction.objects.create(member=self.alice, transaction_type='withdrawal', amount=Decimal('15.00'), date=date(2024, 6, 2)).delete()
+
+        self.assertEqual(self.balance(self.alice), kept.amount)
+        self.assertEqual(self.rollups(self.alice), {(2024, 6, 'deposit'): (Decimal('60.00'), 1)})
+        self.assertInSync()
+
+    def test_rebuild_and_verify_command(self):
+        Transaction.objects.create(member=self.alice, transaction_type='deposit', amount=Decimal('70.00'), date=date(2024, 7, 1))
+        Transaction.objects.create(member=self.bob, transaction_type='interest_earned', amount=Decimal('1.25'), date=date(2024, 7, 31))
+        MemberBalance.objects.filter(member=self.alice).update(balance=Decimal('5.00'))
+        MonthlyRollup.objects.filter(member=self.bob).delete()
+
+        with self.assertRaisesMessage(CommandError, '1 member balance(s) and 1 monthly rollup(s) out of sync'):
+            call_command('rebuild_ledger', '--verify', stdout=io.StringIO())
+
+        call_command('rebuild_ledger', stdout=io.StringIO())
+        call_command('rebuild_ledger', '--verify', stdout=io.StringIO())
+        self.assertEqual(self.balance(self.alice), Decimal('70.00'))
+        self.assertEqual(self.rollups(self.bob), {(2024, 7, 'interest_earned'): (Decimal('1.25'), 1)})
+
+
+class DashboardRollupTests(TestCase):
+    """
+    The dashboard's YTD totals and savings trend come from MonthlyRollup
+    and match the raw ledger.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='trend_member', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.year = date.today().year
+
+    def add(self, tx_type, amount, day):
+        return Transaction.objects.create(member=self.user, transaction_type=tx_type, amount=Decimal(amount), date=day)
+
+    def summary(self):
+        response = self.client.get('/api/member-dashboard/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_ytd_totals_and_trend(self):
+        self.add('deposit', '500.00', date(self.year - 1, 12, 31))
+        self.add('withdrawal', '40.00', date(self.year - 1, 6, 1))
+        self.add('deposit', '100.00', date(self.year, 3, 10))
+        self.add('deposit', '25.50', date(self.year, 1, 2))
+        self.add('deposit', '74.50', date(self.year, 1, 28))
+        self.add('withdrawal', '60.00', date(self.year, 3, 11))
+        self.add('charges', '1.00', date(self.year, 3, 12))
+
+        with self.assertNumQueries(3):
+            data = self.summary()
+
+        self.assertEqual(data['summary'], {
+            'total_savings': 200.0,
+            'total_withdrawals': 60.0,
+            'current_balance': 599.0,
+        })
+        self.assertEqual(data['savings_trend'], [
+            {'month': 'January', 'amount': 100.0},
+            {'month': 'March', 'amount': 100.0},
+        ])
+
+    def test_trend_follows_edits_and_deletes(self):
+        tx = self.add('deposit', '30.00', date(self.year, 2, 1))
+        self.add('deposit', '10.00', date(self.year, 2, 5)).delete()
+        tx.date = date(self.year, 4, 1)
+        tx.save()
+
+        data = self.summary()
+        self.assertEqual(data['summary']['total_savings'], 30.0)
+        self.assertEqual(data['savings_trend'], [{'month': 'April', 'amount': 30.0}])
+
+    def test_empty(self):
+        data = self.summary()
+        self.assertEqual(data['summary'], {'total_savings': 0.0, 'total_withdrawals': 0.0, 'current_balance': 0.0})
+        self.assertEqual(data['savings_trend'], [])
+        self.assertEqual(data['recent_transactions'], [])
+
+
+class PortfolioTests(SimpleTestCase):
+    """
+    compute_portfolio on hand-built rows: days past due, aging buckets,
+    PAR and the per-church breakdown.
+    """
+
+    TODAY = date(2024, 6, 30)
+
+    # (id, church id, amount, total amount, balance, due date)
+    LOANS = [
+        (1, 1, Decimal('1000'), Decimal('1200'), Decimal('750'), date(2024, 12, 31)),
+        (2, 1, Decimal('600'), Decimal('660'), Decimal('330'), date(2025, 1, 31)),
+        (3, None, Decimal('500'), Decimal('550'), Decimal('550'), date(2024, 6, 29)),  # no schedule, 1 day late
+        (4, 2, Decimal('300'), Decimal('330'), Decimal('0'), date(2024, 1, 1)),  # late but repaid
+        (5, 2, Decimal('400'), Decimal('440'), Decimal('440'), date(2024, 8, 1)),
+    ]
+    # Unpaid installments: (loan id, due date, amount due, amount paid)
+    INSTALLMENTS = [
+        (1, date(2024, 5, 31), Decimal('200'), Decimal('0')),  # 30 days past due
+        (1, date(2024, 6, 15), Decimal('200'), Decimal('50')),
+        (1, date(2024, 7, 15), Decimal('200'), Decimal('0')),
+        (1, date(2024, 9, 15), Decimal('200'), Decimal('0')),  # beyond the horizon
+        (2, date(2024, 3, 31), Decimal('110'), Decimal('0')),  # 91 days past due
+        (2, date(2024, 4, 30), Decimal('110'), Decimal('0')),
+        (2, date(2024, 7, 10), Decimal('110'), Decimal('0')),
+    ]
+
+    def test_totals(self):
+        totals = portfolio.compute_portfolio(self.LOANS, self.INSTALLMENTS, today=self.TODAY)['totals']
+
+        self.assertEqual(totals['loan_count'], 5)
+        self.assertEqual(totals['outstanding_balance'], 2070.0)
+        # 1000*750/1200 + 600*330/660 + 500 + 0 + 400
+        self.assertEqual(totals['outstanding_principal'], 1825.0)
+        # Only loan 2 is more than 30 (and 90) days late
+        self.assertEqual((totals['par30'], totals['par60'], totals['par90']), (0.1644, 0.1644, 0.1644))
+        self.assertEqual(totals['aging'], {
+            'current': {'count': 2, 'outstanding_principal': 400.0},
+            '1-30': {'count': 2, 'outstanding_principal': 1125.0},
+            '31-60': {'count': 0, 'outstanding_principal': 0.0},
+            '61-90': {'count': 0, 'outstanding_principal': 0.0},
+            '90+': {'count': 1, 'outstanding_principal': 300.0},
+        })
+        self.assertEqual(totals['arrears'], 570.0)
+        self.assertEqual(totals['expected_collections'], 310.0)
+
+    def test_by_church(self):
+        by_church = portfolio.compute_portfolio(self.LOANS, self.INSTALLMENTS, today=self.TODAY)['by_church']
+
+        self.assertEqual(set(by_church), {1, 2, None})
+        self.assertEqual(by_church[1]['outstanding_principal'], 925.0)
+        self.assertEqual(by_church[1]['par30'], 0.3243)
+        self.assertEqual(by_church[2]['par30'], 0.0)
+        self.assertEqual(by_church[None]['aging']['1-30']['count'], 1)
+
+    def test_days_past_due_moves_loans_between_buckets(self):
+        later = portfolio.compute_portfolio(self.LOANS, self.INSTALLMENTS, today=date(2024, 7, 1))['totals']
+        # Loan 1 is now 31 days late, loan 2 92
+        self.assertEqual(later['aging']['31-60'], {'count': 1, 'outstanding_principal': 625.0})
+        self.assertEqual(later['par30'], round((625 + 300) / 1825, 4))
+        self.assertEqual(later['par60'], 0.1644)
+
+    def test_empty(self):
+        report = portfolio.compute_portfolio([], [], today=self.TODAY)
+
+        self.assertEqual(report['by_church'], {})
+        self.assertEqual(report['totals']['loan_count'], 0)
+        self.assertEqual(report['totals']['outstanding_principal'], 0.0)
+        self.assertEqual(report['totals']['par30'], 0.0)
+        self.assertEqual(report['totals']['aging']['current']['count'], 0)
+
+
+class SyntheticDataTests(TestCase):
+    """
+    generate_synthetic_data is reproducible for a given seed and leaves
+    the ledger tables and loan totals consistent.
+    """
+
+    OPTIONS = dict(churches=2, members=12, transactions=250, chunk_size=100, loan_ratio=0.7, years=1, seed=7)
+
+    def generate(self):
+        call_command('generate_synthetic_data', prefix='syn', stdout=io.StringIO(), **self.OPTIONS)
+
+    def snapshot(self):
+        # Keyed by usernames and names, since ids differ between runs
+        transactions = list(
+            Transaction.objects.order_by('member__username', 'date', 'reference').values_list(
+                'member__username', 'account_officer__username', 'transaction_type', 'amount', 'date', 'reference',
+            )
+        )
+        loans = list(
+            Loan.objects.order_by('member__username', 'created_at', 'amount', 'term').values_list(
+                'member__username', 'amount', 'interest_rate', 'term', 'status', 'total_amount',
+                'total_repaid', 'balance', 'created_at', 'disbursed_date', 'due_date',
+            )
+        )
+        members = list(
+            CustomUser.objects.filter(username__startswith='syn_').order_by('username')
+            .values_list('username', 'church__name', 'member__membership_number')
+        )
+        return transactions, loans, members
+
+    def test_same_seed_same_data(self):
+        self.generate()
+        first = self.snapshot()
+        self.assertEqual(len(first[0]), 250)
+        self.assertTrue(first[1])
+
+        CustomUser.objects.filter(username__startswith='syn_').delete()
+        Church.objects.filter(name__startswith='Syn ').delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_consistent_ledger(self):
+        self.generate()
+
+        self.assertEqual(ledger.verify_balances(), [])
+        self.assertEqual(ledger.verify_rollups(), [])
+        self.assertEqual(repayments.verify_loans(), [])
+        self.assertEqual(len(set(Transaction.objects.values_list('reference', flat=True))), 250)
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class StatementExportTests(TestCase):
+    """
+    The streamed statement export, under WSGI and ASGI.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='stmt', password='pw')
+        for day, tx_type, amount in [(1, 'deposit', '100.00'), (2, 'withdrawal', '30.00'), (3, 'deposit', '5.50')]:
+            Transaction.objects.create(member=self.user, transaction_type=tx_type, amount=Decimal(amount),
+                                       date=date(2024, 3, day), reference=f'S-{day}')
+        rows = zip(Transaction.objects.order_by('date'), ['100.00', '70.00', '75.50'])
+        self.expected = 'id,date,type,amount,reference,notes,balance\r\n' + ''.join(
+            f'{tx.id},{tx.date},{tx.transaction_type},{tx.amount},{tx.reference},,{balance}\r\n' for tx, balance in rows
+        )
+
+    def export(self, query='', user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.user)
+        return client.get(f'/api/member-statement/{query}', HTTP_HOST='localhost')
+
+    def test_wsgi_streams_sync_iterator(self):
+        response = self.export()
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.expected)
+
+    def test_ndjson_with_start_carries_balance(self):
+        response = self.export('?export_format=ndjson&start=2024-03-02')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(
+            [(row['date'], row['type'], row['amount'], row['reference'], row['balance']) for row in rows],
+            [('2024-03-02', 'withdrawal', '30.00', 'S-2', '70.00'), ('2024-03-03', 'deposit', '5.50', 'S-3', '75.50')],
+        )
+
+    def test_csv_with_start_and_end(self):
+        response = self.export('?start=2024-03-02&end=2024-03-02')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'filename="statement-{self.user.id}-', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(',withdrawal,30.00,S-2,,70.00'))
+
+    def test_other_members_and_bad_params(self):
+        other = CustomUser.objects.create_user(username='stmt_other', password='pw')
+        officer = CustomUser.objects.create_user(username='stmt_officer', password='pw', is_officer=True)
+
+        self.assertEqual(self.export(f'?member={officer.id}', user=other).status_code, 403)
+        response = self.export(f'?member={self.user.id}', user=officer)
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.expected)
+
+        self.assertEqual(self.export('?export_format=xml').status_code, 400)
+        self.assertEqual(self.export('?start=March').status_code, 400)
+
+    async def test_asgi_streams_async_iterator(self):
+        headers = {'Authorization': f"Bearer {AccessToken.for_user(self.user)}"}
+        with mock.patch.object(statement_view, 'STATEMENT_CHUNK_SIZE', 2):
+            response = await AsyncClient().get('/api/member-statement/', headers=headers)
+            self.assertTrue(response.is_async)
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(content.decode(), self.expected)
+
+
+class RepaymentTests(TestCase):
+    """
+    Loan totals, status and the installment schedule follow every posted,
+    edited and deleted repayment.
+    """
+
+    def setUp(self):
+        self.officer = CustomUser.objects.create_user(username='cashier', password='pw', is_officer=True, is_staff=True)
+        self.user = CustomUser.objects.create_user(username='borrower', password='pw')
+        self.loan = Loan.objects.create(
+            member=self.user, amount=Decimal('300.00'), interest_rate=Decimal('0.00'), term=3,
+            total_amount=Decimal('300.00'), status='active', disbursed_date=date(2024, 1, 31),
+        )
+        schedules.create_schedule(self.loan)
+        self.client = APIClient()
+        self.client.force_authenticate(self.officer)
+
+    def state(self):
+        loan = Loan.objects.get(pk=self.loan.pk)
+        installments = list(loan.installments.order_by('number').values_list('amount_paid', 'status'))
+        return loan.total_repaid, loan.balance, loan.status, installments
+
+    def test_schedule_generation(self):
+        loan = Loan(
+            member=self.user, amount=Decimal('100.00'), interest_rate=Decimal('0.00'), term=3,
+            total_amount=Decimal('100.00'), disbursed_date=date(2024, 1, 31),
+        )
+        installments = schedules.build_installments(loan)
+        self.assertEqual([i.amount_due for i in installments], [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
+        self.assertEqual([i.due_date for i in installments], [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+
+    def test_post_allocates_oldest_first_and_completes(self):
+        repayments.record_repayment(self.loan.pk, Decimal('150.00'))
+        self.assertEqual(self.state(), (
+            Decimal('150.00'), Decimal('150.00'), 'active',
+            [(Decimal('100.00'), 'paid'), (Decimal('50.00'), 'partial'), (Decimal('0.00'), 'pending')],
+        ))
+
+        repayments.record_repayment(self.loan.pk, Decimal('150.00'))
+        total_repaid, balance, status, installments = self.state()
+        self.assertEqual((total_repaid, balance, status), (Decimal('300.00'), Decimal('0.00'), 'completed'))
+        self.assertEqual({s for _, s in installments}, {'paid'})
+
+    def test_edit_rederives_loan(self):
+        repayment = repayments.record_repayment(self.loan.pk, Decimal('100.00'))
+        response = self.client.patch(f'/api/loan-repayments/{repayment.pk}/', {'amount_paid': '250.00'},
+                                     format='json', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.state(), (
+            Decimal('250.00'), Decimal('50.00'), 'active',
+            [(Decimal('100.00'), 'paid'), (Decimal('100.00'), 'paid'), (Decimal('50.00'), 'partial')],
+        ))
+
+    def test_delete_reopens_and_clears_schedule(self):
+        first = repayments.record_repayment(self.loan.pk, Decimal('100.00'))
+        repayments.record_repayment(self.loan.pk, Decimal('200.00'))
+        self.assertEqual(self.state()[2], 'completed')
+
+        response = self.client.delete(f'/api/loan-repayments/{first.pk}/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.state(), (
+            Decimal('200.00'), Decimal('100.00'), 'active',
+            [(Decimal('100.00'), 'paid'), (Decimal('100.00'), 'paid'), (Decimal('0.00'), 'pending')],
+        ))
+
+    def test_verify_and_rebuild_command(self):
+        repayments.record_repayment(self.loan.pk, Decimal('120.00'))
+        call_command('rebuild_loan_totals', '--verify', stdout=io.StringIO())
+
+        Loan.objects.filter(pk=self.loan.pk).update(total_repaid=Decimal('20.00'), balance=Decimal('280.00'))
+        self.loan.installments.update(amount_paid=Decimal('0.00'), status='pending')
+        with self.assertRaises(CommandError):
+            call_command('rebuild_loan_totals', '--verify', stdout=io.StringIO())
+
+        call_command('rebuild_loan_totals', stdout=io.StringIO())
+        self.assertEqual(repayments.verify_loans(), [])
+        self.assertEqual(self.state()[:2], (Decimal('120.00'), Decimal('180.00')))
+
+    def test_schedule_backfill(self):
+        backfill = importlib.import_module('creditunion.migrations.0005_loaninstallment').backfill_schedules
+        self.loan.installments.all().delete()
+        Loan.objects.filter(pk=self.loan.pk).update(total_repaid=Decimal('150.00'))
+
+        backfill(django_apps, None)
+        self.assertEqual(self.state()[3], [
+            (Decimal('100.00'), 'paid'), (Decimal('50.00'), 'partial'), (Decimal('0.00'), 'pending'),
+        ])
+
+
+class ConcurrentRepaymentTests(TransactionTestCase):
+    """
+    Repayments posted at the same time against one loan are all counted.
+    """
+
+    def test_concurrent_posting(self):
+        user = CustomUser.objects.create_user(username='busy_borrower', password='pw')
+        loan = Loan.objects.create(
+            member=user, amount=Decimal('1000.00'), interest_rate=Decimal('0.00'), term=4,
+            total_amount=Decimal('1000.00'), status='active', disbursed_date=date(2024, 1, 1),
+        )
+        schedules.create_schedule(loan)
+
+        def post(_):
+            try:
+                repayments.record_repayment(loan.pk, Decimal('10.00'))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(post, range(20)))
+
+        loan.refresh_from_db()
+        self.assertEqual((loan.total_repaid, loan.balance), (Decimal('200.00'), Decimal('800.00')))
+        self.assertEqual(loan.repayments.count(), 20)
+        self.assertEqual(repayments.verify_loans(), [])
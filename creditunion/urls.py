@@ -8,7 +8,10 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
-from . import auth_views, dashboard_views, loanSummary_view, model_viewset, paystack_views
+from . import (
+    auth_views, dashboard_views, loanSummary_view, model_viewset, paystack_async_views, paystack_views,
+    portfolio_view, statement_view,
+)
 
 from .loan_viewset import LoanViewSet, LoanRepaymentViewSet
 
@@ -40,14 +43,23 @@ urlpatterns = [
     # path('api/verify-transaction/<str:reference>/', paystack_views.verify_transaction, name='verify-transaction'),
     
     path("api/verify-transaction/", paystack_views.verify_transaction, name='verify-transaction'),
+    path('api/paystack/webhook/', paystack_views.paystack_webhook, name='paystack-webhook'),
+    
+    # async (ASGI) variants of initiate / verify
+    path('api/async/connect-paystack/', paystack_async_views.initiate_momo_payment, name='async-initiate-momo-payment'),
+    path('api/async/verify-transaction/', paystack_async_views.verify_transaction, name='async-verify-transaction'),
     
     path('api/all-members/', model_viewset.AllMembersAPIView.as_view(), name='all-members'),
+    path('api/members/search/', model_viewset.MemberSearchView.as_view(), name='member-search'),
     
     #dashboard views
     path('api/member-dashboard/', dashboard_views.MemberDashboardView.as_view(), name='member-dashboard'),
     
     path('api/user-transactions/', model_viewset.UserTransactionListView.as_view(), name='user-transactions'),
     
+    # streamed statement export (csv / ndjson)
+    path('api/member-statement/', statement_view.member_statement_export, name='member-statement'),
+    
     #loan summary
     path('api/loan-summary/', loanSummary_view.loan_summary, name='loan-summary'),
     
@@ -58,6 +70,13 @@ urlpatterns = [
     # all loan applications
     path('api/loan-list/', loanSummary_view.loan_list, name='loan-list'),
     
+    # paginated, filterable officer loan queue
+    path('api/loan-queue/', loanSummary_view.LoanQueueView.as_view(), name='loan-queue'),
+    
+    
+    # officer portfolio analytics (PAR, aging, collections)
+    path('api/loan-portfolio/', portfolio_view.loan_portfolio, name='loan-portfolio'),
+    
     
     path('api/member/profile/', model_viewset.MemberProfileView.as_view(), name='member-profile'),
     